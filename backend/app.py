@@ -1,14 +1,18 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from pypfopt import risk_models, expected_returns
+from pypfopt import expected_returns
 from scipy import stats
 import joblib
 import os
 import sys
-from datetime import datetime, timedelta
+from utils.price_store import price_store
+from utils.covariance import covariance_store, ESTIMATORS
+from utils.ml_features import prepare_ml_features, prepare_enhanced_features
+from utils.strategy_backtest import StrategyBacktester
+from utils.asset_scoring import AssetScoringModel, ASSET_MODEL_PATH
+from utils.inference_batcher import MicroBatcher
 
 # Import the EnhancedPortfolioModel class
 try:
@@ -93,6 +97,16 @@ if enhanced_model is None and EnhancedPortfolioModel is not None:
         enhanced_tickers = None
         enhanced_feature_names = None
 
+# Per-asset scoring model (any tickers, trained by train_asset_model.py)
+try:
+    asset_model = AssetScoringModel.load(ASSET_MODEL_PATH)
+    print("✅ Per-asset scoring model loaded successfully")
+    print(f"   Path: {ASSET_MODEL_PATH}")
+except Exception as e:
+    print(f"⚠️  Per-asset scoring model not available: {e}")
+    print("   Run train_asset_model.py to enable it")
+    asset_model = None
+
 print("\n📊 Model Status:")
 if rf_model is not None:
     print("   ✅ Basic model: READY (works with any stocks)")
@@ -105,6 +119,11 @@ if enhanced_model is not None:
 else:
     print("   ⚠️  Enhanced model: NOT AVAILABLE")
 
+if asset_model is not None:
+    print("   ✅ Per-asset model: READY (any number of stocks)")
+else:
+    print("   ⚠️  Per-asset model: NOT AVAILABLE")
+
 if rf_model is None and enhanced_model is None:
     print("\n❌ WARNING: No ML models available!")
     print("   The /optimize endpoint will not work.")
@@ -123,148 +142,25 @@ else:
     
 print("="*60 + "\n")
 
+# Concurrent /optimize requests share batched predict calls per model
+inference_batchers = {}
+if enhanced_model is not None:
+    inference_batchers["enhanced"] = MicroBatcher(enhanced_model.predict)
+if asset_model is not None:
+    inference_batchers["per_asset"] = MicroBatcher(asset_model.predict_scores)
+if rf_model is not None:
+    inference_batchers["basic"] = MicroBatcher(rf_model.predict)
+
 
 # -----------------------------
 # Helper functions
 # -----------------------------
 def fetch_data(tickers, period="1y"):
-    """Download adjusted close prices from yfinance."""
-    df = yf.download(tickers, period=period, progress=False)
-    
-    if "Adj Close" in df:
-        df = df["Adj Close"]
-    elif "Close" in df:
-        df = df["Close"]
-    else:
-        raise ValueError("No 'Adj Close' or 'Close' column found in data.")
-    
-    if isinstance(df, pd.Series):
-        df = df.to_frame()
-    return df.dropna()
-
-def prepare_ml_features(price_df):
-    """Prepare features for basic ML model prediction."""
-    features = []
-    returns = price_df.pct_change().dropna()
-    
-    # Calculate features for each stock
-    for ticker in price_df.columns:
-        # Basic statistics
-        ret = returns[ticker]
-        ann_ret = ret.mean() * 252
-        ann_vol = ret.std() * np.sqrt(252)
-        sharpe = ann_ret / ann_vol if ann_vol > 0 else 0
-        
-        # Additional features
-        skew = stats.skew(ret)
-        kurt = stats.kurtosis(ret)
-        var_95 = np.percentile(ret, 5)
-        
-        # Add to features
-        features.extend([
-            ann_ret, ann_vol, sharpe, 
-            float(skew), float(kurt), float(var_95)
-        ])
-    
-    # Ensure we have exactly 36 features (6 stocks * 6 features each)
-    max_features = 36
-    features = features[:max_features]  # Truncate if too many
-    features.extend([0] * (max_features - len(features)))  # Pad with zeros
-    
-    return np.array(features).reshape(1, -1)
-
-def prepare_enhanced_features(price_df, tickers):
-    """
-    Prepare 171 features for enhanced ML model prediction.
-    This matches the exact feature calculation from EnhancedPortfolioModel training.
-    
-    Features per ticker (19 total):
-    1. return, 2. vol, 3. sharpe, 4. mom3m, 5. mom1m, 6. mom1w,
-    7. volratio, 8. realvol, 9. skew, 10. kurt, 11. maxdd, 12. currdd,
-    13. sma20, 14. sma50, 15. smaratio, 16. rsi, 17. mktcorr, 18. beta, 19. priceperc
-    """
-    features = []
-    returns = price_df.pct_change().dropna()
-    
-    for ticker in tickers:
-        if ticker not in price_df.columns:
-            # If ticker not in data, add zeros for all features
-            features.extend([0] * 19)
-            continue
-            
-        prices = price_df[ticker]
-        ret = returns[ticker]
-        
-        # 1. Annual return
-        ann_ret = ret.mean() * 252
-        
-        # 2. Volatility
-        ann_vol = ret.std() * np.sqrt(252)
-        
-        # 3. Sharpe ratio
-        sharpe = ann_ret / ann_vol if ann_vol > 0 else 0
-        
-        # 4-6. Momentum (3m, 1m, 1w)
-        mom_3m = (prices.iloc[-1] / prices.iloc[-63] - 1) if len(prices) >= 63 else 0
-        mom_1m = (prices.iloc[-1] / prices.iloc[-21] - 1) if len(prices) >= 21 else 0
-        mom_1w = (prices.iloc[-1] / prices.iloc[-5] - 1) if len(prices) >= 5 else 0
-        
-        # 7. Volatility ratio (recent vs long-term)
-        recent_vol = ret.iloc[-21:].std() if len(ret) >= 21 else ann_vol
-        vol_ratio = recent_vol / ann_vol if ann_vol > 0 else 1
-        
-        # 8. Realized volatility
-        real_vol = ret.std() * np.sqrt(252)
-        
-        # 9-10. Skewness and Kurtosis
-        skew = float(stats.skew(ret))
-        kurt = float(stats.kurtosis(ret))
-        
-        # 11-12. Drawdown
-        cumulative = (1 + ret).cumprod()
-        running_max = cumulative.cummax()
-        drawdown = (cumulative / running_max - 1)
-        max_dd = float(drawdown.min())
-        curr_dd = float(drawdown.iloc[-1])
-        
-        # 13-15. Moving averages (normalized values)
-        sma_20 = prices.rolling(20).mean().iloc[-1] if len(prices) >= 20 else prices.iloc[-1]
-        sma_50 = prices.rolling(50).mean().iloc[-1] if len(prices) >= 50 else prices.iloc[-1]
-        # Normalize SMAs relative to current price
-        sma_20_norm = (sma_20 - prices.iloc[-1]) / prices.iloc[-1] if prices.iloc[-1] > 0 else 0
-        sma_50_norm = (sma_50 - prices.iloc[-1]) / prices.iloc[-1] if prices.iloc[-1] > 0 else 0
-        sma_ratio = sma_20 / sma_50 if sma_50 > 0 else 1
-        
-        # 16. RSI (normalized to 0-1 range)
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss if len(gain) >= 14 and loss.iloc[-1] != 0 else 1
-        rsi = (100 - (100 / (1 + rs.iloc[-1]))) / 100 if len(gain) >= 14 else 0.5
-        
-        # 17. Market correlation (use first ticker as proxy)
-        mkt_corr = ret.corr(returns.iloc[:, 0]) if len(returns.columns) > 1 else 0
-        
-        # 18. Beta (vs market proxy)
-        cov = ret.cov(returns.iloc[:, 0]) if len(returns.columns) > 1 else 0
-        mkt_var = returns.iloc[:, 0].var()
-        beta = cov / mkt_var if mkt_var > 0 else 1
-        
-        # 19. Price percentile (current price vs historical range)
-        price_min = prices.min()
-        price_max = prices.max()
-        price_perc = (prices.iloc[-1] - price_min) / (price_max - price_min) if price_max > price_min else 0.5
-        
-        # Add all 19 features for this ticker (matching training feature order)
-        # Order: return, vol, sharpe, mom3m, mom1m, mom1w, volratio, realvol, skew, kurt, 
-        #        maxdd, currdd, sma20, sma50, smaratio, rsi, mktcorr, beta, priceperc
-        features.extend([
-            ann_ret, ann_vol, sharpe, mom_3m, mom_1m, mom_1w,
-            vol_ratio, real_vol, skew, kurt, max_dd, curr_dd,
-            sma_20_norm, sma_50_norm, sma_ratio, rsi, mkt_corr, beta, price_perc
-        ])
-    
-    return np.array(features).reshape(1, -1)
+    """Load adjusted close prices from the local price store (refreshed from yfinance)."""
+    df = price_store.get_prices(tickers, period=period)
+    if df.empty:
+        raise ValueError("No price data found for the given tickers.")
+    return df
 
 def stock_statistics(prices):
     """Calculate statistics for a single stock price series."""
@@ -304,18 +200,27 @@ def optimize():
         {"ticker": "INFY.NS", "amount": 15000},
         ...
       ],
-      "use_enhanced": true  // Optional: use enhanced model (default: true)
+      "use_enhanced": true,  // Optional: use enhanced model (default: true)
+      "model_mode": "auto",  // Optional: auto or per_asset
+      "cov_method": "sample"  // Optional: sample, ledoit_wolf or ewma
     }
     
     Returns optimized portfolio weights using EnhancedPortfolioModel (171 features)
-    or falls back to basic model if stocks don't match.
+    or, for stocks it doesn't cover, the per-asset scoring model (19 features per
+    stock, any number of stocks), falling back to the basic model.
     """
     data = request.json
     stocks = data.get("stocks", [])
     use_enhanced = data.get("use_enhanced", True)  # Default to enhanced model
+    cov_method = data.get("cov_method", "sample")
+    model_mode = data.get("model_mode", "auto")
 
     if not stocks:
         return jsonify({"error": "No stocks provided"}), 400
+    if model_mode not in ("auto", "per_asset"):
+        return jsonify({"error": f"Unknown model_mode: {model_mode}"}), 400
+    if cov_method not in ESTIMATORS:
+        return jsonify({"error": f"Unknown cov_method: {cov_method}"}), 400
 
     tickers = [s["ticker"].upper() for s in stocks]
     amounts = [float(s["amount"]) for s in stocks]
@@ -338,7 +243,7 @@ def optimize():
         model_used = None
         
         # Try to use enhanced model if requested and available
-        if use_enhanced and enhanced_model is not None and enhanced_tickers is not None and set(tickers).issubset(set(enhanced_tickers)):
+        if model_mode == "auto" and use_enhanced and enhanced_model is not None and enhanced_tickers is not None and set(tickers).issubset(set(enhanced_tickers)):
             try:
                 print(f"🔍 Attempting to use enhanced model for tickers: {tickers}")
                 
@@ -347,7 +252,7 @@ def optimize():
                 print(f"📊 Prepared {features.shape[1]} features for enhanced model")
                 
                 # Get predictions from enhanced ML model
-                predicted_weights = enhanced_model.predict(features)[0]
+                predicted_weights = inference_batchers["enhanced"].predict(features)[0]
                 print(f"🎯 Raw predictions from enhanced model: {predicted_weights}")
                 
                 # Map predictions to user's tickers
@@ -369,6 +274,26 @@ def optimize():
                 weights = None
                 model_used = None
         
+        # Per-asset scoring model: one (N x 19) predict for any set of tickers
+        if model_mode == "per_asset" and asset_model is None:
+            return jsonify({"error": "Per-asset model not available. Run train_asset_model.py to enable it."}), 500
+        if weights is None and asset_model is not None:
+            try:
+                print(f"🔍 Using per-asset scoring model for tickers: {tickers}")
+                allocation = asset_model.allocate(tickers, predict=inference_batchers["per_asset"].predict)
+                weights = allocation['weights']
+                model_used = "per_asset"
+                print(f"🎯 Per-asset scores: {allocation['scores']}")
+                print(f"✅ Using per-asset model - Weights: {weights}")
+            except Exception as e:
+                print(f"⚠️  Per-asset model failed: {e}")
+                # An explicit per_asset request reports the failure instead of switching models
+                if model_mode == "per_asset":
+                    status = 400 if isinstance(e, ValueError) else 500
+                    return jsonify({"error": f"Per-asset model failed: {e}"}), status
+                weights = None
+                model_used = None
+
         # Fallback to basic model if enhanced model wasn't used or failed
         if weights is None:
             # Check if we have ANY model available
@@ -384,7 +309,7 @@ def optimize():
                 try:
                     # Prepare features for enhanced model
                     features = prepare_enhanced_features(price_df, enhanced_tickers)
-                    predicted_weights = enhanced_model.predict(features)[0]
+                    predicted_weights = inference_batchers["enhanced"].predict(features)[0]
                     
                     # Map only the tickers that exist in both lists
                     weights = {}
@@ -413,7 +338,7 @@ def optimize():
                 print(f"📊 Prepared {features.shape[1]} features for basic model")
                 
                 # Get predictions from basic ML model
-                predicted_weights = rf_model.predict(features)[0]
+                predicted_weights = inference_batchers["basic"].predict(features)[0]
                 print(f"🎯 Raw predictions from basic model: {predicted_weights[:len(tickers)]}")
                 
                 # Convert predictions to weights dictionary
@@ -487,9 +412,15 @@ def optimize():
         ann_return = sum(weights[ticker] * mu[ticker] for ticker in tickers)
         print(f"💰 Portfolio Expected Return: {ann_return:.4f} ({ann_return*100:.2f}%)")
         
-        # Calculate portfolio volatility
-        portfolio_returns = (returns * pd.Series(weights)).sum(axis=1)
-        ann_vol = portfolio_returns.std() * np.sqrt(252)
+        # Calculate portfolio volatility from the persisted covariance estimator
+        # Tickers without price data carry no return series and add nothing to the risk
+        priced = [t for t in tickers if t in returns.columns]
+        if priced:
+            cov_matrix = covariance_store.get_covariance(returns[priced], method=cov_method)
+            weight_vector = np.array([weights[t] for t in priced])
+            ann_vol = float(np.sqrt(weight_vector @ cov_matrix.values @ weight_vector))
+        else:
+            ann_vol = 0.0
         
         # Calculate Sharpe ratio (assuming 4% risk-free rate for India, 2% for US)
         risk_free_rate = 0.04 if any('.NS' in t or '.BO' in t for t in tickers) else 0.02
@@ -514,13 +445,63 @@ def optimize():
             "stock_expected_returns": stock_expected_returns,
             "model_used": model_used,
             "return_method": "CAPM/EMA",
+            "covariance_method": cov_method,
             "enhanced_model_available": enhanced_model is not None,
+            "asset_model_available": asset_model is not None,
             "enhanced_tickers": enhanced_tickers if enhanced_model is not None else []
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# -----------------------------
+# Strategy Backtest Route
+# -----------------------------
+@app.route("/backtest", methods=["POST"])
+def backtest():
+    """
+    Expects JSON:
+    {
+      "tickers": ["TCS.NS", "INFY.NS", ...],
+      "strategies": ["enhanced", "basic", "equal_weight"],  // Optional: default all
+      "frequencies": [1, 5, 21],  // Optional: rebalance every N trading days
+      "lookbacks": [126, 252],    // Optional: feature window in trading days
+      "period": "10y",            // Optional: price history replayed
+      "cost_bps": 10,             // Optional: transaction cost per unit of turnover
+      "include_curves": false     // Optional: return the equity curves
+    }
+
+    Replays the /optimize allocation models over the stored price history for
+    every (strategy, lookback, frequency) combination.
+    """
+    data = request.json or {}
+    tickers = [t.upper() for t in data.get("tickers", [])]
+    if not tickers:
+        return jsonify({"error": "No tickers provided"}), 400
+
+    try:
+        backtester = StrategyBacktester(rf_model=rf_model, enhanced_model=enhanced_model,
+                                        enhanced_tickers=enhanced_tickers,
+                                        cost_bps=float(data.get("cost_bps", 10)))
+        result = backtester.run(tickers, strategies=data.get("strategies"),
+                                frequencies=[int(f) for f in data.get("frequencies", [21])],
+                                lookbacks=[int(l) for l in data.get("lookbacks", [252])],
+                                period=data.get("period", "10y"),
+                                include_curves=bool(data.get("include_curves", False)))
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# -----------------------------
+# Inference Batching Stats Route
+# -----------------------------
+@app.route("/inference/stats", methods=["GET"])
+def inference_stats():
+    """Queue depth, batch size and queue wait histograms of each model's micro-batcher"""
+    return jsonify({name: batcher.stats() for name, batcher in inference_batchers.items()})
+
 # Health check
 @app.route("/", methods=["GET"])
 def home():
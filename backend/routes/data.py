@@ -1,52 +1,169 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
-import yfinance as yf
-import pandas as pd
+import time
 from datetime import datetime, timedelta
+from utils.quote_cache import quote_cache
+from utils.price_store import price_store
+from utils.market_snapshot import market_snapshot
+from utils.symbol_search import symbol_index
+from utils.screener import feature_screener
+from utils.downsampling import downsample_bars, MIN_POINTS
+from utils.serialization import (BINARY_FORMATS, negotiate_format, frame_payload, json_response, frames_response,
+                                 entity_tag, validator_headers, not_modified, not_modified_response)
 
 router = APIRouter()
+# Index quotes are loaded in the background from startup, so no request waits on them
+router.add_event_handler("startup", market_snapshot.start)
 
 class StockDataRequest(BaseModel):
     symbols: List[str]
     period: str = "1y"  # 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
+    format: Optional[str] = None  # records, columnar, arrow, binary (default: Accept header)
+    start: Optional[str] = None  # YYYY-MM-DD, overrides period
+    end: Optional[str] = None
+    max_points: Optional[int] = None  # LTTB-downsample each history to at most this many bars
+    since: Optional[str] = None  # Watermark from a previous response: only bars on or after it
+
+class ScreenFilter(BaseModel):
+    feature: str  # One of the 19 enhanced-model features, e.g. sharpe, vol, rsi, maxdd
+    op: str  # >, >=, <, <=, ==, !=
+    value: float
+
+class ScreenerRequest(BaseModel):
+    filters: List[ScreenFilter] = []
+    sort_by: Optional[str] = "sharpe"
+    descending: bool = True
+    limit: int = 50
+
+def _check_max_points(max_points: Optional[int]):
+    if max_points is not None and max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
 
 @router.get("/stocks/{symbol}")
-async def get_stock_data(symbol: str, period: str = "1y"):
-    """Get historical stock data for a single symbol"""
+async def get_stock_data(request: Request, symbol: str, period: str = "1y", format: Optional[str] = None,
+                         start: Optional[str] = None, end: Optional[str] = None,
+                         max_points: Optional[int] = None, since: Optional[str] = None):
+    """
+    Get historical stock data for a single symbol
+
+    ``since`` returns only bars dated on or after the watermark of a previous
+    response (the watermark bar itself is resent in case it was revised);
+    If-None-Match / If-Modified-Since get a 304 while the stored bars are unchanged.
+    """
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
+        _check_max_points(max_points)
+        fmt = negotiate_format(request, format)
+        hist = await run_in_threadpool(price_store.get_history, symbol, period, since or start, end)
+        modified = price_store.last_modified(symbol)
         
-        if hist.empty:
+        if hist.empty and (since is None or modified is None):
             raise HTTPException(status_code=404, detail=f"No data found for symbol {symbol}")
+
+        etag = entity_tag(symbol, period, start, end, since, max_points, fmt, modified)
+        headers = validator_headers(etag, modified)
+        if not_modified(request, etag, modified):
+            return not_modified_response(headers)
+
+        watermark = hist.index[-1].strftime('%Y-%m-%d') if not hist.empty else since
+        headers['X-Watermark'] = watermark
+        hist = downsample_bars(hist, max_points)
         
-        # Convert to JSON-serializable format
-        data = {
+        info = await run_in_threadpool(quote_cache.get_info, symbol)
+        if fmt in BINARY_FORMATS:
+            return frames_response(request, {symbol: hist}, fmt, metadata={"info": info, "watermark": watermark},
+                                   headers=headers)
+        return json_response(request, {
             "symbol": symbol,
-            "data": hist.reset_index().to_dict('records'),
-            "info": ticker.info
-        }
-        return data
+            "data": frame_payload(hist, fmt),
+            "info": info,
+            "watermark": watermark
+        }, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _timed(fn, *args):
+    """Run ``fn`` and return (result, error message, elapsed milliseconds)"""
+    started = time.perf_counter()
+    try:
+        result, error = fn(*args), None
+    except Exception as e:
+        result, error = None, str(e)
+    return result, error, round((time.perf_counter() - started) * 1000, 2)
+
+def _load_batch(symbols: List[str], period: str, start: Optional[str] = None,
+                end: Optional[str] = None, max_points: Optional[int] = None,
+                since: Optional[str] = None) -> dict:
+    """Histories and info for a batch, isolating failures per symbol"""
+    # .info lookups run on the quote pool while the histories are downloaded in bulk
+    info_futures = {s: quote_cache.executor.submit(_timed, quote_cache.get_info, s) for s in symbols}
+    _, refresh_error, refresh_ms = _timed(price_store.refresh, symbols)
+
+    frames, details, modified = {}, {}, {}
+    for symbol in symbols:
+        hist, error, history_ms = _timed(price_store.get_history, symbol, period, since or start, end)
+        modified[symbol] = price_store.last_modified(symbol)
+        if error is None and (hist is None or hist.empty) and (since is None or modified[symbol] is None):
+            error = f"No data found for symbol {symbol}"
+        watermark = None
+        if error is None:
+            watermark = hist.index[-1].strftime('%Y-%m-%d') if not hist.empty else since
+            frames[symbol] = downsample_bars(hist, max_points)
+        info, info_error, info_ms = info_futures[symbol].result()
+        details[symbol] = {
+            "info": info or {},
+            "error": error or info_error,
+            "watermark": watermark,
+            "latency_ms": {"history": history_ms, "info": info_ms}
+        }
+    return {"frames": frames, "details": details, "modified": modified,
+            "bulk_fetch_ms": refresh_ms, "bulk_fetch_error": refresh_error}
+
 @router.post("/stocks/batch")
-async def get_batch_stock_data(request: StockDataRequest):
+async def get_batch_stock_data(request: StockDataRequest, http_request: Request):
     """Get historical stock data for multiple symbols"""
     try:
+        started = time.perf_counter()
+        _check_max_points(request.max_points)
+        fmt = negotiate_format(http_request, request.format)
+        symbols = list(dict.fromkeys(request.symbols))
+        result = await run_in_threadpool(_load_batch, symbols, request.period, request.start,
+                                         request.end, request.max_points, request.since)
+        frames, details = result["frames"], result["details"]
+
+        stamps = [m for m in result["modified"].values() if m is not None]
+        latest = max(stamps) if stamps else None
+        etag = entity_tag(symbols, request.period, request.start, request.end, request.since,
+                          request.max_points, fmt, sorted(result["modified"].items(), key=lambda kv: kv[0]))
+        headers = validator_headers(etag, latest)
+        if not_modified(http_request, etag, latest):
+            return not_modified_response(headers)
+
+        errors = {s: d["error"] for s, d in details.items() if d["error"]}
+        latency = {
+            "total": round((time.perf_counter() - started) * 1000, 2),
+            "bulk_fetch": result["bulk_fetch_ms"]
+        }
+
+        if fmt in BINARY_FORMATS:
+            return frames_response(http_request, frames, fmt,
+                                   metadata={"info": {s: d["info"] for s, d in details.items()},
+                                             "watermarks": {s: d["watermark"] for s, d in details.items()},
+                                             "errors": errors, "latency_ms": latency},
+                                   headers=headers)
         data = {}
-        for symbol in request.symbols:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=request.period)
-            
-            if not hist.empty:
-                data[symbol] = {
-                    "data": hist.reset_index().to_dict('records'),
-                    "info": ticker.info
-                }
-        
-        return {"success": True, "data": data}
+        for symbol, detail in details.items():
+            hist = frames.get(symbol)
+            data[symbol] = {"data": frame_payload(hist, fmt) if hist is not None else [], **detail}
+        return json_response(http_request, {
+            "success": True,
+            "data": data,
+            "errors": errors,
+            "latency_ms": latency
+        }, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -55,42 +172,57 @@ async def get_market_indices():
     """Get major market indices data"""
     try:
         indices = ["^GSPC", "^DJI", "^IXIC", "^RUT"]  # S&P 500, Dow, NASDAQ, Russell 2000
-        data = {}
-        
-        for index in indices:
-            ticker = yf.Ticker(index)
-            hist = ticker.history(period="1d")
-            if not hist.empty:
-                latest = hist.iloc[-1]
-                data[index] = {
-                    "price": latest['Close'],
-                    "change": latest['Close'] - hist.iloc[-2]['Close'] if len(hist) > 1 else 0,
-                    "change_percent": ((latest['Close'] - hist.iloc[-2]['Close']) / hist.iloc[-2]['Close'] * 100) if len(hist) > 1 else 0
-                }
+        snapshot = market_snapshot.get()
+        quotes = snapshot['quotes']
+        data = {
+            index: {
+                "price": quotes[index]['price'],
+                "change": quotes[index]['change'],
+                "change_percent": quotes[index]['change_percent']
+            }
+            for index in indices if index in quotes
+        }
         
-        return {"success": True, "indices": data}
+        return {"success": True, "indices": data, "updated_at": snapshot['updated_at'], "stale": snapshot['stale']}
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/search/{query}")
-async def search_stocks(query: str):
+async def search_stocks(query: str, limit: int = 10):
     """Search for stocks by name or symbol"""
     try:
-        # This is a simplified search - in production, you'd use a proper search API
-        ticker = yf.Ticker(query.upper())
-        info = ticker.info
-        
-        if 'symbol' in info:
-            return {
-                "success": True,
-                "results": [{
-                    "symbol": info.get('symbol', query.upper()),
-                    "name": info.get('longName', 'Unknown'),
-                    "sector": info.get('sector', 'Unknown'),
-                    "industry": info.get('industry', 'Unknown')
-                }]
-            }
-        else:
-            return {"success": True, "results": []}
+        # Served from the in-memory symbol master: prefix and typo-tolerant, no network calls
+        results = symbol_index.search(query, limit=max(1, min(limit, 50)))
+        return {
+            "success": True,
+            "results": [{
+                "symbol": r['symbol'],
+                "name": r['name'],
+                "sector": r['sector'],
+                "industry": r['industry'],
+                "exchange": r['exchange'],
+                "score": r['score']
+            } for r in results]
+        }
     except Exception as e:
         return {"success": True, "results": []}
+
+@router.get("/screener/status")
+async def get_screener_status():
+    """State of the precomputed screener table and the features it can filter on"""
+    return {"success": True, **feature_screener.status()}
+
+@router.post("/screener")
+async def screen_stocks(request: ScreenerRequest):
+    """Filter and rank every stored symbol on its precomputed enhanced-model features"""
+    try:
+        result = feature_screener.screen([f.dict() for f in request.filters], sort_by=request.sort_by,
+                                         descending=request.descending,
+                                         limit=max(1, min(request.limit, 500)))
+        return {"success": True, **result}
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,84 +1,154 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
+import asyncio
+import logging
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-import yfinance as yf
 from datetime import datetime, timedelta
+from utils.market_snapshot import market_snapshot
+from utils.price_store import price_store
+from utils.forecaster import forecast_models, predict_horizons, MODEL_TYPES
+from utils.path_simulator import PathSimulator
+from utils.forecast_backtest import ForecastBacktester
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+# Index quotes are loaded in the background from startup, so no request waits on them
+router.add_event_handler("startup", market_snapshot.start)
 
 class ForecastRequest(BaseModel):
     symbols: List[str]
     days: int = 30
     model_type: str = "linear"  # linear, random_forest
+    mode: str = "direct"  # direct: indicators held at their last value; recursive: updated from each prediction
+    deadline_seconds: float = 20.0  # Symbols not ready by then are listed in timed_out
+
+class SimulationRequest(BaseModel):
+    symbols: List[str]
+    days: int = 252
+    n_paths: int = 10000
+    method: str = "gbm"  # gbm, bootstrap
+    correlated: bool = True  # Correlate symbols (Cholesky for gbm, whole-day blocks for bootstrap)
+    block_size: int = 5  # Days per bootstrap block
+    period: str = "5y"  # History the return distribution is estimated from
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+
+class BacktestRequest(BaseModel):
+    symbols: List[str]
+    model_types: Optional[List[str]] = None  # Default: all model types
+    period: str = "5y"
+    horizon: int = 21  # Trading days forecast in each fold
+    initial_train: int = 250  # Rows in the first training window
+    step: int = 21  # Rows added to the training window between folds
+    max_folds: Optional[int] = 24  # Most recent folds evaluated per symbol
+
+def _log_refresh_error(refresh: asyncio.Future):
+    # The refresh may outlive the request, so its error is reported here rather than awaited
+    if not refresh.cancelled() and refresh.exception() is not None:
+        logger.error("Bulk price refresh for /predict failed", exc_info=refresh.exception())
 
 @router.post("/predict")
 async def predict_stock_prices(request: ForecastRequest):
     """Predict future stock prices"""
     try:
-        predictions = {}
+        model_type = request.model_type if request.model_type in MODEL_TYPES else "linear"
         
-        for symbol in request.symbols:
-            # Get historical data
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="2y")
-            
-            if hist.empty:
-                continue
-            
-            # Prepare features
-            hist['Days'] = range(len(hist))
-            hist['MA_10'] = hist['Close'].rolling(window=10).mean()
-            hist['MA_30'] = hist['Close'].rolling(window=30).mean()
-            hist['Volatility'] = hist['Close'].rolling(window=10).std()
-            
-            # Remove NaN values
-            hist = hist.dropna()
-            
-            if len(hist) < 50:  # Need enough data
-                continue
-            
-            # Features and target
-            features = ['Days', 'MA_10', 'MA_30', 'Volatility']
-            X = hist[features].values
-            y = hist['Close'].values
-            
-            # Train model
-            if request.model_type == "random_forest":
-                model = RandomForestRegressor(n_estimators=100, random_state=42)
-            else:
-                model = LinearRegression()
-            
-            model.fit(X, y)
-            
-            # Make predictions
-            last_day = hist['Days'].iloc[-1]
-            future_days = range(last_day + 1, last_day + request.days + 1)
-            
-            # Simple prediction (in practice, you'd use more sophisticated features)
-            last_ma_10 = hist['MA_10'].iloc[-1]
-            last_ma_30 = hist['MA_30'].iloc[-1]
-            last_volatility = hist['Volatility'].iloc[-1]
-            
-            future_predictions = []
-            for day in future_days:
-                pred_features = np.array([[day, last_ma_10, last_ma_30, last_volatility]])
-                prediction = model.predict(pred_features)[0]
-                future_predictions.append({
-                    "date": (datetime.now() + timedelta(days=day-last_day)).strftime("%Y-%m-%d"),
-                    "predicted_price": round(prediction, 2)
-                })
-            
+        # Per-symbol jobs run concurrently: history I/O on threads, fitting on the process pool
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + request.deadline_seconds
+        symbols = list(dict.fromkeys(request.symbols))
+        # One bulk download for missing histories instead of one per job
+        refresh = loop.run_in_executor(forecast_models.io_executor, price_store.refresh, symbols)
+        refresh.add_done_callback(_log_refresh_error)
+        await asyncio.wait({refresh}, timeout=request.deadline_seconds)
+        jobs = {
+            loop.run_in_executor(forecast_models.io_executor, forecast_models.get, symbol, model_type): symbol
+            for symbol in symbols
+        }
+        remaining = max(deadline - loop.time(), 0)
+        done, pending = await asyncio.wait(jobs, timeout=remaining) if jobs else (set(), set())
+        
+        entries, errors = {}, {}
+        for job in done:
+            symbol = jobs[job]
+            if job.exception() is not None:
+                errors[symbol] = str(job.exception())
+            elif job.result() is not None:  # Skip symbols without enough history
+                entries[symbol] = job.result()
+        # Unfinished fits keep running and land in the model cache for the next request
+        timed_out = [jobs[job] for job in pending]
+        entries = {s: entries[s] for s in symbols if s in entries}
+        
+        # All horizons predicted in one batched pass
+        forecasts = await run_in_threadpool(predict_horizons, entries, request.days, request.mode)
+        dates = [(datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+                 for offset in range(1, request.days + 1)]
+        
+        predictions = {}
+        for symbol, entry in entries.items():
             predictions[symbol] = {
-                "current_price": round(hist['Close'].iloc[-1], 2),
-                "predictions": future_predictions,
-                "model_score": round(model.score(X, y), 3)
+                "current_price": round(entry['current_price'], 2),
+                "predictions": [
+                    {"date": date, "predicted_price": round(float(price), 2)}
+                    for date, price in zip(dates, forecasts[symbol])
+                ],
+                "model_score": round(entry['score'], 3),
+                "model_as_of": entry['last_bar'].strftime("%Y-%m-%d")
             }
         
-        return {"success": True, "predictions": predictions}
+        return {"success": True, "predictions": predictions, "errors": errors, "timed_out": timed_out}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/simulate")
+async def simulate_price_paths(request: SimulationRequest):
+    """Monte Carlo fan chart: percentile bands of simulated prices per day"""
+    try:
+        if request.days < 1 or request.n_paths < 1:
+            raise ValueError("days and n_paths must be positive")
+        returns_prices = await run_in_threadpool(price_store.get_prices, request.symbols, request.period)
+        close_prices = await run_in_threadpool(price_store.get_prices, request.symbols, "5d", "Close")
+        if returns_prices.empty or close_prices.empty:
+            raise ValueError("No price data found for the given symbols")
+        returns = returns_prices.pct_change().dropna()
+        if len(returns) < 30:
+            raise ValueError("Not enough history to simulate from")
+        
+        simulator = PathSimulator(n_paths=request.n_paths, horizon=request.days, method=request.method,
+                                  correlated=request.correlated, block_size=request.block_size)
+        bands = await run_in_threadpool(simulator.simulate, returns, close_prices.iloc[-1],
+                                        tuple(request.percentiles))
+        dates = pd.bdate_range(returns.index[-1] + timedelta(days=1), periods=request.days).strftime("%Y-%m-%d")
+        
+        simulations = {
+            symbol: {
+                "start_price": round(result['start_price'], 2),
+                "mean": np.round(result['mean'], 2).tolist(),
+                "percentiles": {name: np.round(values, 2).tolist() for name, values in result['percentiles'].items()}
+            }
+            for symbol, result in bands.items()
+        }
+        return {
+            "success": True,
+            "method": request.method,
+            "n_paths": request.n_paths,
+            "dates": dates.tolist(),
+            "simulations": simulations,
+            "missing_symbols": [s for s in request.symbols if s not in bands]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/backtest")
+async def backtest_forecasts(request: BacktestRequest):
+    """Walk-forward accuracy and cost of the forecast model types"""
+    try:
+        backtester = ForecastBacktester(horizon=request.horizon, initial_train=request.initial_train,
+                                        step=request.step, max_folds=request.max_folds)
+        results = await run_in_threadpool(backtester.run, request.symbols, request.model_types, request.period)
+        return {"success": True, **results}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -88,20 +158,15 @@ async def get_market_sentiment():
     try:
         # Simple sentiment based on major indices performance
         indices = ["^GSPC", "^VIX"]  # S&P 500 and VIX
+        snapshot = market_snapshot.get()
         sentiment_data = {}
         
         for index in indices:
-            ticker = yf.Ticker(index)
-            hist = ticker.history(period="5d")
-            
-            if not hist.empty and len(hist) >= 2:
-                current = hist['Close'].iloc[-1]
-                previous = hist['Close'].iloc[-2]
-                change_percent = ((current - previous) / previous) * 100
-                
+            quote = snapshot['quotes'].get(index)
+            if quote is not None:
                 sentiment_data[index] = {
-                    "current": round(current, 2),
-                    "change_percent": round(change_percent, 2)
+                    "current": round(quote['price'], 2),
+                    "change_percent": round(quote['change_percent'], 2)
                 }
         
         # Simple sentiment calculation
@@ -118,7 +183,10 @@ async def get_market_sentiment():
         return {
             "success": True,
             "sentiment": sentiment,
-            "indicators": sentiment_data
+            "indicators": sentiment_data,
+            "updated_at": snapshot['updated_at']
         }
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
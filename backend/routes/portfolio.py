@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict
+from datetime import datetime
+import uuid
 import pandas as pd
+from models.portfolio_model import Portfolio, Stock, Transaction
 from utils.portfolio_optimizer import PortfolioOptimizer
 from utils.risk_calculator import RiskCalculator
+from utils.portfolio_store import portfolio_store
+from utils.stress_tester import SCENARIOS
 
 router = APIRouter()
 
@@ -11,16 +16,50 @@ class PortfolioRequest(BaseModel):
     symbols: List[str]
     weights: Optional[List[float]] = None
     investment_amount: float = 10000
+    name: str = "My Portfolio"
+    risk_level: str = "moderate"  # conservative, moderate, aggressive
+
+class TransactionRequest(BaseModel):
+    symbol: str
+    transaction_type: str  # buy, sell
+    quantity: int
+    price: float
+    fees: float = 0.0
+    timestamp: Optional[datetime] = None
 
 class OptimizationRequest(BaseModel):
     symbols: List[str]
     risk_tolerance: str = "moderate"  # conservative, moderate, aggressive
     investment_amount: float = 10000
+    cov_method: str = "sample"  # sample, ledoit_wolf, ewma, factor
+    method: str = "slsqp"  # slsqp (max Sharpe), hrp (hierarchical risk parity)
+
+class RollingRiskRequest(BaseModel):
+    symbols: List[str]
+    weights: List[float]
+    window: int = 63  # Trading days per window, e.g. 63 or 252
+    period: str = "2y"
+
+class SimulatedVaRRequest(BaseModel):
+    symbols: List[str]
+    weights: List[float]
+    horizon: int = 10  # Trading days
+    n_paths: int = 100000
+    method: str = "normal"  # normal, t, historical
+    period: str = "2y"
+
+class StressTestRequest(BaseModel):
+    portfolio_ids: Optional[List[str]] = None  # Default: every stored portfolio
+    scenarios: Optional[List[str]] = None  # Default: every historical scenario
+    factor_shocks: Optional[Dict[str, float]] = None  # e.g. {"^NSEI": -0.2, "^VIX": 1.0}
 
 @router.get("/")
 async def get_portfolios():
     """Get all user portfolios"""
-    return {"portfolios": []}
+    try:
+        return {"portfolios": [p.dict() for p in portfolio_store.list_portfolios()]}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/create")
 async def create_portfolio(request: PortfolioRequest):
@@ -32,6 +71,31 @@ async def create_portfolio(request: PortfolioRequest):
             request.weights, 
             request.investment_amount
         )
+        
+        # Persist holdings and the opening buys so performance can be tracked
+        now = datetime.now()
+        portfolio_id = uuid.uuid4().hex[:12]
+        portfolio = Portfolio(
+            id=portfolio_id,
+            name=request.name,
+            total_value=portfolio_data['total_invested'] + portfolio_data['cash_remaining'],
+            cash_balance=portfolio_data['cash_remaining'],
+            stocks=[Stock(symbol=s['symbol'], name=s['name'], sector=s['sector'],
+                          current_price=s['current_price'], quantity=s['quantity'],
+                          weight=s['actual_weight'], value=s['actual_value'])
+                    for s in portfolio_data['portfolio']],
+            created_at=now,
+            updated_at=now,
+            risk_level=request.risk_level
+        )
+        transactions = [
+            Transaction(id=uuid.uuid4().hex[:12], portfolio_id=portfolio_id, symbol=s['symbol'],
+                        transaction_type="buy", quantity=s['quantity'], price=s['current_price'],
+                        total_amount=s['actual_value'], fees=0.0, timestamp=now)
+            for s in portfolio_data['portfolio'] if s['quantity'] > 0
+        ]
+        portfolio_store.save_portfolio(portfolio, request.investment_amount, transactions)
+        portfolio_data['id'] = portfolio_id
         return {"success": True, "portfolio": portfolio_data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -41,15 +105,95 @@ async def optimize_portfolio(request: OptimizationRequest):
     """Optimize portfolio allocation"""
     try:
         optimizer = PortfolioOptimizer()
-        optimized_portfolio = optimizer.optimize(
+        optimized_portfolio = optimizer.optimize_portfolio(
             request.symbols,
             request.risk_tolerance,
-            request.investment_amount
+            cov_method=request.cov_method,
+            method=request.method
         )
         return {"success": True, "optimized_portfolio": optimized_portfolio}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/risk/rolling")
+async def get_rolling_risk(request: RollingRiskRequest):
+    """Rolling risk metric series for charting"""
+    try:
+        risk_calc = RiskCalculator()
+        rolling = risk_calc.calculate_rolling_portfolio_risk(
+            request.symbols,
+            request.weights,
+            request.window,
+            request.period
+        )
+        series = {"dates": [d.strftime("%Y-%m-%d") for d in rolling.index]}
+        series.update({column: rolling[column].round(6).tolist() for column in rolling.columns})
+        return {"success": True, "window": request.window, "rolling": series}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/risk/var")
+async def get_simulated_var(request: SimulatedVaRRequest):
+    """Monte Carlo / bootstrapped historical VaR and CVaR over a multi-day horizon"""
+    try:
+        risk_calc = RiskCalculator()
+        var = risk_calc.calculate_simulated_var(
+            request.symbols,
+            request.weights,
+            horizon=request.horizon,
+            n_paths=request.n_paths,
+            method=request.method,
+            period=request.period
+        )
+        return {"success": True, "var": var}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stress/scenarios")
+async def get_stress_scenarios():
+    """List the built-in historical stress scenarios"""
+    return {"success": True, "scenarios": SCENARIOS}
+
+@router.post("/stress")
+async def run_stress_test(request: StressTestRequest):
+    """Apply historical and factor shocks to stored portfolios in one vectorized pass"""
+    try:
+        if request.portfolio_ids:
+            portfolios = [portfolio_store.get_portfolio(pid) for pid in request.portfolio_ids]
+        else:
+            portfolios = portfolio_store.list_portfolios()
+        risk_calc = RiskCalculator()
+        results = risk_calc.calculate_stress_test(portfolios, request.scenarios, request.factor_shocks)
+        return {"success": True, **results}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/{portfolio_id}/transactions")
+async def add_transaction(portfolio_id: str, request: TransactionRequest):
+    """Record a buy or sell in a stored portfolio"""
+    try:
+        if request.transaction_type not in ("buy", "sell"):
+            raise ValueError(f"Unknown transaction_type: {request.transaction_type} (expected buy or sell)")
+        transaction = Transaction(
+            id=uuid.uuid4().hex[:12],
+            portfolio_id=portfolio_id,
+            symbol=request.symbol,
+            transaction_type=request.transaction_type,
+            quantity=request.quantity,
+            price=request.price,
+            total_amount=request.quantity * request.price,
+            fees=request.fees,
+            timestamp=request.timestamp or datetime.now()
+        )
+        portfolio_store.add_transaction(transaction)
+        return {"success": True, "transaction": transaction.dict()}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{portfolio_id}/performance")
 async def get_portfolio_performance(portfolio_id: str):
     """Get portfolio performance metrics"""
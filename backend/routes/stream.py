@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+from utils.quote_stream import quote_hub
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15
+MAX_SYMBOLS = 50
+
+def _parse_symbols(symbols: str) -> list:
+    parsed = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',') if s.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(parsed) > MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYMBOLS} symbols per stream")
+    return parsed
+
+@router.get("/quotes")
+async def stream_quotes(request: Request, symbols: str):
+    """Server-Sent Events stream of quote changes for comma-separated symbols"""
+    subscriber = quote_hub.subscribe(_parse_symbols(symbols))
+
+    async def events():
+        try:
+            while not subscriber.closed.is_set():
+                if await request.is_disconnected():
+                    break
+                message = await quote_hub.next_message(subscriber, HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: quote\ndata: {json.dumps(message)}\n\n"
+            if subscriber.reason:
+                yield f"event: close\ndata: {json.dumps({'reason': subscriber.reason})}\n\n"
+        finally:
+            quote_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws")
+async def quote_socket(websocket: WebSocket):
+    """
+    WebSocket quote stream
+
+    Clients send ``{"action": "subscribe" | "unsubscribe", "symbols": [...]}``
+    and receive ``{"type": "quote", ...}`` messages for the symbols they follow.
+    """
+    await websocket.accept()
+    subscriber = quote_hub.subscribe([])
+
+    async def receive():
+        while True:
+            command = await websocket.receive_json()
+            symbols = [str(s).upper() for s in command.get('symbols', [])]
+            if command.get('action') == 'unsubscribe':
+                quote_hub.remove_symbols(subscriber, symbols)
+            elif len(subscriber.symbols | set(symbols)) > MAX_SYMBOLS:
+                await websocket.send_json({"type": "error", "detail": f"At most {MAX_SYMBOLS} symbols per stream"})
+            else:
+                quote_hub.add_symbols(subscriber, symbols)
+
+    async def send():
+        while not subscriber.closed.is_set():
+            message = await quote_hub.next_message(subscriber, HEARTBEAT_SECONDS)
+            await websocket.send_json({"type": "quote", **message} if message else {"type": "heartbeat"})
+        await websocket.close(code=1013, reason=subscriber.reason or "")
+
+    receiver = asyncio.create_task(receive())
+    sender = asyncio.create_task(send())
+    try:
+        done, _ = await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # A disconnect surfaces as WebSocketDisconnect on the receiver; nothing to report
+            task.exception()
+    finally:
+        for task in (receiver, sender):
+            task.cancel()
+        quote_hub.unsubscribe(subscriber)
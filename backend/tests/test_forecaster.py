@@ -0,0 +1,27 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.forecaster import ForecastModelCache
+
+
+def test_concurrent_first_requests_share_one_fit(tmp_path):
+    cache = ForecastModelCache(root=str(tmp_path))
+    calls = []
+    lock = threading.Lock()
+
+    def train(symbol, model_type):
+        with lock:
+            calls.append((symbol, model_type))
+        time.sleep(0.2)
+        entry = {'symbol': symbol, 'model_type': model_type}
+        with cache._lock:
+            cache._models[(symbol, model_type)] = entry
+        return entry
+
+    cache.train = train
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get("AAPL", "linear"), range(8)))
+
+    assert calls == [("AAPL", "linear")]
+    assert all(r is results[0] for r in results)
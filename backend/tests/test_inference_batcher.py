@@ -0,0 +1,71 @@
+import threading
+import time
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.inference_batcher import MicroBatcher
+
+
+class GatedModel:
+    """Row sums that hold the first call open until released and reject rows containing NaN"""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, X):
+        self.calls.append(len(X))
+        if len(self.calls) == 1:
+            self.entered.set()
+            self.release.wait(5)
+        if np.isnan(X).any():
+            raise ValueError("bad input")
+        return X.sum(axis=1)
+
+
+def run_as_one_batch(batcher, model, requests):
+    """Predict ``requests`` concurrently while a first call blocks, so they queue into one batch"""
+    with ThreadPoolExecutor(max_workers=len(requests) + 1) as pool:
+        first = pool.submit(batcher.predict, np.zeros((1, 3)))
+        assert model.entered.wait(5)
+        futures = [pool.submit(batcher.predict, rows) for rows in requests]
+        deadline = time.time() + 5
+        while batcher._queue.qsize() < len(requests) and time.time() < deadline:
+            time.sleep(0.001)
+        model.release.set()
+        first.result(5)
+        return futures
+
+
+def test_scatter_returns_each_request_its_own_rows():
+    model = GatedModel()
+    batcher = MicroBatcher(model, max_batch_rows=64)
+    rng = np.random.default_rng(0)
+    requests = [rng.normal(size=(n, 3)) for n in (1, 4, 2, 7, 3)]
+
+    futures = run_as_one_batch(batcher, model, requests)
+
+    for rows, future in zip(requests, futures):
+        np.testing.assert_allclose(future.result(5), rows.sum(axis=1))
+    # One call for the blocking request, then one stacked call for the rest
+    assert model.calls == [1, sum(len(rows) for rows in requests)]
+
+
+def test_failed_batch_only_fails_the_offending_request():
+    model = GatedModel()
+    batcher = MicroBatcher(model, max_batch_rows=64)
+    good = np.ones((2, 3))
+    bad = np.array([[1.0, np.nan, 0.0]])
+    other = np.full((3, 3), 2.0)
+
+    futures = run_as_one_batch(batcher, model, [good, bad, other])
+
+    np.testing.assert_allclose(futures[0].result(5), [3.0, 3.0])
+    with pytest.raises(ValueError, match="bad input"):
+        futures[1].result(5)
+    np.testing.assert_allclose(futures[2].result(5), [6.0, 6.0, 6.0])
+    # The stacked call failed, then each request was predicted on its own
+    assert model.calls == [1, 6, 2, 1, 3]
+    assert batcher.stats()['batches'] == 2
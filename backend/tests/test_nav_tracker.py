@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+
+import utils.nav_tracker as nav_module
+from models.portfolio_model import Portfolio, Transaction
+from utils.nav_tracker import NavTracker
+from utils.portfolio_store import PortfolioStore
+from utils.price_store import PriceStore
+
+DATES = pd.bdate_range("2024-01-01", periods=60)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    prices = PriceStore(root=str(tmp_path))
+    prices._download = lambda symbols, start=None: {}
+    portfolios = PortfolioStore(root=str(tmp_path))
+    monkeypatch.setattr(nav_module, 'price_store', prices)
+    monkeypatch.setattr(nav_module, 'portfolio_store', portfolios)
+
+    rng = np.random.default_rng(3)
+    for symbol in ("AAA", "BBB", "^GSPC"):
+        close = 100 * np.cumprod(1 + rng.normal(0, 0.01, len(DATES)))
+        prices._save(symbol, pd.DataFrame({'Close': close}, index=DATES))
+
+    created = DATES[0].to_pydatetime()
+    portfolio = Portfolio(id="p1", name="test", total_value=10000, cash_balance=0, stocks=[],
+                          created_at=created, updated_at=created, risk_level="moderate")
+    buys = [Transaction(id=f"t{i}", portfolio_id="p1", symbol=symbol, transaction_type="buy",
+                        quantity=40, price=100.0, total_amount=4000.0, fees=1.0,
+                        timestamp=created.replace(hour=10, minute=i))
+            for i, symbol in enumerate(("AAA", "BBB"))]
+    portfolios.save_portfolio(portfolio, 10000, buys)
+    return prices, portfolios, tmp_path
+
+
+def truncate(prices: PriceStore, n: int, full: dict):
+    for symbol, frame in full.items():
+        prices._frames[symbol] = frame.iloc[:n]
+
+
+def test_incremental_updates_match_a_full_build(stores):
+    prices, portfolios, root = stores
+    full = {s: prices._frames[s] for s in ("AAA", "BBB", "^GSPC")}
+
+    incremental = NavTracker(root=str(root / "inc"))
+    for n in (20, 35, 60):
+        truncate(prices, n, full)
+        incremental.update("p1")
+    rebuilt = NavTracker(root=str(root / "full")).update("p1")
+    state = incremental.update("p1")
+
+    assert state.dates == rebuilt.dates
+    np.testing.assert_allclose(state.nav, rebuilt.nav)
+    assert state.m2 == pytest.approx(rebuilt.m2)
+    assert state.co_moment == pytest.approx(rebuilt.co_moment)
+
+    # The series file only ever gained rows, and a fresh tracker reads it back
+    with open(root / "inc" / "nav" / "p1.csv") as f:
+        assert sum(1 for _ in f) == len(DATES)
+    reloaded = NavTracker(root=str(root / "inc"))._load("p1")
+    assert reloaded.dates == state.dates
+    assert reloaded.nav == state.nav
+
+
+def test_backdated_transaction_rewrites_the_series(stores):
+    prices, portfolios, root = stores
+    tracker = NavTracker(root=str(root))
+    tracker.update("p1")
+    portfolios.add_transaction(Transaction(
+        id="late", portfolio_id="p1", symbol="AAA", transaction_type="sell", quantity=10, price=100.0,
+        total_amount=1000.0, fees=1.0, timestamp=datetime.combine(DATES[10].date(), datetime.min.time())))
+
+    state = tracker.update("p1")
+    fresh = NavTracker(root=str(root / "fresh")).update("p1")
+
+    np.testing.assert_allclose(state.nav, fresh.nav)
+    with open(root / "nav" / "p1.csv") as f:
+        assert sum(1 for _ in f) == len(DATES)
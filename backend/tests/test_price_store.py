@@ -0,0 +1,30 @@
+import pandas as pd
+
+from utils.price_store import PriceStore
+
+
+def test_unknown_symbols_are_not_requested_again_within_the_interval(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    calls = []
+
+    def download(symbols, start=None):
+        calls.append(list(symbols))
+        return {}  # what an upstream with no data for any symbol yields
+
+    store._download = download
+    store.refresh(["NOPE1", "NOPE2"])
+    store.refresh(["NOPE1", "NOPE2"])
+    store.refresh(["NOPE2"])
+
+    assert calls == [["NOPE1", "NOPE2"]]
+
+
+def test_stored_symbols_keep_their_original_names(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    frame = pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.bdate_range("2024-01-01", periods=2))
+    for symbol in ("M&M.NS", "^NSEI", "AAPL"):
+        store._save(symbol, frame)
+
+    assert store.stored_symbols() == ["AAPL", "M&M.NS", "^NSEI"]
+    # A new instance reads the names back from disk
+    assert PriceStore(root=str(tmp_path)).stored_symbols() == ["AAPL", "M&M.NS", "^NSEI"]
@@ -0,0 +1,23 @@
+from utils.quote_stream import QuoteHub, Subscriber
+
+
+def test_only_consecutive_drops_evict_a_subscriber():
+    hub = QuoteHub(max_queue=2, max_drops=3)
+    subscriber = Subscriber(set(), hub.max_queue)
+
+    # Falling behind briefly many times: the backlog is drained before the limit each time
+    for _ in range(10):
+        for i in range(hub.max_queue + hub.max_drops):
+            hub._deliver(subscriber, {'price': i})
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        hub._deliver(subscriber, {'price': -1})
+        assert subscriber.dropped == 0
+        assert not subscriber.closed.is_set()
+        subscriber.queue.get_nowait()
+
+    # Staying behind for more than max_drops messages in a row
+    for i in range(hub.max_queue + hub.max_drops + 1):
+        hub._deliver(subscriber, {'price': i})
+    assert subscriber.closed.is_set()
+    assert subscriber.reason == "slow consumer"
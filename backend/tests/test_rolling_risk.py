@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.risk_calculator import RiskCalculator
+from utils.risk_kernel import batch_risk_metrics
+from utils.rolling_risk import RollingRiskEngine
+
+WINDOWS = (21, 63)  # an integer and a fractional VaR position
+
+
+def make_series(kind: str, n: int = 260, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2022-01-03", periods=n)
+    market = rng.normal(0.0004, 0.01, n)
+    returns = 0.8 * market + rng.normal(0.0002, 0.012, n)
+    if kind == "ties":
+        # A coarse grid makes repeated values, including at the VaR quantile
+        returns = np.round(returns / 0.004) * 0.004
+    elif kind == "positive":
+        # A stretch longer than every window with no losing day
+        returns[100:180] = np.abs(returns[100:180]) + 0.0005
+    return pd.Series(returns, index=dates), pd.Series(market, index=dates)
+
+
+def point_metrics(calc: RiskCalculator, returns: pd.Series, market: pd.Series) -> dict:
+    w = len(returns)
+    wealth = pd.concat([pd.Series([1.0]), (1 + returns).cumprod()], ignore_index=True)
+    sortino = calc.calculate_sortino_ratio(returns)
+    return {
+        'annualized_volatility': returns.std() * np.sqrt(252),
+        'sharpe_ratio': calc.calculate_sharpe_ratio(returns),
+        # Fewer than two losing days leave pandas' downside std undefined; the engines report 0
+        'sortino_ratio': sortino if np.isfinite(sortino) else 0.0,
+        'var_95': calc.calculate_var(returns),
+        'cvar_95': calc.calculate_cvar(returns),
+        # calculate_beta divides a sample covariance by a population variance
+        'beta': calc.calculate_beta(returns, market) * (w - 1) / w,
+        'max_drawdown': calc.calculate_max_drawdown(wealth),
+    }
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("kind", ["normal", "ties", "positive"])
+def test_rolling_matches_point_and_batch_metrics(kind, window):
+    returns, market = make_series(kind)
+    calc = RiskCalculator()
+    rolling = RollingRiskEngine(window=window, risk_free_rate=calc.risk_free_rate).compute(returns, market)
+
+    assert len(rolling) == len(returns) - window + 1
+    assert (rolling.index == returns.index[window - 1:]).all()
+
+    windows = np.lib.stride_tricks.sliding_window_view(returns.to_numpy(), window).T
+    market_windows = np.lib.stride_tricks.sliding_window_view(market.to_numpy(), window).T
+    batch = {name: [] for name in rolling.columns}
+    for i in range(windows.shape[1]):
+        # The kernel takes one market series, so each window is its own batch call
+        result = batch_risk_metrics(windows[:, i], market_windows[:, i], risk_free_rate=calc.risk_free_rate)
+        for name in batch:
+            if name in result:
+                batch[name].append(result[name][0])
+
+    for name, values in batch.items():
+        if values:
+            np.testing.assert_allclose(rolling[name].to_numpy(), values, rtol=1e-7, atol=1e-10, err_msg=name)
+
+    for i, end in enumerate(rolling.index):
+        r = returns.iloc[i:i + window]
+        expected = point_metrics(calc, r, market.iloc[i:i + window])
+        for name, value in expected.items():
+            assert rolling[name].iloc[i] == pytest.approx(value, rel=1e-7, abs=1e-10), (name, end)
+
+
+def test_all_positive_windows_have_no_downside():
+    returns, market = make_series("positive")
+    window = 21
+    rolling = RollingRiskEngine(window=window).compute(returns, market)
+    calm = rolling.iloc[100:180 - window + 1]
+
+    assert len(calm) > 0
+    assert (calm['sortino_ratio'] == 0).all()
+    assert (calm['max_drawdown'] == 0).all()
+    assert (calm['drawdown'] == 0).all()
+    assert (calm['var_95'] > 0).all()
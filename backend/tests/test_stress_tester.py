@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import utils.stress_tester as stress_module
+from utils.price_store import PriceStore
+from utils.stress_tester import StressTester
+
+
+def test_short_history_only_shortens_its_own_beta(tmp_path, monkeypatch):
+    prices = PriceStore(root=str(tmp_path))
+    prices._download = lambda symbols, start=None: {}
+    monkeypatch.setattr(stress_module, 'price_store', prices)
+
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2024-01-01", periods=200)
+    market = rng.normal(0, 0.01, len(dates))
+    series = {'^GSPC': market, 'AAA': 1.5 * market + rng.normal(0, 0.002, len(dates)),
+              'BBB': 0.5 * market + rng.normal(0, 0.002, len(dates))}
+    for symbol, returns in series.items():
+        close = pd.Series(100 * np.cumprod(1 + returns), index=dates)
+        if symbol == 'BBB':
+            close = close.iloc[-30:]  # recently listed
+        prices._save(symbol, pd.DataFrame({'Close': close}))
+
+    betas = StressTester().betas(['AAA', 'BBB'])
+
+    full = pd.DataFrame({s: pd.Series(100 * np.cumprod(1 + r), index=dates) for s, r in series.items()}).pct_change()
+    expected_aaa = full['AAA'].cov(full['^GSPC']) / full['^GSPC'].var()
+    recent = full.iloc[-29:]
+    expected_bbb = recent['BBB'].cov(recent['^GSPC']) / recent['^GSPC'].var()
+    np.testing.assert_allclose(betas, [expected_aaa, expected_bbb])
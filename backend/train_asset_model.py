@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Script to train and save the per-asset scoring model
+
+Trains on the daily bars of every listing in data/symbols.csv (downloaded
+into the price store on first run) and saves asset_scoring_model.pkl.
+"""
+
+import pandas as pd
+
+from utils.symbol_search import SYMBOL_MASTER
+from utils.asset_scoring import AssetScoringModel, ASSET_MODEL_PATH
+
+if __name__ == "__main__":
+    print("🚀 Training Per-Asset Scoring Model")
+    print("=" * 60)
+
+    master = pd.read_csv(SYMBOL_MASTER, dtype=str)
+    symbols = master.loc[master['exchange'] != 'INDEX', 'symbol'].tolist()
+    print(f"\n📚 Building rolling features for {len(symbols)} symbols (10y of bars)...")
+
+    model = AssetScoringModel()
+    metrics = model.train(symbols, period="10y")
+
+    print(f"\n✅ Training Complete!")
+    print(f"📊 Samples: {metrics['samples']:,}")
+    print(f"   Holdout from: {metrics['holdout_start']} ({metrics['purged_samples']:,} samples purged before it)")
+    print(f"   - Rank IC: {metrics['holdout_rank_ic']:.4f}")
+    print(f"   - R² Score: {metrics['holdout_r2']:.4f}")
+    print(f"   Score scale: {metrics['scale']:.4f}")
+
+    print("\n💾 Saving model...")
+    model.save(ASSET_MODEL_PATH)
+    print(f"   Saved to {ASSET_MODEL_PATH}")
+
+    print("\n🧪 Testing allocation...")
+    sample = symbols[:12]
+    allocation = model.allocate(sample)
+    for ticker in sample:
+        print(f"   {ticker:<15} {allocation['weights'][ticker]:.2%}  (score {allocation['scores'][ticker]:+.4f})")
+
+    print("\n✅ Per-asset model is ready to use for any set of tickers!")
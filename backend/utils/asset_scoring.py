@@ -0,0 +1,167 @@
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Dict, Optional, Tuple
+from sklearn.ensemble import RandomForestRegressor
+
+from utils.price_store import price_store
+from utils.ml_features import ENHANCED_FEATURE_NAMES, benchmark_for, rolling_ticker_features, latest_feature_rows
+
+ASSET_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'asset_scoring_model.pkl')
+
+
+# Score scale used when a model was saved without a fitted one
+DEFAULT_SCORE_SCALE = 0.05
+
+
+def scores_to_weights(scores: np.ndarray, scale: float = DEFAULT_SCORE_SCALE) -> np.ndarray:
+    """
+    Long-only weights from per-asset scores.
+
+    A softmax of the raw scores divided by ``scale``: an asset scored one
+    ``scale`` above another gets e times its weight, so weights follow the
+    size of the predicted gaps and stay near equal when the scores are close.
+    """
+    scores = np.asarray(scores, dtype=float)
+    weights = np.exp((scores - scores.max()) / scale)
+    return weights / weights.sum()
+
+
+class AssetScoringModel:
+    """
+    Per-asset allocation model that works for any set of tickers.
+
+    Each asset is scored on its own 19-feature row (the per-ticker block of
+    ``prepare_enhanced_features``, measured against its market benchmark), so
+    a portfolio of N assets is one (N x 19) predict and cost grows linearly
+    with N. The forest learns an asset's forward return relative to the
+    other assets on the same date from rolling features over the price
+    store; scores become weights through ``scores_to_weights``, with a
+    ``scale`` fitted to the spread of the training targets unless one is given.
+    """
+
+    def __init__(self, model=None, lookback: int = 252, horizon: int = 21, scale: Optional[float] = None):
+        self.model = model
+        self.lookback = lookback
+        self.horizon = horizon
+        self.scale = scale
+        self.trained_at: Optional[float] = None
+
+    def training_set(self, symbols: List[str], period: str = "10y",
+                     step: int = 5) -> Tuple[np.ndarray, np.ndarray, pd.DatetimeIndex, np.ndarray]:
+        """
+        Feature rows and cross-sectionally demeaned forward returns, sampled
+        every ``step`` dates, with each sample's date and trading-day position
+        """
+        price_store.refresh(list(symbols) + sorted({benchmark_for(s) for s in symbols}))
+        features, targets = {}, {}
+        for symbol in symbols:
+            prices = price_store.get_prices([benchmark_for(symbol), symbol], period=period)
+            if symbol not in prices or benchmark_for(symbol) not in prices or \
+                    len(prices) < self.lookback + self.horizon:
+                continue
+            rows = rolling_ticker_features(prices, symbol, self.lookback)
+            close = prices[symbol]
+            features[symbol] = rows
+            targets[symbol] = (close.shift(-self.horizon) / close - 1).reindex(rows.index)
+        if not features:
+            raise ValueError("Not enough price history to build a training set")
+
+        forward = pd.DataFrame(targets)
+        relative = forward.sub(forward.mean(axis=1), axis=0)
+        dates = forward.index[::step]
+
+        X, y, when = [], [], []
+        for symbol, rows in features.items():
+            sample = rows.reindex(dates).to_numpy(dtype=float)
+            target = relative[symbol].reindex(dates).to_numpy(dtype=float)
+            valid = np.isfinite(sample).all(axis=1) & np.isfinite(target)
+            X.append(sample[valid])
+            y.append(target[valid])
+            when.append(dates[valid])
+        order = np.argsort(np.concatenate([d.values for d in when]), kind='stable')
+        dates_all = pd.DatetimeIndex(np.concatenate([d.values for d in when])[order])
+        return np.vstack(X)[order], np.concatenate(y)[order], dates_all, forward.index.get_indexer(dates_all)
+
+    def train(self, symbols: List[str], period: str = "10y", step: int = 5, holdout: float = 0.2) -> Dict:
+        """
+        Fit on the price store; the metrics come from a forest fitted on the
+        earlier dates and scored on the last ``holdout`` share before the final
+        refit. Samples whose ``horizon``-day target reaches into the holdout
+        dates are purged from the check forest's training slice.
+        """
+        X, y, dates, positions = self.training_set(symbols, period, step)
+        split = int(len(X) * (1 - holdout))
+        # Start the holdout on a date boundary so no date is on both sides
+        split = int(np.searchsorted(positions, positions[split])) if split < len(X) else split
+        purged = int(np.searchsorted(positions, positions[split] - self.horizon)) if split < len(X) else split
+
+        def forest():
+            return RandomForestRegressor(n_estimators=200, max_depth=8, min_samples_leaf=20,
+                                         max_features='sqrt', random_state=42, n_jobs=-1)
+
+        check = forest().fit(X[:purged], y[:purged])
+        predicted = check.predict(X[split:])
+        rank_ic = pd.Series(predicted).corr(pd.Series(y[split:]), method='spearman')
+
+        self.model = forest().fit(X, y)
+        if self.scale is None:
+            # One cross-sectional standard deviation of relative returns is worth a factor e
+            self.scale = float(y.std())
+        # Inference batches are one row per asset: a single thread beats fanning out
+        self.model.n_jobs = 1
+        self.trained_at = time.time()
+        return {
+            'samples': len(X),
+            'purged_samples': split - purged,
+            'symbols': len(symbols),
+            'holdout_start': dates[split].strftime('%Y-%m-%d') if split < len(dates) else None,
+            'holdout_rank_ic': float(rank_ic),
+            'holdout_r2': float(check.score(X[split:], y[split:])),
+            'scale': self.scale
+        }
+
+    def predict_scores(self, features: np.ndarray) -> np.ndarray:
+        """Scores of an (assets x 19) feature block in one predict call"""
+        if self.model is None:
+            raise ValueError("Asset scoring model is not trained")
+        return self.model.predict(np.asarray(features, dtype=float).reshape(-1, len(ENHANCED_FEATURE_NAMES)))
+
+    def allocate(self, tickers: List[str], predict: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> Dict:
+        """
+        Weights, scores and feature dates for any list of tickers; ``predict``
+        replaces ``predict_scores`` (e.g. with a micro-batcher)
+        """
+        kept, as_of, rows = latest_feature_rows(tickers, self.lookback)
+        missing = [t for t in tickers if t not in kept]
+        if missing:
+            raise ValueError(f"Not enough price history for: {missing}")
+        order = [kept.index(t) for t in tickers]
+        scores = (predict or self.predict_scores)(rows[order])
+        weights = scores_to_weights(scores, self.scale or DEFAULT_SCORE_SCALE)
+        return {
+            'weights': {t: float(w) for t, w in zip(tickers, weights)},
+            'scores': {t: float(s) for t, s in zip(tickers, scores)},
+            'as_of': {t: as_of[i] for t, i in zip(tickers, order)}
+        }
+
+    def save(self, path: str = ASSET_MODEL_PATH):
+        joblib.dump({
+            'model': self.model,
+            'feature_names': ENHANCED_FEATURE_NAMES,
+            'lookback': self.lookback,
+            'horizon': self.horizon,
+            'scale': self.scale,
+            'trained_at': self.trained_at
+        }, path)
+
+    @classmethod
+    def load(cls, path: str = ASSET_MODEL_PATH) -> 'AssetScoringModel':
+        data = joblib.load(path)
+        instance = cls(data['model'], lookback=data['lookback'], horizon=data['horizon'],
+                       scale=data.get('scale'))
+        instance.trained_at = data['trained_at']
+        return instance
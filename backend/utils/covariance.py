@@ -0,0 +1,296 @@
+import os
+import hashlib
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+from utils.price_store import DATA_DIR
+
+
+class CovarianceEstimator:
+    """
+    Base class for covariance estimators with incremental updates.
+
+    Estimators keep sufficient statistics of daily returns, so appending one
+    new return row costs O(N²) instead of recomputing from the full O(T·N²)
+    history. The rows of the current window are kept as well, so when the
+    window's start moves forward the rows leaving it are removed from the
+    statistics in O(N²) each; the estimate always equals a fresh fit on the
+    window passed to ``sync``.
+    """
+
+    method = None
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = list(symbols)
+        self.n_obs = 0
+        self.last_date = None
+        self.window = pd.DataFrame(columns=self.symbols, dtype=float)
+
+    def partial_fit(self, X: np.ndarray):
+        """Fold a (rows x assets) block of returns into the statistics"""
+        raise NotImplementedError
+
+    def remove(self, X: np.ndarray):
+        """Take the oldest (rows x assets) block of the window back out of the statistics"""
+        raise NotImplementedError
+
+    def _daily_covariance(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def fit(self, returns: pd.DataFrame) -> 'CovarianceEstimator':
+        """Estimate from scratch on a returns DataFrame"""
+        self.__init__(self.symbols)
+        return self.sync(returns)
+
+    def update(self, row, date) -> 'CovarianceEstimator':
+        """Add a single return row in O(N²)"""
+        row = pd.DataFrame([np.asarray(row, dtype=float)], index=[pd.Timestamp(date)], columns=self.symbols)
+        return self._append(row)
+
+    def span(self):
+        """First and last date of the window the statistics cover"""
+        return (self.window.index[0], self.last_date) if not self.window.empty else None
+
+    def _append(self, rows: pd.DataFrame) -> 'CovarianceEstimator':
+        self.partial_fit(rows.to_numpy(dtype=float))
+        self.window = rows if self.window.empty else pd.concat([self.window, rows])
+        self.last_date = pd.Timestamp(rows.index[-1])
+        return self
+
+    def sync(self, returns: pd.DataFrame) -> 'CovarianceEstimator':
+        """
+        Bring the statistics to the window of ``returns``: rows before its
+        first date are removed and rows after the last one seen are added.
+        A window that starts earlier or ends earlier than the stored one is refit.
+        """
+        returns = returns[self.symbols].dropna()
+        if returns.empty:
+            return self
+        first = returns.index[0]
+        if not self.window.empty:
+            if first < self.window.index[0] or returns.index[-1] < self.last_date:
+                return self.fit(returns)
+            leaving = self.window[self.window.index < first]
+            if len(leaving) >= self.n_obs:
+                return self.fit(returns)
+            if not leaving.empty:
+                self.remove(leaving.to_numpy(dtype=float))
+                self.window = self.window[self.window.index >= first]
+            returns = returns[returns.index > self.last_date]
+        if not returns.empty:
+            self._append(returns)
+        return self
+
+    def covariance(self, frequency: int = 252) -> pd.DataFrame:
+        """Annualized covariance matrix"""
+        if self.n_obs < 2:
+            raise ValueError("Not enough observations to estimate covariance")
+        cov = self._daily_covariance() * frequency
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+
+class SampleCovariance(CovarianceEstimator):
+    """Unbiased sample covariance maintained with a batched Welford update"""
+
+    method = "sample"
+
+    def __init__(self, symbols: List[str]):
+        super().__init__(symbols)
+        n = len(self.symbols)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros((n, n))
+
+    def partial_fit(self, X: np.ndarray):
+        n_b = X.shape[0]
+        mean_b = X.mean(axis=0)
+        centered = X - mean_b
+        n_a = self.n_obs
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        self.m2 += centered.T @ centered + np.outer(delta, delta) * (n_a * n_b / total)
+        self.mean += delta * (n_b / total)
+        self.n_obs = total
+
+    def remove(self, X: np.ndarray):
+        # The batched Welford merge run backwards
+        n_b = X.shape[0]
+        mean_b = X.mean(axis=0)
+        centered = X - mean_b
+        total = self.n_obs
+        n_a = total - n_b
+        mean_a = (self.mean * total - mean_b * n_b) / n_a
+        delta = mean_b - mean_a
+        self.m2 -= centered.T @ centered + np.outer(delta, delta) * (n_a * n_b / total)
+        self.mean = mean_a
+        self.n_obs = n_a
+
+    def _daily_covariance(self) -> np.ndarray:
+        return self.m2 / (self.n_obs - 1)
+
+
+class LedoitWolfCovariance(CovarianceEstimator):
+    """
+    Ledoit-Wolf shrinkage towards a scaled identity.
+
+    Keeps raw power sums up to fourth order so the shrinkage intensity can be
+    recomputed exactly (same formula as scikit-learn) after every update.
+    """
+
+    method = "ledoit_wolf"
+
+    def __init__(self, symbols: List[str]):
+        super().__init__(symbols)
+        n = len(self.symbols)
+        self.s1 = np.zeros(n)        # sum x_i
+        self.s2 = np.zeros(n)        # sum x_i^2
+        self.s11 = np.zeros((n, n))  # sum x_i x_j
+        self.s21 = np.zeros((n, n))  # sum x_i^2 x_j
+        self.s22 = np.zeros((n, n))  # sum x_i^2 x_j^2
+        self.shrinkage = 0.0
+
+    def partial_fit(self, X: np.ndarray):
+        X2 = X ** 2
+        self.s1 += X.sum(axis=0)
+        self.s2 += X2.sum(axis=0)
+        self.s11 += X.T @ X
+        self.s21 += X2.T @ X
+        self.s22 += X2.T @ X2
+        self.n_obs += X.shape[0]
+
+    def remove(self, X: np.ndarray):
+        X2 = X ** 2
+        self.s1 -= X.sum(axis=0)
+        self.s2 -= X2.sum(axis=0)
+        self.s11 -= X.T @ X
+        self.s21 -= X2.T @ X
+        self.s22 -= X2.T @ X2
+        self.n_obs -= X.shape[0]
+
+    def _daily_covariance(self) -> np.ndarray:
+        n = self.n_obs
+        p = len(self.symbols)
+        m = self.s1 / n
+        mi, mj = m[:, None], m[None, :]
+        emp_cov = self.s11 / n - np.outer(m, m)
+
+        # sum_t (x_ti - m_i)^2 (x_tj - m_j)^2 expanded in terms of the raw sums
+        centered_22 = (self.s22 - 2 * mj * self.s21 - 2 * mi * self.s21.T
+                       + mj ** 2 * self.s2[:, None] + mi ** 2 * self.s2[None, :]
+                       + 4 * mi * mj * self.s11
+                       - 2 * mi * mj ** 2 * self.s1[:, None] - 2 * mi ** 2 * mj * self.s1[None, :]
+                       + n * mi ** 2 * mj ** 2)
+
+        trace = np.trace(emp_cov)
+        mu = trace / p
+        delta = np.sum(emp_cov ** 2)
+        beta = (centered_22.sum() / n - delta) / (p * n)
+        delta = (delta - 2 * mu * trace + p * mu ** 2) / p
+        beta = min(beta, delta)
+        self.shrinkage = 0.0 if beta <= 0 else beta / delta
+
+        shrunk = (1 - self.shrinkage) * emp_cov
+        shrunk.flat[::p + 1] += self.shrinkage * mu
+        return shrunk
+
+
+class EWMACovariance(CovarianceEstimator):
+    """Exponentially weighted (RiskMetrics style, zero-mean) covariance"""
+
+    method = "ewma"
+
+    def __init__(self, symbols: List[str], decay: float = 0.94):
+        super().__init__(symbols)
+        n = len(self.symbols)
+        self.decay = decay
+        self.cov = np.zeros((n, n))
+        self.weight = 0.0  # Total weight seen, used to de-bias short histories
+
+    def fit(self, returns: pd.DataFrame) -> 'EWMACovariance':
+        self.__init__(self.symbols, self.decay)
+        return self.sync(returns)
+
+    def partial_fit(self, X: np.ndarray):
+        n_b = X.shape[0]
+        lam = self.decay
+        # Row k of the block is discounted by lam^(n_b - 1 - k)
+        w = (1 - lam) * lam ** np.arange(n_b - 1, -1, -1)
+        carry = lam ** n_b
+        self.cov = carry * self.cov + (X * w[:, None]).T @ X
+        self.weight = carry * self.weight + w.sum()
+        self.n_obs += n_b
+
+    def remove(self, X: np.ndarray):
+        # The oldest rows of the window: row k currently carries lam^(n_obs - 1 - k)
+        n_b = X.shape[0]
+        w = (1 - self.decay) * self.decay ** (self.n_obs - 1 - np.arange(n_b))
+        self.cov -= (X * w[:, None]).T @ X
+        self.weight -= w.sum()
+        self.n_obs -= n_b
+
+    def _daily_covariance(self) -> np.ndarray:
+        return self.cov / self.weight
+
+
+ESTIMATORS = {
+    SampleCovariance.method: SampleCovariance,
+    LedoitWolfCovariance.method: LedoitWolfCovariance,
+    EWMACovariance.method: EWMACovariance,
+}
+
+
+class CovarianceStore:
+    """
+    Persists estimator state under ``data/covariance`` next to the price store.
+
+    A request only folds in the return rows that arrived since the estimator
+    was last saved and removes the rows that dropped out of its window, so the
+    cost per call is O(changed_rows·N²) and the result does not depend on
+    which windows were requested before.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.join(root or DATA_DIR, 'covariance')
+        self._estimators: Dict[str, CovarianceEstimator] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, symbols: List[str], method: str) -> str:
+        digest = hashlib.md5(','.join(symbols).encode()).hexdigest()[:16]
+        return f"{method}_{digest}"
+
+    def get_estimator(self, returns: pd.DataFrame, method: str = "sample") -> CovarianceEstimator:
+        """Load (or create) the estimator for these columns and sync it with ``returns``"""
+        if method not in ESTIMATORS:
+            raise ValueError(f"Unknown covariance method: {method}")
+        symbols = list(returns.columns)
+        key = self._key(symbols, method)
+        path = os.path.join(self.root, key + '.pkl')
+
+        with self._lock:
+            estimator = self._estimators.get(key)
+            if estimator is None and os.path.exists(path):
+                estimator = joblib.load(path)
+            if estimator is None or estimator.symbols != symbols or not hasattr(estimator, 'window'):
+                estimator = ESTIMATORS[method](symbols).fit(returns)
+            else:
+                window = estimator.span()
+                estimator.sync(returns)
+                if estimator.span() == window:
+                    self._estimators[key] = estimator
+                    return estimator
+
+            os.makedirs(self.root, exist_ok=True)
+            joblib.dump(estimator, path)
+            self._estimators[key] = estimator
+            return estimator
+
+    def get_covariance(self, returns: pd.DataFrame, method: str = "sample",
+                       frequency: int = 252) -> pd.DataFrame:
+        """Annualized covariance for the columns of ``returns``"""
+        return self.get_estimator(returns, method).covariance(frequency)
+
+
+# Shared store so every caller reuses the same persisted estimators
+covariance_store = CovarianceStore()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+# LTTB keeps the first and last points plus at least one bucket
+MIN_POINTS = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Positions kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; the points in between are
+    split into ``n_out - 2`` buckets and each bucket keeps the point forming
+    the largest triangle with the previously kept point and the average of
+    the next bucket. Bucket bounds and averages are computed for all buckets
+    at once; only the argmax that depends on the previous choice is a loop.
+    """
+    n = len(y)
+    if n_out >= n or n_out < MIN_POINTS:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n_buckets = n_out - 2
+    edges = np.floor(np.linspace(1, n - 1, n_buckets + 1)).astype(np.int64)
+
+    # Average point of every bucket, plus the last point as the final "next bucket"
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(n_buckets):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[previous] - avg_x[b + 1]) * (by - y[previous])
+                      - (x[previous] - bx) * (avg_y[b + 1] - y[previous]))
+        previous = lo + int(np.argmax(area))
+        kept[b + 1] = previous
+    return kept
+
+
+def downsample_bars(frame: pd.DataFrame, max_points: Optional[int], column: Optional[str] = None) -> pd.DataFrame:
+    """Reduce daily bars to at most ``max_points`` rows, shaped by the close price"""
+    if not max_points or len(frame) <= max_points:
+        return frame
+    if column is None:
+        column = 'Adj Close' if 'Adj Close' in frame else 'Close'
+    values = frame[column].ffill().bfill().to_numpy(dtype=float)
+    x = frame.index.values.astype('datetime64[D]').astype(np.int64)
+    return frame.iloc[lttb_indices(x, values, max_points)]
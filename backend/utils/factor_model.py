@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+
+class FactorRiskModel:
+    """
+    Statistical factor risk model: Σ = B·diag(f)·Bᵀ + diag(d).
+
+    B is an (N x K) loading matrix, f the K factor variances and d the N
+    specific variances, all annualized. Portfolio variance and its gradient
+    are evaluated in O(N·K) and the dense N x N covariance is never formed,
+    which keeps optimization over several hundred assets tractable.
+    """
+
+    def __init__(self, symbols: List[str], loadings: np.ndarray, factor_variances: np.ndarray,
+                 specific_variances: np.ndarray):
+        self.symbols = list(symbols)
+        self.loadings = loadings
+        self.factor_variances = factor_variances
+        self.specific_variances = specific_variances
+
+    @property
+    def n_factors(self) -> int:
+        return self.loadings.shape[1]
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, n_factors: Optional[int] = None,
+                     explained_variance: float = 0.6, frequency: int = 252) -> 'FactorRiskModel':
+        """
+        Estimate the model by PCA on a (days x assets) returns DataFrame.
+
+        If ``n_factors`` is not given, the smallest number of components that
+        explains ``explained_variance`` of total variance is used (capped at 20).
+        """
+        returns = returns.dropna()
+        X = returns.to_numpy(dtype=float)
+        n_obs, n_assets = X.shape
+        if n_obs < 3:
+            raise ValueError("Not enough observations to fit a factor model")
+        X = X - X.mean(axis=0)
+
+        # Thin SVD of the centered returns gives the principal components directly
+        _, singular_values, vt = np.linalg.svd(X, full_matrices=False)
+        component_variances = singular_values ** 2 / (n_obs - 1)
+
+        if n_factors is None:
+            explained = np.cumsum(component_variances) / component_variances.sum()
+            n_factors = int(np.searchsorted(explained, explained_variance) + 1)
+            n_factors = min(n_factors, 20)
+        n_factors = max(1, min(n_factors, len(component_variances) - 1))
+
+        loadings = vt[:n_factors].T
+        factor_variances = component_variances[:n_factors]
+        total_variances = (X ** 2).sum(axis=0) / (n_obs - 1)
+        systematic = (loadings ** 2) @ factor_variances
+        # Floor keeps the model positive definite when K captures nearly everything
+        specific_variances = np.maximum(total_variances - systematic, 1e-4 * total_variances.mean())
+
+        return cls(list(returns.columns), loadings, factor_variances * frequency,
+                   specific_variances * frequency)
+
+    def subset(self, symbols: List[str]) -> 'FactorRiskModel':
+        """Restrict the model to a subset of its assets"""
+        idx = [self.symbols.index(s) for s in symbols]
+        return FactorRiskModel(symbols, self.loadings[idx], self.factor_variances,
+                               self.specific_variances[idx])
+
+    def factor_exposures(self, weights: np.ndarray) -> np.ndarray:
+        """Portfolio exposure to each factor (Bᵀw)"""
+        return self.loadings.T @ weights
+
+    def variance(self, weights: np.ndarray) -> float:
+        """Portfolio variance wᵀΣw in O(N·K)"""
+        exposures = self.factor_exposures(weights)
+        return float(np.dot(exposures ** 2, self.factor_variances)
+                     + np.dot(self.specific_variances, weights ** 2))
+
+    def volatility(self, weights: np.ndarray) -> float:
+        return float(np.sqrt(self.variance(weights)))
+
+    def variance_gradient(self, weights: np.ndarray) -> np.ndarray:
+        """Gradient of the portfolio variance, 2Σw, in O(N·K)"""
+        exposures = self.factor_exposures(weights)
+        return 2 * (self.loadings @ (self.factor_variances * exposures)
+                    + self.specific_variances * weights)
+
+    def risk_decomposition(self, weights: np.ndarray) -> Dict:
+        """Split portfolio variance into systematic and specific parts plus per-asset contributions"""
+        weights = np.asarray(weights, dtype=float)
+        exposures = self.factor_exposures(weights)
+        systematic = float(np.dot(exposures ** 2, self.factor_variances))
+        specific = float(np.dot(self.specific_variances, weights ** 2))
+        total = systematic + specific
+        # w_i * (Σw)_i sums to the total variance
+        contributions = weights * self.variance_gradient(weights) / 2
+        return {
+            'volatility': float(np.sqrt(total)),
+            'systematic_volatility': float(np.sqrt(systematic)),
+            'specific_volatility': float(np.sqrt(specific)),
+            'systematic_share': systematic / total if total > 0 else 0,
+            'factor_exposures': exposures.tolist(),
+            'risk_contributions': dict(zip(self.symbols, (contributions / total if total > 0
+                                                          else contributions).tolist()))
+        }
@@ -0,0 +1,126 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from utils.price_store import price_store
+from utils.forecaster import FORECAST_FEATURES, MODEL_TYPES, prepare_features, fit_forecast_model, horizon_matrix
+
+
+def fold_ends(n_rows: int, initial_train: int, horizon: int, step: int,
+              max_folds: Optional[int] = None) -> List[int]:
+    """Training-set sizes of each walk-forward fold, keeping the most recent ``max_folds``"""
+    ends = list(range(initial_train, n_rows - horizon + 1, step))
+    return ends[-max_folds:] if max_folds else ends
+
+
+def _backtest_symbol(task: Tuple) -> Dict:
+    """
+    Expanding-window backtest of one model type on one symbol's feature table.
+
+    Each fold fits on rows ``[0, end)`` and forecasts the next ``horizon``
+    closes the way ``/predict`` does (indicators held at the last training row).
+    """
+    symbol, model_type, features, ends, horizon = task
+    X_all = features[FORECAST_FEATURES].to_numpy(dtype=float)
+    close = features['Close'].to_numpy(dtype=float)
+
+    errors, actuals, directions = [], [], []
+    fit_seconds = predict_seconds = 0.0
+    for end in ends:
+        started = time.perf_counter()
+        model, _ = fit_forecast_model(model_type, features.iloc[:end])
+        fit_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        predicted = model.predict(horizon_matrix(X_all[end - 1], horizon))
+        predict_seconds += time.perf_counter() - started
+
+        actual = close[end:end + horizon]
+        errors.append(predicted - actual)
+        actuals.append(actual)
+        directions.append(np.sign(predicted[-1] - close[end - 1]) == np.sign(actual[-1] - close[end - 1]))
+
+    errors = np.concatenate(errors)
+    actuals = np.concatenate(actuals)
+    return {
+        'symbol': symbol,
+        'model_type': model_type,
+        'n_folds': len(ends),
+        'mae': float(np.abs(errors).mean()),
+        'mape': float(np.abs(errors / actuals).mean() * 100),
+        'directional_accuracy': float(np.mean(directions)),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds
+    }
+
+
+class ForecastBacktester:
+    """
+    Walk-forward evaluation of the forecast model types across many symbols.
+
+    The MA/volatility feature table of each symbol is built once and shared by
+    every fold and model type; (symbol, model type) jobs run on a process pool.
+    Reports MAE, MAPE and directional accuracy of the horizon-end forecast
+    together with fit and predict time, per symbol and aggregated per model type.
+    """
+
+    def __init__(self, horizon: int = 21, initial_train: int = 250, step: int = 21,
+                 max_folds: Optional[int] = 24, max_workers: Optional[int] = None):
+        self.horizon = horizon
+        self.initial_train = initial_train
+        self.step = step
+        self.max_folds = max_folds
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def feature_tables(self, symbols: List[str], period: str) -> Dict[str, pd.DataFrame]:
+        price_store.refresh(symbols)
+        tables = {}
+        for symbol in symbols:
+            hist = price_store.get_history(symbol, period=period)
+            if not hist.empty:
+                tables[symbol] = prepare_features(hist)
+        return tables
+
+    def run(self, symbols: List[str], model_types: Optional[List[str]] = None, period: str = "5y") -> Dict:
+        model_types = model_types or list(MODEL_TYPES)
+        unknown = [m for m in model_types if m not in MODEL_TYPES]
+        if unknown:
+            raise ValueError(f"Unknown model types: {unknown}")
+
+        tables = self.feature_tables(symbols, period)
+        tasks, skipped = [], []
+        for symbol in symbols:
+            features = tables.get(symbol)
+            ends = fold_ends(len(features), self.initial_train, self.horizon, self.step,
+                             self.max_folds) if features is not None else []
+            if not ends:
+                skipped.append(symbol)
+                continue
+            tasks.extend((symbol, model_type, features, ends, self.horizon) for model_type in model_types)
+
+        if len(tasks) > 1 and self.max_workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as pool:
+                results = list(pool.map(_backtest_symbol, tasks))
+        else:
+            results = [_backtest_symbol(task) for task in tasks]
+
+        summary = {}
+        for model_type in model_types:
+            rows = [r for r in results if r['model_type'] == model_type]
+            if not rows:
+                continue
+            folds = sum(r['n_folds'] for r in rows)
+            summary[model_type] = {
+                'symbols': len(rows),
+                'folds': folds,
+                'mae': float(np.mean([r['mae'] for r in rows])),
+                'mape': float(np.mean([r['mape'] for r in rows])),
+                'directional_accuracy': float(np.average([r['directional_accuracy'] for r in rows],
+                                                         weights=[r['n_folds'] for r in rows])),
+                'fit_ms_per_fold': sum(r['fit_seconds'] for r in rows) / folds * 1000,
+                'predict_ms_per_fold': sum(r['predict_seconds'] for r in rows) / folds * 1000
+            }
+        return {'summary': summary, 'results': results, 'skipped_symbols': skipped}
@@ -0,0 +1,238 @@
+import os
+import re
+import logging
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor
+
+from utils.price_store import DATA_DIR, price_store
+
+FORECAST_FEATURES = ['Days', 'MA_10', 'MA_30', 'Volatility']
+MODEL_TYPES = ("linear", "random_forest")
+
+FORECAST_MODES = ("direct", "recursive")
+
+# Minimum number of complete feature rows needed to fit a model
+MIN_TRAINING_ROWS = 50
+
+# Closes kept with a fitted model to seed recursive forecasts (longest feature window)
+SEED_WINDOW = 30
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_features(hist: pd.DataFrame) -> pd.DataFrame:
+    """Day counter, 10/30-day moving averages and 10-day volatility of the close"""
+    frame = hist[['Close']].copy()
+    frame['Days'] = range(len(frame))
+    frame['MA_10'] = frame['Close'].rolling(window=10).mean()
+    frame['MA_30'] = frame['Close'].rolling(window=30).mean()
+    frame['Volatility'] = frame['Close'].rolling(window=10).std()
+    return frame.dropna()
+
+
+def fit_forecast_model(model_type: str, features: pd.DataFrame):
+    """Fit a price regression on prepared features and return (model, in-sample R^2)"""
+    X = features[FORECAST_FEATURES].values
+    y = features['Close'].values
+    if model_type == "random_forest":
+        model = RandomForestRegressor(n_estimators=100, random_state=42)
+    else:
+        model = LinearRegression()
+    model.fit(X, y)
+    return model, model.score(X, y)
+
+
+class ForecastModelCache:
+    """
+    Fitted forecast models per (symbol, model type), tagged with the last bar they saw.
+
+    A request for a model whose bar is still the latest is pure inference. When
+    the price store has a newer bar, the cached model keeps serving while a
+    retrain runs in the background (one at a time per key); only a symbol
+    that has never been fitted is trained in the request. Models are also
+    persisted under ``data/forecast_models`` so restarts start warm.
+
+    History loading runs on the ``io_executor`` threads (which also bound how
+    many symbols are worked on at once) and model fitting on a process pool,
+    so CPU-bound forest fits for different symbols run on separate cores.
+    """
+
+    def __init__(self, root: Optional[str] = None, history_period: str = "2y", max_workers: int = 2,
+                 io_workers: int = 8, fit_workers: Optional[int] = None):
+        self.root = os.path.join(root or DATA_DIR, 'forecast_models')
+        self.history_period = history_period
+        self.fit_workers = fit_workers or os.cpu_count() or 1
+        self._models: Dict[Tuple[str, str], Dict] = {}
+        self._pending = set()
+        self._training: Dict[Tuple[str, str], Future] = {}  # First fits in flight, shared by concurrent callers
+        self._lock = threading.Lock()
+        self._fit_pool: Optional[ProcessPoolExecutor] = None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forecast-train")
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="forecast-io")
+
+    def fit_pool(self) -> ProcessPoolExecutor:
+        """Process pool for model fitting, started on first use"""
+        with self._lock:
+            if self._fit_pool is None:
+                self._fit_pool = ProcessPoolExecutor(max_workers=self.fit_workers)
+            return self._fit_pool
+
+    def _path(self, key: Tuple[str, str]) -> str:
+        symbol, model_type = key
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', symbol) + f'__{model_type}.pkl')
+
+    def _load(self, key: Tuple[str, str]) -> Optional[Dict]:
+        if key in self._models:
+            return self._models[key]
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        entry = joblib.load(path)
+        self._models[key] = entry
+        return entry
+
+    def train(self, symbol: str, model_type: str) -> Optional[Dict]:
+        """Fit on the stored history and cache the result; None if history is too short"""
+        hist = price_store.get_history(symbol, period=self.history_period)
+        if hist.empty:
+            return None
+        features = prepare_features(hist)
+        if len(features) < MIN_TRAINING_ROWS:
+            return None
+        model, score = self.fit_pool().submit(fit_forecast_model, model_type, features).result()
+        last = features.iloc[-1]
+        entry = {
+            'model': model,
+            'model_type': model_type,
+            'last_bar': hist.index[-1],
+            'last_features': last[FORECAST_FEATURES].to_numpy(dtype=float),
+            'current_price': float(last['Close']),
+            'recent_close': hist['Close'].to_numpy(dtype=float)[-SEED_WINDOW:],
+            'score': float(score),
+            'trained_at': time.time()
+        }
+        key = (symbol, model_type)
+        with self._lock:
+            self._models[key] = entry
+        os.makedirs(self.root, exist_ok=True)
+        joblib.dump(entry, self._path(key))
+        return entry
+
+    def _retrain(self, key: Tuple[str, str]):
+        try:
+            self.train(*key)
+        except Exception:
+            logger.exception("Background retrain of %s (%s) failed", *key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _train_once(self, key: Tuple[str, str]) -> Optional[Dict]:
+        """First fit of a key; concurrent callers wait for the same fit instead of starting their own"""
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            future = self._training.get(key)
+            owner = future is None
+            if owner:
+                future = self._training[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            entry = self.train(*key)
+            future.set_result(entry)
+            return entry
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._training.pop(key, None)
+
+    def get(self, symbol: str, model_type: str) -> Optional[Dict]:
+        """Cached model for a symbol, scheduling a background retrain if a newer bar exists"""
+        key = (symbol, model_type)
+        entry = self._load(key)
+        if entry is None:
+            return self._train_once(key)
+
+        latest = price_store.get_history(symbol, period="5d")
+        if not latest.empty and latest.index[-1] > entry['last_bar']:
+            with self._lock:
+                if key not in self._pending:
+                    self._pending.add(key)
+                    self.executor.submit(self._retrain, key)
+        return entry
+
+
+def horizon_matrix(last_features: np.ndarray, days: int) -> np.ndarray:
+    """(days x features) inputs for the next ``days`` days with the latest indicators held fixed"""
+    X = np.tile(last_features, (days, 1))
+    X[:, 0] = last_features[0] + np.arange(1, days + 1)
+    return X
+
+
+def predict_direct(entries: Dict[str, Dict], days: int) -> Dict[str, np.ndarray]:
+    """
+    Whole-horizon forecasts for several symbols.
+
+    The horizon matrices of all symbols are stacked once and every fitted
+    model predicts its block of rows in a single call.
+    """
+    symbols = list(entries)
+    if not symbols:
+        return {}
+    X = np.vstack([horizon_matrix(entries[s]['last_features'], days) for s in symbols])
+    return {symbol: entries[symbol]['model'].predict(X[i * days:(i + 1) * days])
+            for i, symbol in enumerate(symbols)}
+
+
+def predict_recursive(entries: Dict[str, Dict], days: int) -> Dict[str, np.ndarray]:
+    """
+    Multi-step forecasts that feed each prediction back into the indicators.
+
+    A (symbols x 30) window of closes is rolled forward one day at a time and
+    MA_10, MA_30 and volatility are recomputed for all symbols at once. When
+    every model is linear the prediction itself is a dot product, so the
+    whole recursion runs in NumPy without predict calls.
+    """
+    symbols = list(entries)
+    if not symbols:
+        return {}
+    window = np.vstack([entries[s]['recent_close'][-SEED_WINDOW:] for s in symbols])
+    day = np.array([entries[s]['last_features'][0] for s in symbols])
+    models = [entries[s]['model'] for s in symbols]
+    linear = all(isinstance(m, LinearRegression) for m in models)
+    if linear:
+        coef = np.vstack([m.coef_ for m in models])
+        intercept = np.array([m.intercept_ for m in models])
+
+    out = np.empty((len(symbols), days))
+    for t in range(days):
+        recent = window[:, -10:]
+        features = np.column_stack([day + t + 1, recent.mean(axis=1), window.mean(axis=1),
+                                    recent.std(axis=1, ddof=1)])
+        if linear:
+            step = np.einsum('ij,ij->i', features, coef) + intercept
+        else:
+            step = np.array([m.predict(features[i:i + 1])[0] for i, m in enumerate(models)])
+        out[:, t] = step
+        window = np.column_stack([window[:, 1:], step])
+    return {symbol: out[i] for i, symbol in enumerate(symbols)}
+
+
+def predict_horizons(entries: Dict[str, Dict], days: int, mode: str = "direct") -> Dict[str, np.ndarray]:
+    if mode not in FORECAST_MODES:
+        raise ValueError(f"Unknown forecast mode: {mode}")
+    return predict_recursive(entries, days) if mode == "recursive" else predict_direct(entries, days)
+
+
+# Shared so every forecast request reuses fitted models
+forecast_models = ForecastModelCache()
@@ -0,0 +1,94 @@
+import numpy as np
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+from typing import Optional
+
+
+def correlation_distance(cov_matrix: np.ndarray) -> np.ndarray:
+    """Distance matrix sqrt((1 - ρ) / 2) derived from a covariance matrix"""
+    std = np.sqrt(np.diag(cov_matrix))
+    corr = cov_matrix / np.outer(std, std)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    dist = np.sqrt(0.5 * (1.0 - corr))
+    np.fill_diagonal(dist, 0.0)
+    return dist
+
+
+def quasi_diagonal_order(cov_matrix: np.ndarray, linkage_method: str = "single") -> np.ndarray:
+    """Order assets so that correlated ones sit next to each other"""
+    if cov_matrix.shape[0] < 2:
+        return np.arange(cov_matrix.shape[0])
+    dist = correlation_distance(cov_matrix)
+    links = linkage(squareform(dist, checks=False), method=linkage_method)
+    return leaves_list(links)
+
+
+def apply_weight_bounds(weights: np.ndarray, min_weight: float = 0.0,
+                        max_weight: Optional[float] = None) -> np.ndarray:
+    """
+    Clip weights into [min_weight, max_weight] keeping the sum at one.
+
+    Excess (or shortfall) is redistributed pro rata over the assets that are
+    not yet at a bound; this terminates in at most N passes.
+    """
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    n = len(weights)
+    lower = min(min_weight, 1.0 / n)
+    upper = 1.0 if max_weight is None else max(max_weight, 1.0 / n)
+    fixed = np.zeros(n, dtype=bool)
+
+    for _ in range(n):
+        clipped = np.clip(weights, lower, upper)
+        newly_fixed = (clipped != weights) & ~fixed
+        if not newly_fixed.any():
+            break
+        fixed |= newly_fixed
+        weights = clipped
+        free = ~fixed
+        remaining = 1.0 - weights[fixed].sum()
+        if not free.any():
+            break
+        free_total = weights[free].sum()
+        if free_total > 0:
+            weights[free] *= remaining / free_total
+        else:
+            weights[free] = remaining / free.sum()
+    return weights
+
+
+def hrp_weights(cov_matrix: np.ndarray, min_weight: float = 0.0, max_weight: Optional[float] = None,
+                linkage_method: str = "single") -> np.ndarray:
+    """
+    Hierarchical risk parity weights (Lopez de Prado, 2016).
+
+    Assets are clustered on the correlation distance, ordered quasi-diagonally
+    and weighted by recursive bisection with inverse-variance cluster risk.
+    Everything is closed form, so the runtime is deterministic and the result
+    always exists for a covariance matrix with a positive diagonal.
+    """
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    n = cov_matrix.shape[0]
+    order = quasi_diagonal_order(cov_matrix, linkage_method)
+    weights = np.ones(n)
+    inv_var = 1.0 / np.diag(cov_matrix)
+
+    def cluster_variance(items: np.ndarray) -> float:
+        w = inv_var[items] / inv_var[items].sum()
+        return float(w @ cov_matrix[np.ix_(items, items)] @ w)
+
+    clusters = [order]
+    while clusters:
+        next_clusters = []
+        for cluster in clusters:
+            if len(cluster) < 2:
+                continue
+            half = len(cluster) // 2
+            left, right = cluster[:half], cluster[half:]
+            left_var, right_var = cluster_variance(left), cluster_variance(right)
+            alpha = 1.0 - left_var / (left_var + right_var)
+            weights[left] *= alpha
+            weights[right] *= 1.0 - alpha
+            next_clusters.extend([left, right])
+        clusters = next_clusters
+
+    return apply_weight_bounds(weights, min_weight, max_weight)
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+import numpy as np
+from bisect import bisect_left
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+WAIT_MS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class Histogram:
+    """Bucket counts (value <= bound, plus an overflow bucket) with count and sum"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict:
+        buckets = {f"{bound:g}": n for bound, n in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            'buckets': buckets,
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else None
+        }
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a model's ``predict``.
+
+    Callers block on ``predict`` while a single worker thread stacks the rows
+    of every queued request into one array, makes one predict call and
+    scatters each request's slice of the output back to it. Requests that
+    arrive while a batch is running form the next batch. The worker only
+    holds a batch open (up to ``max_wait_ms``, or until ``max_batch_rows``)
+    after it has just seen concurrent traffic, so a lone request at low load
+    is predicted straight away. If the stacked predict raises, each request
+    is retried on its own so one bad input only fails its own caller. Queue
+    depth, batch size and queue wait are recorded as histograms.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch_rows: int = 64,
+                 max_wait_ms: float = 2.0, timeout: float = 30.0):
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future, float]]" = queue.Queue()
+        self._last_batch = 1
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.batches = 0
+        self.batch_requests = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_rows = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    def start(self):
+        """Start the batching worker once"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+                self._thread.start()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Model output for the rows of ``features``, computed as part of a shared batch"""
+        rows = np.atleast_2d(np.asarray(features, dtype=float))
+        future: Future = Future()
+        self.start()
+        self._queue.put((rows, future, time.perf_counter()))
+        return future.result(timeout=self.timeout)
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future, float]]:
+        batch = [self._queue.get()]
+        depth = self._queue.qsize()
+        n_rows = len(batch[0][0])
+        # Hold the batch open only while traffic is concurrent
+        deadline = time.perf_counter() + self.max_wait if self._last_batch > 1 else None
+        while n_rows < self.max_batch_rows:
+            try:
+                if deadline is None:
+                    item = self._queue.get_nowait()
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        with self._stats_lock:
+            self.queue_depth.observe(depth)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._last_batch = len(batch)
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_requests.observe(len(batch))
+                self.batch_rows.observe(sum(len(rows) for rows, _, _ in batch))
+                for _, _, enqueued in batch:
+                    self.wait_ms.observe((started - enqueued) * 1000)
+
+            try:
+                X = batch[0][0] if len(batch) == 1 else np.vstack([rows for rows, _, _ in batch])
+                output = np.asarray(self.predict_fn(X))
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self._run_each(batch)
+                continue
+
+            offset = 0
+            for rows, future, _ in batch:
+                future.set_result(output[offset:offset + len(rows)])
+                offset += len(rows)
+
+    def _run_each(self, batch: List[Tuple[np.ndarray, Future, float]]):
+        """Predict each request of a failed batch on its own, so only the offending caller gets the error"""
+        for rows, future, _ in batch:
+            try:
+                future.set_result(np.asarray(self.predict_fn(rows)))
+            except Exception as e:
+                future.set_exception(e)
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'queue_depth': self._queue.qsize(),
+                'max_batch_rows': self.max_batch_rows,
+                'max_wait_ms': self.max_wait * 1000,
+                'histograms': {
+                    'queue_depth': self.queue_depth.snapshot(),
+                    'batch_requests': self.batch_requests.snapshot(),
+                    'batch_rows': self.batch_rows.snapshot(),
+                    'wait_ms': self.wait_ms.snapshot()
+                }
+            }
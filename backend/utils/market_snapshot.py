@@ -0,0 +1,92 @@
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+from typing import List, Dict, Optional
+
+# S&P 500, Dow, NASDAQ, Russell 2000 and VIX
+MARKET_INDICES = ["^GSPC", "^DJI", "^IXIC", "^RUT", "^VIX"]
+
+
+class MarketSnapshot:
+    """
+    In-memory snapshot of index quotes kept fresh by a background thread.
+
+    Readers always get the last complete snapshot without touching the
+    network (stale-while-revalidate): a refresh replaces the snapshot
+    atomically when it succeeds, and a failed refresh leaves the previous
+    snapshot in place. The routers start the thread at application startup;
+    until the first refresh succeeds ``get`` raises instead of waiting.
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, interval: float = 60):
+        self.symbols = symbols or MARKET_INDICES
+        self.interval = interval
+        self._snapshot: Dict = {'quotes': {}, 'updated_at': None, 'error': None}
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _fetch(self) -> Dict[str, Dict]:
+        """Latest close and change for every index in one download"""
+        raw = yf.download(self.symbols, period="5d", group_by='ticker', auto_adjust=False,
+                          progress=False, threads=True)
+        quotes = {}
+        if raw is None or raw.empty:
+            return quotes
+        for symbol in self.symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    continue
+                close = raw[symbol]['Close'].dropna()
+            else:
+                close = raw['Close'].dropna()
+            if close.empty:
+                continue
+            current = float(close.iloc[-1])
+            previous = float(close.iloc[-2]) if len(close) > 1 else current
+            quotes[symbol] = {
+                'price': current,
+                'previous_close': previous,
+                'change': current - previous,
+                'change_percent': (current - previous) / previous * 100 if previous else 0.0,
+                'as_of': close.index[-1].strftime('%Y-%m-%d')
+            }
+        return quotes
+
+    def refresh(self):
+        """Fetch new quotes and swap them in, keeping the old ones on failure"""
+        try:
+            quotes = self._fetch()
+            if quotes:
+                self._snapshot = {'quotes': quotes, 'updated_at': time.time(), 'error': None}
+            else:
+                self._snapshot = {**self._snapshot, 'error': "No index data returned"}
+        except Exception as e:
+            self._snapshot = {**self._snapshot, 'error': str(e)}
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start the background refresher once"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="market-snapshot", daemon=True)
+                self._thread.start()
+
+    def get(self) -> Dict:
+        """Current snapshot with its age; never blocks (RuntimeError until the first load succeeds)"""
+        self.start()
+        snapshot = self._snapshot
+        updated_at = snapshot['updated_at']
+        if updated_at is None:
+            raise RuntimeError(f"Market data is not ready yet: {snapshot['error']}" if snapshot['error']
+                               else "Market data is not ready yet")
+        age = time.time() - updated_at
+        return {**snapshot, 'age_seconds': age, 'stale': age > 2 * self.interval}
+
+
+# Shared by /market/indices and /market-sentiment
+market_snapshot = MarketSnapshot()
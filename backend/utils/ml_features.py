@@ -0,0 +1,310 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import List, Tuple
+
+from utils.price_store import price_store
+from utils.rolling_risk import DrawdownQueue
+
+# Per-ticker features of the enhanced model, in training order
+ENHANCED_FEATURE_NAMES = [
+    'return', 'vol', 'sharpe', 'mom3m', 'mom1m', 'mom1w', 'volratio', 'realvol', 'skew', 'kurt',
+    'maxdd', 'currdd', 'sma20', 'sma50', 'smaratio', 'rsi', 'mktcorr', 'beta', 'priceperc'
+]
+
+# Width of the basic model's input (6 stocks x 6 features)
+BASIC_FEATURE_WIDTH = 36
+
+# Fewest aligned bars needed for a per-symbol feature row
+MIN_FEATURE_ROWS = 63
+
+
+def benchmark_for(symbol: str) -> str:
+    """Market proxy for the correlation and beta features: NIFTY 50 for NSE/BSE listings, else the S&P 500"""
+    return "^NSEI" if symbol.endswith(('.NS', '.BO')) else "^GSPC"
+
+
+def prepare_ml_features(price_df):
+    """Prepare features for basic ML model prediction."""
+    features = []
+    returns = price_df.pct_change().dropna()
+    
+    # Calculate features for each stock
+    for ticker in price_df.columns:
+        # Basic statistics
+        ret = returns[ticker]
+        ann_ret = ret.mean() * 252
+        ann_vol = ret.std() * np.sqrt(252)
+        sharpe = ann_ret / ann_vol if ann_vol > 0 else 0
+        
+        # Additional features
+        skew = stats.skew(ret)
+        kurt = stats.kurtosis(ret)
+        var_95 = np.percentile(ret, 5)
+        
+        # Add to features
+        features.extend([
+            ann_ret, ann_vol, sharpe, 
+            float(skew), float(kurt), float(var_95)
+        ])
+    
+    # Ensure we have exactly 36 features (6 stocks * 6 features each)
+    max_features = 36
+    features = features[:max_features]  # Truncate if too many
+    features.extend([0] * (max_features - len(features)))  # Pad with zeros
+    
+    return np.array(features).reshape(1, -1)
+
+def prepare_enhanced_features(price_df, tickers):
+    """
+    Prepare 171 features for enhanced ML model prediction.
+    This matches the exact feature calculation from EnhancedPortfolioModel training.
+    
+    Features per ticker (19 total):
+    1. return, 2. vol, 3. sharpe, 4. mom3m, 5. mom1m, 6. mom1w,
+    7. volratio, 8. realvol, 9. skew, 10. kurt, 11. maxdd, 12. currdd,
+    13. sma20, 14. sma50, 15. smaratio, 16. rsi, 17. mktcorr, 18. beta, 19. priceperc
+    """
+    features = []
+    returns = price_df.pct_change().dropna()
+    
+    for ticker in tickers:
+        if ticker not in price_df.columns:
+            # If ticker not in data, add zeros for all features
+            features.extend([0] * 19)
+            continue
+            
+        prices = price_df[ticker]
+        ret = returns[ticker]
+        
+        # 1. Annual return
+        ann_ret = ret.mean() * 252
+        
+        # 2. Volatility
+        ann_vol = ret.std() * np.sqrt(252)
+        
+        # 3. Sharpe ratio
+        sharpe = ann_ret / ann_vol if ann_vol > 0 else 0
+        
+        # 4-6. Momentum (3m, 1m, 1w)
+        mom_3m = (prices.iloc[-1] / prices.iloc[-63] - 1) if len(prices) >= 63 else 0
+        mom_1m = (prices.iloc[-1] / prices.iloc[-21] - 1) if len(prices) >= 21 else 0
+        mom_1w = (prices.iloc[-1] / prices.iloc[-5] - 1) if len(prices) >= 5 else 0
+        
+        # 7. Volatility ratio (recent vs long-term)
+        recent_vol = ret.iloc[-21:].std() if len(ret) >= 21 else ann_vol
+        vol_ratio = recent_vol / ann_vol if ann_vol > 0 else 1
+        
+        # 8. Realized volatility
+        real_vol = ret.std() * np.sqrt(252)
+        
+        # 9-10. Skewness and Kurtosis
+        skew = float(stats.skew(ret))
+        kurt = float(stats.kurtosis(ret))
+        
+        # 11-12. Drawdown
+        cumulative = (1 + ret).cumprod()
+        running_max = cumulative.cummax()
+        drawdown = (cumulative / running_max - 1)
+        max_dd = float(drawdown.min())
+        curr_dd = float(drawdown.iloc[-1])
+        
+        # 13-15. Moving averages (normalized values)
+        sma_20 = prices.rolling(20).mean().iloc[-1] if len(prices) >= 20 else prices.iloc[-1]
+        sma_50 = prices.rolling(50).mean().iloc[-1] if len(prices) >= 50 else prices.iloc[-1]
+        # Normalize SMAs relative to current price
+        sma_20_norm = (sma_20 - prices.iloc[-1]) / prices.iloc[-1] if prices.iloc[-1] > 0 else 0
+        sma_50_norm = (sma_50 - prices.iloc[-1]) / prices.iloc[-1] if prices.iloc[-1] > 0 else 0
+        sma_ratio = sma_20 / sma_50 if sma_50 > 0 else 1
+        
+        # 16. RSI (normalized to 0-1 range)
+        delta = prices.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        rs = gain / loss if len(gain) >= 14 and loss.iloc[-1] != 0 else 1
+        rsi = (100 - (100 / (1 + rs.iloc[-1]))) / 100 if len(gain) >= 14 else 0.5
+        
+        # 17. Market correlation (use first ticker as proxy)
+        mkt_corr = ret.corr(returns.iloc[:, 0]) if len(returns.columns) > 1 else 0
+        
+        # 18. Beta (vs market proxy)
+        cov = ret.cov(returns.iloc[:, 0]) if len(returns.columns) > 1 else 0
+        mkt_var = returns.iloc[:, 0].var()
+        beta = cov / mkt_var if mkt_var > 0 else 1
+        
+        # 19. Price percentile (current price vs historical range)
+        price_min = prices.min()
+        price_max = prices.max()
+        price_perc = (prices.iloc[-1] - price_min) / (price_max - price_min) if price_max > price_min else 0.5
+        
+        # Add all 19 features for this ticker (matching training feature order)
+        # Order: return, vol, sharpe, mom3m, mom1m, mom1w, volratio, realvol, skew, kurt, 
+        #        maxdd, currdd, sma20, sma50, smaratio, rsi, mktcorr, beta, priceperc
+        features.extend([
+            ann_ret, ann_vol, sharpe, mom_3m, mom_1m, mom_1w,
+            vol_ratio, real_vol, skew, kurt, max_dd, curr_dd,
+            sma_20_norm, sma_50_norm, sma_ratio, rsi, mkt_corr, beta, price_perc
+        ])
+    
+    return np.array(features).reshape(1, -1)
+
+
+def _rolling_max_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """Maximum drawdown of every ``window``-long stretch of a positive series"""
+    out = np.full(len(values), np.nan)
+    queue = DrawdownQueue()
+    for i, value in enumerate(values):
+        queue.push(value)
+        if i >= window:
+            queue.pop()
+        if i >= window - 1:
+            out[i] = queue.max_drawdown()
+    return out
+
+
+def _unbias_moments(skew: pd.Series, kurt: pd.Series, n: int):
+    """Convert pandas' bias-corrected rolling skew/kurtosis to the biased scipy estimators"""
+    g1 = skew * (n - 2) / np.sqrt(n * (n - 1))
+    g2 = (kurt * (n - 2) * (n - 3) / (n - 1) - 6) / (n + 1)
+    return g1, g2
+
+
+def rolling_ml_features(price_df: pd.DataFrame, lookback: int) -> pd.DataFrame:
+    """
+    ``prepare_ml_features`` for every date at once.
+
+    Row ``t`` equals the basic model's input built from the ``lookback``
+    prices ending at ``t``; the first complete window is the first row.
+    """
+    window = lookback - 1
+    returns = price_df.pct_change()
+    columns = []
+    for ticker in price_df.columns:
+        rolling = returns[ticker].rolling(window)
+        ann_ret = rolling.mean() * 252
+        ann_vol = rolling.std() * np.sqrt(252)
+        sharpe = (ann_ret / ann_vol).where(ann_vol > 0, 0.0)
+        skew, kurt = _unbias_moments(rolling.skew(), rolling.kurt(), window)
+        columns.extend([ann_ret, ann_vol, sharpe, skew, kurt, rolling.quantile(0.05)])
+
+    columns = columns[:BASIC_FEATURE_WIDTH]
+    values = np.zeros((len(price_df), BASIC_FEATURE_WIDTH))
+    if columns:
+        values[:, :len(columns)] = np.column_stack([c.to_numpy(dtype=float) for c in columns])
+    return pd.DataFrame(values, index=price_df.index).iloc[lookback - 1:]
+
+
+def rolling_ticker_features(price_df: pd.DataFrame, ticker: str, lookback: int) -> pd.DataFrame:
+    """The 19 enhanced-model features of one ticker for every date (first column is the market proxy)"""
+    window = lookback - 1
+    prices = price_df[ticker]
+    returns = price_df.pct_change()
+    ret = returns[ticker]
+    rolling = ret.rolling(window)
+
+    ann_ret = rolling.mean() * 252
+    ann_vol = rolling.std() * np.sqrt(252)
+    sharpe = (ann_ret / ann_vol).where(ann_vol > 0, 0.0)
+    zeros = pd.Series(0.0, index=prices.index)
+
+    def momentum(days):
+        return prices / prices.shift(days - 1) - 1 if lookback >= days else zeros
+
+    recent_vol = ret.rolling(21).std() if window >= 21 else ann_vol
+    vol_ratio = (recent_vol / ann_vol).where(ann_vol > 0, 1.0)
+    skew, kurt = _unbias_moments(rolling.skew(), rolling.kurt(), window)
+
+    # The drawdown curve starts at the second price of the window
+    max_dd = pd.Series(_rolling_max_drawdown(prices.to_numpy(dtype=float), window), index=prices.index)
+    curr_dd = prices / prices.rolling(window).max() - 1
+
+    sma_20 = prices.rolling(20).mean() if lookback >= 20 else prices
+    sma_50 = prices.rolling(50).mean() if lookback >= 50 else prices
+    sma_20_norm = ((sma_20 - prices) / prices).where(prices > 0, 0.0)
+    sma_50_norm = ((sma_50 - prices) / prices).where(prices > 0, 0.0)
+    sma_ratio = (sma_20 / sma_50).where(sma_50 > 0, 1.0)
+
+    if lookback >= 14:
+        delta = prices.diff()
+        gain = delta.clip(lower=0).rolling(14).mean()
+        loss = (-delta).clip(lower=0).rolling(14).mean()
+        # A window without losses is a full-strength RSI rather than an error
+        rsi = (1 - 1 / (1 + gain / loss)).where(loss != 0, 1.0)
+    else:
+        rsi = zeros + 0.5
+
+    market = returns.iloc[:, 0]
+    mkt_var = market.rolling(window).var()
+    if len(price_df.columns) > 1:
+        mkt_corr = rolling.corr(market)
+        beta = (rolling.cov(market) / mkt_var).where(mkt_var > 0, 1.0)
+    else:
+        mkt_corr = zeros
+        beta = zeros.where(mkt_var > 0, 1.0)
+
+    price_min = prices.rolling(lookback).min()
+    price_max = prices.rolling(lookback).max()
+    price_perc = ((prices - price_min) / (price_max - price_min)).where(price_max > price_min, 0.5)
+
+    frame = pd.concat([
+        ann_ret, ann_vol, sharpe, momentum(63), momentum(21), momentum(5),
+        vol_ratio, ann_vol, skew, kurt, max_dd, curr_dd,
+        sma_20_norm, sma_50_norm, sma_ratio, rsi, mkt_corr, beta, price_perc
+    ], axis=1)
+    frame.columns = ENHANCED_FEATURE_NAMES
+    return frame.iloc[lookback - 1:]
+
+
+def rolling_enhanced_features(price_df: pd.DataFrame, tickers: List[str], lookback: int) -> pd.DataFrame:
+    """
+    ``prepare_enhanced_features`` for every date at once.
+
+    Row ``t`` equals the enhanced model's input built from the ``lookback``
+    prices ending at ``t``, computed with rolling windows instead of one
+    feature build per date. Tickers without prices get zero columns.
+    """
+    index = price_df.index[lookback - 1:]
+    blocks = []
+    for ticker in tickers:
+        if ticker in price_df.columns:
+            blocks.append(rolling_ticker_features(price_df, ticker, lookback).to_numpy(dtype=float))
+        else:
+            blocks.append(np.zeros((len(index), len(ENHANCED_FEATURE_NAMES))))
+    return pd.DataFrame(np.hstack(blocks), index=index)
+
+
+def weights_from_predictions(predicted: np.ndarray, columns: List[int]) -> np.ndarray:
+    """
+    Rows of model outputs turned into weights the way ``/optimize`` does.
+
+    The selected outputs are clipped at zero and normalized; a row with
+    nothing positive falls back to equal weights.
+    """
+    weights = np.maximum(np.asarray(predicted, dtype=float)[:, columns], 0)
+    total = weights.sum(axis=1, keepdims=True)
+    return np.where(total > 0, weights / np.where(total > 0, total, 1), 1.0 / len(columns))
+
+
+def latest_feature_rows(symbols: List[str], lookback: int = 252) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Latest 19 enhanced features of each symbol on its own, against ``benchmark_for(symbol)``.
+
+    Returns the symbols that had enough history, the date of each row and a
+    (symbols x 19) array. Prices are refreshed in one bulk call first; a
+    symbol whose benchmark has no stored prices is skipped rather than
+    scored without its market features.
+    """
+    price_store.refresh(list(symbols) + sorted({benchmark_for(s) for s in symbols}))
+    kept, as_of, rows = [], [], []
+    for symbol in symbols:
+        try:
+            prices = price_store.get_prices([benchmark_for(symbol), symbol], period="2y")
+            if symbol not in prices or benchmark_for(symbol) not in prices or len(prices) < MIN_FEATURE_ROWS:
+                continue
+            prices = prices.iloc[-lookback:]
+            rows.append(prepare_enhanced_features(prices, [symbol])[0])
+        except Exception:
+            continue
+        kept.append(symbol)
+        as_of.append(prices.index[-1].strftime('%Y-%m-%d'))
+    return kept, as_of, np.asarray(rows, dtype=float).reshape(-1, len(ENHANCED_FEATURE_NAMES))
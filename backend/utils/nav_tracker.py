@@ -0,0 +1,268 @@
+import os
+import csv
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+from models.portfolio_model import Transaction
+from utils.price_store import DATA_DIR, price_store
+from utils.portfolio_store import portfolio_store, apply_transaction
+
+
+SERIES_FIELDS = ('dates', 'nav', 'returns')
+
+
+class NavState:
+    """Persisted NAV series of one portfolio plus running statistics over it"""
+
+    def __init__(self, initial_cash: float, start_date: pd.Timestamp):
+        self.start_date = start_date
+        self.initial_cash = initial_cash
+        self.cash = initial_cash
+        self.positions: Dict[str, int] = {}
+        self.last_close: Dict[str, float] = {}
+        self.applied = 0  # Number of transactions already folded into positions
+        self.dates: List[pd.Timestamp] = []
+        self.nav: List[float] = []
+        self.returns: List[float] = []
+        # Welford accumulators for the daily returns and their co-moment with the market
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.n_market = 0
+        self.market_mean = 0.0
+        self.portfolio_mean = 0.0
+        self.market_m2 = 0.0
+        self.co_moment = 0.0
+        self.market_close: Optional[float] = None
+        # Drawdown and year-to-date state
+        self.peak = initial_cash
+        self.max_drawdown = 0.0
+        self.year: Optional[int] = None
+        self.year_open_nav = initial_cash
+
+    def __getstate__(self):
+        # The series is persisted separately, in an append-only file
+        return {k: v for k, v in self.__dict__.items() if k not in SERIES_FIELDS}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in SERIES_FIELDS:
+            self.__dict__.setdefault(name, [])
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return self.dates[-1] if self.dates else None
+
+    def apply_transactions(self, transactions: List[Transaction], date: pd.Timestamp):
+        """Fold in every not yet applied transaction dated on or before ``date``"""
+        while self.applied < len(transactions) and \
+                pd.Timestamp(transactions[self.applied].timestamp.date()) <= date:
+            t = transactions[self.applied]
+            self.cash = apply_transaction(self.positions, self.cash, t)
+            self.last_close.setdefault(t.symbol, t.price)
+            self.applied += 1
+
+    def append(self, date: pd.Timestamp, closes: Dict[str, float], market_close: Optional[float]):
+        """Append one bar in O(number of holdings)"""
+        for symbol, close in closes.items():
+            if not np.isnan(close):
+                self.last_close[symbol] = close
+        nav = self.cash + sum(qty * self.last_close.get(symbol, 0.0)
+                              for symbol, qty in self.positions.items())
+
+        previous_nav = self.nav[-1] if self.nav else self.initial_cash
+        if self.year != date.year:
+            self.year = date.year
+            self.year_open_nav = previous_nav
+
+        daily_return = nav / previous_nav - 1 if previous_nav > 0 else 0.0
+        self.n += 1
+        delta = daily_return - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (daily_return - self.mean)
+
+        if market_close is not None and not np.isnan(market_close):
+            if self.market_close is not None and self.dates:
+                market_return = market_close / self.market_close - 1
+                self.n_market += 1
+                dm = market_return - self.market_mean
+                self.market_mean += dm / self.n_market
+                dp = daily_return - self.portfolio_mean
+                self.portfolio_mean += dp / self.n_market
+                self.market_m2 += dm * (market_return - self.market_mean)
+                self.co_moment += dm * (daily_return - self.portfolio_mean)
+            self.market_close = market_close
+
+        self.peak = max(self.peak, nav)
+        self.max_drawdown = min(self.max_drawdown, nav / self.peak - 1)
+        self.dates.append(date)
+        self.nav.append(nav)
+        self.returns.append(daily_return)
+
+
+class NavTracker:
+    """
+    Maintains each portfolio's daily NAV incrementally.
+
+    State lives under ``data/nav``: a small pickle of running statistics and
+    an append-only CSV of the NAV series. A call only processes bars newer
+    than the last one stored, fetching them in one bulk read outside the
+    lock, and performance metrics are read from running statistics in O(1).
+    A transaction dated before the last processed bar triggers a one-off
+    rebuild.
+    """
+
+    def __init__(self, root: Optional[str] = None, market_symbol: str = "^GSPC",
+                 risk_free_rate: float = 0.02):
+        self.root = os.path.join(root or DATA_DIR, 'nav')
+        self.market_symbol = market_symbol
+        self.risk_free_rate = risk_free_rate
+        self._states: Dict[str, NavState] = {}
+        self._series_rows: Dict[str, int] = {}  # Rows in each series file
+        self._lock = threading.Lock()
+
+    def _path(self, portfolio_id: str) -> str:
+        return os.path.join(self.root, f"{portfolio_id}.pkl")
+
+    def _series_path(self, portfolio_id: str) -> str:
+        return os.path.join(self.root, f"{portfolio_id}.csv")
+
+    def _load(self, portfolio_id: str) -> Optional[NavState]:
+        if portfolio_id in self._states:
+            return self._states[portfolio_id]
+        path = self._path(portfolio_id)
+        if not os.path.exists(path):
+            return None
+        state = joblib.load(path)
+        series_path = self._series_path(portfolio_id)
+        if os.path.exists(series_path):
+            with open(series_path, newline='') as f:
+                rows = list(csv.reader(f))
+            self._series_rows[portfolio_id] = len(rows)
+            # Rows beyond the statistics come from an interrupted save
+            rows = rows[:state.n]
+            state.dates = [pd.Timestamp(date) for date, _, _ in rows]
+            state.nav = [float(nav) for _, nav, _ in rows]
+            state.returns = [float(r) for _, _, r in rows]
+        self._states[portfolio_id] = state
+        return state
+
+    def _save(self, portfolio_id: str, state: NavState, appended: int):
+        """Append the new bars to the series file (rewritten after a rebuild) and store the statistics"""
+        os.makedirs(self.root, exist_ok=True)
+        first = len(state.nav) - appended
+        mode = 'a' if self._series_rows.get(portfolio_id) == first else 'w'
+        if mode == 'w':
+            first = 0
+        with open(self._series_path(portfolio_id), mode, newline='') as f:
+            writer = csv.writer(f)
+            for i in range(first, len(state.nav)):
+                writer.writerow([state.dates[i].strftime('%Y-%m-%d'), repr(state.nav[i]), repr(state.returns[i])])
+        self._series_rows[portfolio_id] = len(state.nav)
+        tmp_path = self._path(portfolio_id) + '.tmp'
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, self._path(portfolio_id))
+
+    def _new_state(self, portfolio_id: str) -> NavState:
+        portfolio = portfolio_store.get_portfolio(portfolio_id)
+        start = pd.Timestamp(portfolio.created_at.date())
+        return NavState(portfolio_store.get_initial_cash(portfolio_id), start)
+
+    def _current(self, portfolio_id: str, transactions: List[Transaction]) -> NavState:
+        """Stored state, or a fresh one when a transaction predates its last bar"""
+        state = self._load(portfolio_id)
+        pending = transactions[state.applied:] if state is not None else []
+        if state is None or (state.last_date is not None and any(
+                pd.Timestamp(t.timestamp.date()) <= state.last_date for t in pending)):
+            state = self._new_state(portfolio_id)
+        return state
+
+    @staticmethod
+    def _next_date(state: NavState) -> pd.Timestamp:
+        return state.last_date + pd.Timedelta(days=1) if state.last_date is not None else state.start_date
+
+    def _closes(self, symbols: List[str], start: pd.Timestamp):
+        """Holding closes from ``start`` on (NaN where a symbol has no bar) and the market close on those dates"""
+        wanted = symbols + [self.market_symbol] if self.market_symbol not in symbols else symbols
+        prices = price_store.get_prices(wanted, field='Close', start=start.strftime('%Y-%m-%d'), align=False)
+        closes = prices[[s for s in symbols if s in prices]].dropna(how='all')
+        market_close = prices[self.market_symbol].reindex(closes.index) if self.market_symbol in prices else None
+        return closes, market_close
+
+    def update(self, portfolio_id: str) -> NavState:
+        """Append any bars that arrived since the last update"""
+        while True:
+            transactions = portfolio_store.get_transactions(portfolio_id)
+            with self._lock:
+                start = self._next_date(self._current(portfolio_id, transactions))
+            # Prices are read without the lock so readers never wait on a download
+            closes, market_close = self._closes(sorted({t.symbol for t in transactions}), start)
+
+            with self._lock:
+                state = self._current(portfolio_id, transactions)
+                next_date = self._next_date(state)
+                if next_date < start:
+                    # A backdated transaction forced a rebuild meanwhile: fetch from the earlier date
+                    continue
+                closes = closes[closes.index >= next_date]
+                if not closes.empty:
+                    for date, row in closes.iterrows():
+                        state.apply_transactions(transactions, date)
+                        state.append(date, row.to_dict(),
+                                     market_close.loc[date] if market_close is not None else None)
+                    self._save(portfolio_id, state, len(closes))
+                self._states[portfolio_id] = state
+                return state
+
+    def performance(self, portfolio_id: str) -> Dict:
+        """Performance metrics from the running NAV statistics"""
+        state = self.update(portfolio_id)
+        if not state.nav:
+            nav = state.initial_cash
+            return {
+                'portfolio_id': portfolio_id,
+                'nav': nav,
+                'total_return': 0.0, 'total_return_percent': 0.0,
+                'daily_return': 0.0, 'daily_return_percent': 0.0,
+                'ytd_return': 0.0, 'volatility': 0.0, 'sharpe_ratio': 0.0,
+                'max_drawdown': 0.0, 'beta': 0.0, 'alpha': 0.0,
+                'as_of': None
+            }
+
+        nav = state.nav[-1]
+        total_return = nav / state.initial_cash - 1 if state.initial_cash > 0 else 0.0
+        daily_return = state.returns[-1]
+        volatility = np.sqrt(state.m2 / (state.n - 1) * 252) if state.n > 1 else 0.0
+        annual_return = state.mean * 252
+        sharpe = (annual_return - self.risk_free_rate) / volatility if volatility > 0 else 0.0
+        beta = state.co_moment / state.market_m2 if state.market_m2 > 0 else 0.0
+        market_return = state.market_mean * 252
+        alpha = annual_return - (self.risk_free_rate + beta * (market_return - self.risk_free_rate))
+
+        return {
+            'portfolio_id': portfolio_id,
+            'nav': nav,
+            'total_return': total_return,
+            'total_return_percent': total_return * 100,
+            'daily_return': daily_return,
+            'daily_return_percent': daily_return * 100,
+            'ytd_return': nav / state.year_open_nav - 1 if state.year_open_nav > 0 else 0.0,
+            'volatility': float(volatility),
+            'sharpe_ratio': float(sharpe),
+            'max_drawdown': state.max_drawdown,
+            'beta': beta,
+            'alpha': alpha,
+            'as_of': state.last_date.strftime('%Y-%m-%d')
+        }
+
+    def nav_series(self, portfolio_id: str) -> pd.Series:
+        """Full stored NAV series"""
+        state = self.update(portfolio_id)
+        return pd.Series(state.nav, index=pd.DatetimeIndex(state.dates), name='nav')
+
+
+# Shared tracker so the in-memory state is reused across requests
+nav_tracker = NavTracker()
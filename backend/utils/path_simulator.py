@@ -0,0 +1,170 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from utils.simulation_var import CHUNK_ELEMENTS
+
+# Bins per (symbol, day) histogram and their half-width in standard deviations
+HISTOGRAM_BINS = 256
+HISTOGRAM_SIGMAS = 6.0
+
+
+def _simulate_paths(task: Tuple) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Simulate a worker's share of paths chunk by chunk.
+
+    Only per-day histograms of cumulative log returns and their price
+    relatives' sums leave the worker, never the paths themselves.
+    """
+    (method, seed, n_paths, chunk, horizon, mean, factor, history, block_size,
+     correlated, lo, width) = task
+    rng = np.random.default_rng(seed)
+    n_assets = len(mean)
+    bins = HISTOGRAM_BINS
+    counts = np.zeros(n_assets * horizon * bins, dtype=np.int64)
+    sums = np.zeros((horizon, n_assets))
+    # Flat offset of each (day, asset) histogram
+    offsets = (np.arange(n_assets)[None, :] * horizon + np.arange(horizon)[:, None]) * bins
+
+    done = 0
+    while done < n_paths:
+        size = min(chunk, n_paths - done)
+        if method == "bootstrap":
+            n_blocks = -(-horizon // block_size)
+            last_start = history.shape[0] - block_size
+            if correlated:
+                # Whole days are resampled so cross-asset dependence is kept
+                starts = rng.integers(0, last_start + 1, size=(size, n_blocks))
+                days = (starts[:, :, None] + np.arange(block_size)).reshape(size, -1)[:, :horizon]
+                daily = history[days]
+            else:
+                starts = rng.integers(0, last_start + 1, size=(size, n_blocks, n_assets))
+                days = (starts[:, :, None, :] + np.arange(block_size)[None, None, :, None])
+                days = days.reshape(size, -1, n_assets)[:, :horizon]
+                daily = np.take_along_axis(history[None, :, :], days.reshape(1, -1, n_assets), axis=1)
+                daily = daily.reshape(size, horizon, n_assets)
+        else:
+            daily = mean + rng.standard_normal((size, horizon, n_assets)) @ factor.T
+
+        cumulative = np.cumsum(daily, axis=1)  # (paths x days x assets) log price relatives
+        sums += np.exp(cumulative).sum(axis=0)
+        index = np.clip(((cumulative - lo) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((index + offsets).ravel(), minlength=counts.size)
+        done += size
+    return counts, sums, n_paths
+
+
+class PathSimulator:
+    """
+    Vectorized GBM and block-bootstrap price paths for forecast fan charts.
+
+    Daily log returns are simulated as (paths x days x assets) arrays, with
+    cross-asset correlation from a Cholesky factor (GBM) or from resampling
+    whole days (bootstrap). Paths are generated in bounded chunks across a
+    process pool and folded into per-day histograms, so percentile bands for
+    tens of thousands of paths need only a fixed amount of memory.
+    """
+
+    METHODS = ("gbm", "bootstrap")
+
+    def __init__(self, n_paths: int = 10_000, horizon: int = 252, method: str = "gbm",
+                 correlated: bool = True, block_size: int = 5, max_workers: Optional[int] = None,
+                 seed: int = 42):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown simulation method: {method}")
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.method = method
+        self.correlated = correlated
+        self.block_size = block_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.seed = seed
+
+    def _tasks(self, log_returns: np.ndarray, lo: np.ndarray, width: np.ndarray) -> List[Tuple]:
+        n_assets = log_returns.shape[1]
+        mean = log_returns.mean(axis=0)
+        factor, history = None, None
+        if self.method == "bootstrap":
+            if log_returns.shape[0] <= self.block_size:
+                raise ValueError("Not enough history for the bootstrap block size")
+            history = log_returns
+        else:
+            cov = np.cov(log_returns, rowvar=False).reshape(n_assets, n_assets)
+            if not self.correlated:
+                cov = np.diag(np.diag(cov))
+            jitter = 1e-12 * np.trace(cov) / n_assets
+            factor = np.linalg.cholesky(cov + jitter * np.eye(n_assets))
+
+        chunk = max(1, CHUNK_ELEMENTS // (self.horizon * n_assets))
+        n_workers = max(1, min(self.max_workers, -(-self.n_paths // chunk)))
+        shares = [self.n_paths // n_workers + (1 if i < self.n_paths % n_workers else 0)
+                  for i in range(n_workers)]
+        seeds = np.random.SeedSequence(self.seed).generate_state(n_workers)
+        return [(self.method, int(seed), share, chunk, self.horizon, mean, factor, history,
+                 self.block_size, self.correlated, lo, width)
+                for seed, share in zip(seeds, shares) if share > 0]
+
+    def simulate(self, returns: pd.DataFrame, last_prices: pd.Series,
+                 percentiles: Tuple[float, ...] = (5, 25, 50, 75, 95)) -> Dict:
+        """
+        Percentile bands and mean of simulated prices for each symbol and day.
+
+        ``returns`` are daily simple returns (dates x symbols); ``last_prices``
+        are the prices the paths start from.
+        """
+        symbols = list(returns.columns)
+        log_returns = np.log1p(returns.to_numpy(dtype=float))
+        n_assets = len(symbols)
+
+        # Histogram range per (day, asset): drift +/- several standard deviations of the cumulative return
+        t = np.arange(1, self.horizon + 1)[:, None]
+        center = log_returns.mean(axis=0) * t
+        spread = HISTOGRAM_SIGMAS * log_returns.std(axis=0, ddof=1) * np.sqrt(t)
+        spread = np.maximum(spread, 1e-6)
+        lo = center - spread
+        width = 2 * spread / HISTOGRAM_BINS
+
+        tasks = self._tasks(log_returns, lo, width)
+        counts = np.zeros(n_assets * self.horizon * HISTOGRAM_BINS, dtype=np.int64)
+        sums = np.zeros((self.horizon, n_assets))
+        total = 0
+        if len(tasks) == 1:
+            results = map(_simulate_paths, tasks)
+        else:
+            pool = ProcessPoolExecutor(max_workers=len(tasks))
+            results = pool.map(_simulate_paths, tasks)
+        try:
+            for part_counts, part_sums, n in results:
+                counts += part_counts
+                sums += part_sums
+                total += n
+        finally:
+            if len(tasks) > 1:
+                pool.shutdown()
+
+        # (assets x days x bins) -> percentile of each histogram, interpolated within the bin
+        hist = counts.reshape(n_assets, self.horizon, HISTOGRAM_BINS)
+        cumulative = np.cumsum(hist, axis=2)
+        prices = last_prices.reindex(symbols).to_numpy(dtype=float)
+        bands = {}
+        for q in percentiles:
+            target = q / 100 * total
+            index = np.minimum((cumulative < target).sum(axis=2), HISTOGRAM_BINS - 1)
+            below = np.take_along_axis(cumulative, index[..., None], axis=2)[..., 0] - \
+                np.take_along_axis(hist, index[..., None], axis=2)[..., 0]
+            inside = np.take_along_axis(hist, index[..., None], axis=2)[..., 0]
+            fraction = np.where(inside > 0, (target - below) / np.maximum(inside, 1), 0.5)
+            value = lo.T + (index + fraction) * width.T  # (assets x days) log price relatives
+            bands[q] = prices[:, None] * np.exp(value)
+
+        mean = prices[:, None] * (sums / total).T
+        return {
+            symbol: {
+                'start_price': float(prices[i]),
+                'percentiles': {f"p{q:g}": bands[q][i] for q in percentiles},
+                'mean': mean[i]
+            }
+            for i, symbol in enumerate(symbols)
+        }
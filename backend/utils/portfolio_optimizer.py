@@ -1,9 +1,13 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from scipy.optimize import minimize
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+from utils.price_store import price_store
+from utils.covariance import covariance_store
+from utils.factor_model import FactorRiskModel
+from utils.hrp import hrp_weights
+from utils.quote_cache import quote_cache
 
 class PortfolioOptimizer:
     def __init__(self):
@@ -12,8 +16,10 @@ class PortfolioOptimizer:
     def get_stock_data(self, symbols: List[str], period: str = "2y") -> pd.DataFrame:
         """Fetch historical stock data"""
         try:
-            data = yf.download(symbols, period=period)['Adj Close']
-            return data.dropna()
+            data = price_store.get_prices(symbols, period=period)
+            if data.empty:
+                raise ValueError("No price data available")
+            return data
         except Exception as e:
             raise Exception(f"Error fetching data: {str(e)}")
     
@@ -21,10 +27,21 @@ class PortfolioOptimizer:
         """Calculate daily returns"""
         return prices.pct_change().dropna()
     
-    def calculate_portfolio_stats(self, weights: np.array, returns: pd.DataFrame) -> Dict:
+    def calculate_covariance(self, returns: pd.DataFrame, cov_method: str = "sample") -> pd.DataFrame:
+        """Annualized covariance from the persisted incremental estimators"""
+        return covariance_store.get_covariance(returns, method=cov_method)
+    
+    def calculate_portfolio_stats(self, weights: np.array, returns: pd.DataFrame,
+                                  cov_matrix: Optional[pd.DataFrame] = None,
+                                  risk_model: Optional[FactorRiskModel] = None) -> Dict:
         """Calculate portfolio statistics"""
         portfolio_return = np.sum(returns.mean() * weights) * 252  # Annualized
-        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(returns.cov() * 252, weights)))
+        if risk_model is not None:
+            portfolio_volatility = risk_model.volatility(np.asarray(weights))
+        else:
+            if cov_matrix is None:
+                cov_matrix = returns.cov() * 252
+            portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
         sharpe_ratio = (portfolio_return - self.risk_free_rate) / portfolio_volatility
         
         return {
@@ -33,60 +50,123 @@ class PortfolioOptimizer:
             'sharpe_ratio': sharpe_ratio
         }
     
-    def optimize_portfolio(self, symbols: List[str], risk_tolerance: str = "moderate") -> Dict:
-        """Optimize portfolio allocation based on risk tolerance"""
+    def get_risk_limits(self, risk_tolerance: str) -> Dict:
+        """Target return and per-asset weight cap for a risk tolerance"""
+        if risk_tolerance == "conservative":
+            return {'target_return': 0.08, 'max_weight': 0.3}  # Max 30% in any single asset
+        elif risk_tolerance == "aggressive":
+            return {'target_return': 0.15, 'max_weight': 0.5}  # Max 50% in any single asset
+        else:  # moderate
+            return {'target_return': 0.12, 'max_weight': 0.4}  # Max 40% in any single asset
+    
+    def get_min_weight(self, n_assets: int) -> float:
+        """Min 5% each, relaxed so large universes stay feasible"""
+        return min(0.05, 0.5 / n_assets)
+    
+    def max_sharpe_weights(self, mean_returns: np.ndarray, variance, variance_gradient,
+                           max_weight: float):
+        """Run SLSQP for the maximum Sharpe ratio weights and return the scipy result"""
+        n_assets = len(mean_returns)
+        
+        # Objective function: minimize negative Sharpe ratio
+        def objective(weights):
+            portfolio_return = np.dot(mean_returns, weights)
+            portfolio_volatility = np.sqrt(variance(weights))
+            return -(portfolio_return - self.risk_free_rate) / portfolio_volatility  # Negative because we minimize
+        
+        # Analytic gradient saves SLSQP N extra objective calls per iteration
+        def objective_gradient(weights):
+            excess_return = np.dot(mean_returns, weights) - self.risk_free_rate
+            portfolio_variance = variance(weights)
+            portfolio_volatility = np.sqrt(portfolio_variance)
+            return -(mean_returns / portfolio_volatility
+                     - excess_return * variance_gradient(weights) / (2 * portfolio_variance * portfolio_volatility))
+        
+        # Constraints
+        constraints = [
+            {'type': 'eq', 'fun': lambda x: np.sum(x) - 1,  # Weights sum to 1
+             'jac': lambda x: np.ones_like(x)},
+        ]
+        
+        # Bounds for each weight
+        min_weight = self.get_min_weight(n_assets)
+        bounds = tuple((min_weight, max_weight) for _ in range(n_assets))
+        
+        # Initial guess (equal weights)
+        initial_guess = np.array([1/n_assets] * n_assets)
+        
+        return minimize(objective, initial_guess, method='SLSQP', jac=objective_gradient,
+                        bounds=bounds, constraints=constraints)
+    
+    def hrp_portfolio_weights(self, cov_matrix: np.ndarray, max_weight: float) -> np.ndarray:
+        """Hierarchical risk parity weights within the same bounds as SLSQP"""
+        return hrp_weights(cov_matrix, min_weight=self.get_min_weight(len(cov_matrix)),
+                           max_weight=max_weight)
+    
+    def optimize_portfolio(self, symbols: List[str], risk_tolerance: str = "moderate",
+                           cov_method: str = "sample", method: str = "slsqp") -> Dict:
+        """
+        Optimize portfolio allocation based on risk tolerance.
+        
+        ``cov_method`` is one of the covariance estimators (sample, ledoit_wolf,
+        ewma) or "factor", which uses a PCA factor model and never forms the
+        dense covariance matrix.
+        
+        ``method`` is "slsqp" (maximum Sharpe ratio) or "hrp" (hierarchical risk
+        parity). When SLSQP does not converge the HRP allocation is returned
+        instead, so the call always produces weights.
+        """
+        if method not in ("slsqp", "hrp"):
+            raise ValueError(f"Unknown optimization method: {method}")
         try:
             # Get data
             prices = self.get_stock_data(symbols)
             returns = self.calculate_returns(prices)
+            symbols = list(returns.columns)
             
-            n_assets = len(symbols)
+            # Estimate inputs once instead of on every objective evaluation
+            mean_returns = returns.mean().values * 252
+            cov_matrix = None
+            risk_model = None
+            if cov_method == "factor":
+                risk_model = FactorRiskModel.from_returns(returns)
+                variance = risk_model.variance
+                variance_gradient = risk_model.variance_gradient
+            else:
+                cov_matrix = self.calculate_covariance(returns, cov_method).values
+                variance = lambda w: np.dot(w, np.dot(cov_matrix, w))
+                variance_gradient = lambda w: 2 * np.dot(cov_matrix, w)
             
             # Set constraints based on risk tolerance
-            if risk_tolerance == "conservative":
-                target_return = 0.08  # 8% target return
-                max_weight = 0.3  # Max 30% in any single asset
-            elif risk_tolerance == "aggressive":
-                target_return = 0.15  # 15% target return
-                max_weight = 0.5  # Max 50% in any single asset
-            else:  # moderate
-                target_return = 0.12  # 12% target return
-                max_weight = 0.4  # Max 40% in any single asset
-            
-            # Objective function: minimize negative Sharpe ratio
-            def objective(weights):
-                stats = self.calculate_portfolio_stats(weights, returns)
-                return -stats['sharpe_ratio']  # Negative because we minimize
-            
-            # Constraints
-            constraints = [
-                {'type': 'eq', 'fun': lambda x: np.sum(x) - 1},  # Weights sum to 1
-            ]
+            max_weight = self.get_risk_limits(risk_tolerance)['max_weight']
             
-            # Bounds for each weight
-            bounds = tuple((0.05, max_weight) for _ in range(n_assets))  # Min 5% each
+            optimal_weights = None
+            method_used = method
+            if method != "hrp":
+                result = self.max_sharpe_weights(mean_returns, variance, variance_gradient, max_weight)
+                if result.success:
+                    optimal_weights = result.x
+                else:
+                    method_used = "hrp_fallback"
             
-            # Initial guess (equal weights)
-            initial_guess = np.array([1/n_assets] * n_assets)
+            if optimal_weights is None:
+                # HRP needs a dense matrix; use the sample estimator in factor mode
+                hrp_cov = cov_matrix if cov_matrix is not None else self.calculate_covariance(returns).values
+                optimal_weights = self.hrp_portfolio_weights(hrp_cov, max_weight)
             
-            # Optimize
-            result = minimize(objective, initial_guess, method='SLSQP', 
-                            bounds=bounds, constraints=constraints)
+            stats = self.calculate_portfolio_stats(optimal_weights, returns, cov_matrix, risk_model)
             
-            if result.success:
-                optimal_weights = result.x
-                stats = self.calculate_portfolio_stats(optimal_weights, returns)
-                
-                return {
-                    'symbols': symbols,
-                    'weights': optimal_weights.tolist(),
-                    'expected_return': stats['return'],
-                    'volatility': stats['volatility'],
-                    'sharpe_ratio': stats['sharpe_ratio'],
-                    'optimization_success': True
-                }
-            else:
-                raise Exception("Optimization failed")
+            return {
+                'symbols': symbols,
+                'weights': optimal_weights.tolist(),
+                'expected_return': stats['return'],
+                'volatility': stats['volatility'],
+                'sharpe_ratio': stats['sharpe_ratio'],
+                'covariance_method': cov_method,
+                'n_factors': risk_model.n_factors if risk_model is not None else None,
+                'method': method_used,
+                'optimization_success': method_used != "hrp_fallback"
+            }
                 
         except Exception as e:
             raise Exception(f"Portfolio optimization error: {str(e)}")
@@ -98,20 +178,13 @@ class PortfolioOptimizer:
             if weights is None:
                 weights = [1/len(symbols)] * len(symbols)
             
-            # Get current prices
-            current_prices = {}
+            # Get current prices, names and sectors in one parallel round-trip
+            quotes = quote_cache.get_quotes(symbols)
             portfolio_data = []
             
             for i, symbol in enumerate(symbols):
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
-                current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
-                
-                if current_price == 0:
-                    # Fallback to recent history
-                    hist = ticker.history(period="1d")
-                    if not hist.empty:
-                        current_price = hist['Close'].iloc[-1]
+                quote = quotes[symbol]
+                current_price = quote['price']
                 
                 allocation = investment_amount * weights[i]
                 quantity = int(allocation / current_price) if current_price > 0 else 0
@@ -119,8 +192,8 @@ class PortfolioOptimizer:
                 
                 portfolio_data.append({
                     'symbol': symbol,
-                    'name': info.get('longName', symbol),
-                    'sector': info.get('sector', 'Unknown'),
+                    'name': quote['name'],
+                    'sector': quote['sector'],
                     'current_price': current_price,
                     'target_weight': weights[i],
                     'target_allocation': allocation,
@@ -0,0 +1,98 @@
+import os
+import json
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from models.portfolio_model import Portfolio, Transaction
+from utils.price_store import DATA_DIR
+
+
+def apply_transaction(positions: Dict[str, int], cash: float, transaction: Transaction) -> float:
+    """Update ``positions`` in place for one buy or sell and return the new cash balance"""
+    t = transaction
+    if t.transaction_type == "sell":
+        positions[t.symbol] = positions.get(t.symbol, 0) - t.quantity
+        return cash + t.total_amount - t.fees
+    positions[t.symbol] = positions.get(t.symbol, 0) + t.quantity
+    return cash - t.total_amount - t.fees
+
+
+class PortfolioStore:
+    """
+    JSON-file persistence for portfolios and their transactions.
+
+    One file per portfolio under ``data/portfolios`` holds the portfolio, the
+    cash it was funded with and its transaction log.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.join(root or DATA_DIR, 'portfolios')
+        self._lock = threading.Lock()
+
+    def _path(self, portfolio_id: str) -> str:
+        return os.path.join(self.root, f"{portfolio_id}.json")
+
+    def _read(self, portfolio_id: str) -> Dict:
+        path = self._path(portfolio_id)
+        if not os.path.exists(path):
+            raise KeyError(f"Portfolio {portfolio_id} not found")
+        with open(path) as f:
+            return json.load(f)
+
+    def _write(self, portfolio_id: str, record: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._path(portfolio_id) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, self._path(portfolio_id))
+
+    def save_portfolio(self, portfolio: Portfolio, initial_cash: float,
+                       transactions: Optional[List[Transaction]] = None):
+        """Store a new portfolio with the cash it was funded with"""
+        with self._lock:
+            self._write(portfolio.id, {
+                'portfolio': portfolio.dict(),
+                'initial_cash': initial_cash,
+                'transactions': [t.dict() for t in transactions or []]
+            })
+
+    def get_portfolio(self, portfolio_id: str) -> Portfolio:
+        return Portfolio(**self._read(portfolio_id)['portfolio'])
+
+    def get_initial_cash(self, portfolio_id: str) -> float:
+        return float(self._read(portfolio_id)['initial_cash'])
+
+    def list_portfolios(self) -> List[Portfolio]:
+        if not os.path.isdir(self.root):
+            return []
+        ids = sorted(name[:-5] for name in os.listdir(self.root) if name.endswith('.json'))
+        return [self.get_portfolio(portfolio_id) for portfolio_id in ids]
+
+    def add_transaction(self, transaction: Transaction):
+        """Append a transaction to a portfolio's log"""
+        with self._lock:
+            record = self._read(transaction.portfolio_id)
+            record['transactions'].append(transaction.dict())
+            self._write(transaction.portfolio_id, record)
+
+    def get_transactions(self, portfolio_id: str) -> List[Transaction]:
+        """Transactions of a portfolio in timestamp order"""
+        transactions = [Transaction(**t) for t in self._read(portfolio_id)['transactions']]
+        return sorted(transactions, key=lambda t: t.timestamp)
+
+    def get_holdings(self, portfolio_id: str) -> Tuple[Dict[str, int], float, Dict[str, float]]:
+        """
+        Current positions and cash replayed from the transaction log, plus the
+        last traded price of each symbol
+        """
+        positions: Dict[str, int] = {}
+        cash = self.get_initial_cash(portfolio_id)
+        last_price: Dict[str, float] = {}
+        for transaction in self.get_transactions(portfolio_id):
+            cash = apply_transaction(positions, cash, transaction)
+            last_price[transaction.symbol] = transaction.price
+        return positions, cash, last_price
+
+
+# Shared store used by the portfolio routes and the NAV tracker
+portfolio_store = PortfolioStore()
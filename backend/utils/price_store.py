@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+from typing import List, Dict, Optional
+from datetime import timedelta
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# Calendar days covered by each yfinance period string
+PERIOD_DAYS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653
+}
+
+
+def period_start(period: str, last_date: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """Translate a yfinance period string into the first date it covers"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=last_date.year, month=1, day=1)
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period: {period}")
+    return last_date - timedelta(days=PERIOD_DAYS[period])
+
+
+class PriceStore:
+    """
+    Local store of daily OHLCV bars per symbol.
+
+    Each symbol is downloaded in full once and persisted under ``data/prices``;
+    afterwards only the bars since the last stored date are fetched, so repeated
+    requests never re-download history that is already on disk. File names are
+    sanitized, so ``symbols.json`` maps each file back to its symbol.
+    """
+
+    def __init__(self, root: Optional[str] = None, refresh_interval: int = 3600):
+        self.root = os.path.join(root or DATA_DIR, 'prices')
+        self.refresh_interval = refresh_interval  # Seconds between upstream checks
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._checked: Dict[str, float] = {}
+        self._modified: Dict[str, float] = {}
+        self._names: Optional[Dict[str, str]] = None  # File stem -> original symbol
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _stem(symbol: str) -> str:
+        return re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+
+    def _path(self, symbol: str) -> str:
+        """File used to persist a symbol's bars"""
+        return os.path.join(self.root, self._stem(symbol) + '.pkl')
+
+    def _symbol_names(self) -> Dict[str, str]:
+        if self._names is None:
+            path = os.path.join(self.root, 'symbols.json')
+            self._names = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    self._names = json.load(f)
+        return self._names
+
+    def _record_name(self, symbol: str):
+        """Remember which symbol a file holds (files written before the index are recorded when next read)"""
+        names = self._symbol_names()
+        stem = self._stem(symbol)
+        if names.get(stem) == symbol:
+            return
+        names[stem] = symbol
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, 'symbols.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(names, f, indent=0, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+    def _load(self, symbol: str) -> Optional[pd.DataFrame]:
+        """Load a symbol's bars from memory or disk"""
+        if symbol in self._frames:
+            return self._frames[symbol]
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_pickle(path)
+        self._frames[symbol] = frame
+        self._modified[symbol] = os.path.getmtime(path)
+        self._record_name(symbol)
+        return frame
+
+    def _save(self, symbol: str, frame: pd.DataFrame):
+        """Persist a symbol's bars and record the modification time"""
+        os.makedirs(self.root, exist_ok=True)
+        frame.to_pickle(self._path(symbol))
+        self._frames[symbol] = frame
+        self._modified[symbol] = time.time()
+        self._record_name(symbol)
+
+    @staticmethod
+    def _split(raw: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        """Extract one symbol's columns from a (possibly multi-ticker) download"""
+        if isinstance(raw.columns, pd.MultiIndex):
+            if symbol in raw.columns.get_level_values(0):
+                raw = raw[symbol]
+            elif symbol in raw.columns.get_level_values(1):
+                raw = raw.xs(symbol, axis=1, level=1)
+            else:
+                return pd.DataFrame()
+        frame = raw.dropna(how='all')
+        frame.index = pd.DatetimeIndex(frame.index).tz_localize(None)
+        return frame
+
+    def _download(self, symbols: List[str], start: Optional[pd.Timestamp] = None) -> Dict[str, pd.DataFrame]:
+        """Download bars for several symbols in a single upstream call"""
+        kwargs = {'start': start.strftime('%Y-%m-%d')} if start is not None else {'period': 'max'}
+        raw = yf.download(symbols, group_by='ticker', auto_adjust=False,
+                          progress=False, threads=True, **kwargs)
+        if raw is None or raw.empty:
+            return {}
+        return {symbol: self._split(raw, symbol) for symbol in symbols}
+
+    def refresh(self, symbols: List[str], force: bool = False):
+        """Bring the stored bars of the given symbols up to date"""
+        with self._lock:
+            now = time.time()
+            missing, stale = [], {}
+            for symbol in symbols:
+                frame = self._load(symbol)
+                if frame is None or frame.empty:
+                    # Symbols that returned nothing are retried once per interval, not per call
+                    if force or now - self._checked.get(symbol, 0) > self.refresh_interval:
+                        missing.append(symbol)
+                elif force or now - self._checked.get(symbol, 0) > self.refresh_interval:
+                    stale[symbol] = frame
+
+            if missing:
+                for symbol, frame in self._download(missing).items():
+                    if not frame.empty:
+                        self._save(symbol, frame)
+                # Marked even when the download returns nothing, so bad tickers are not re-requested on every call
+                for symbol in missing:
+                    self._checked[symbol] = now
+
+            if stale:
+                # Re-fetch from the earliest last bar so a revised final bar is replaced
+                start = min(frame.index[-1] for frame in stale.values())
+                for symbol in stale:
+                    self._checked[symbol] = now
+                for symbol, new in self._download(list(stale), start=start).items():
+                    if new.empty:
+                        continue
+                    old = stale[symbol]
+                    tail = old[old.index >= new.index[0]]
+                    if tail.shape == new.shape and tail.equals(new):
+                        continue
+                    merged = pd.concat([old[old.index < new.index[0]], new])
+                    self._save(symbol, merged)
+
+    def get_history(self, symbol: str, period: str = "1y", start: Optional[str] = None,
+                    end: Optional[str] = None) -> pd.DataFrame:
+        """Get stored OHLCV bars for a symbol, optionally restricted to a date range"""
+        self.refresh([symbol])
+        frame = self._frames.get(symbol)
+        if frame is None or frame.empty:
+            return pd.DataFrame()
+        # Bars are stored in date order, so label slicing is a binary search
+        first = pd.Timestamp(start) if start is not None else period_start(period, frame.index[-1])
+        last = pd.Timestamp(end) if end is not None else None
+        return frame.loc[first:last]
+
+    def get_prices(self, symbols: List[str], period: str = "1y", field: str = "Adj Close",
+                   start: Optional[str] = None, align: bool = True) -> pd.DataFrame:
+        """
+        Get price columns for several symbols, from ``start`` when given instead
+        of ``period``; with ``align=False`` dates missing for some symbols are
+        kept as NaN instead of being dropped
+        """
+        self.refresh(symbols)
+        columns = {}
+        for symbol in symbols:
+            frame = self._frames.get(symbol)
+            if frame is None or frame.empty:
+                continue
+            column = field if field in frame else 'Close'
+            columns[symbol] = frame[column]
+        if not columns:
+            return pd.DataFrame()
+        prices = pd.DataFrame(columns)
+        first = pd.Timestamp(start) if start is not None else period_start(period, prices.index[-1])
+        if first is not None:
+            prices = prices[prices.index >= first]
+        prices = prices[[s for s in symbols if s in prices]]
+        return prices.dropna() if align else prices.dropna(how='all')
+
+    def stored_symbols(self) -> List[str]:
+        """Symbols with bars on disk, by their original names (file names for unrecorded legacy files)"""
+        with self._lock:
+            if not os.path.isdir(self.root):
+                return []
+            names = self._symbol_names()
+            return sorted(names.get(name[:-4], name[:-4]) for name in os.listdir(self.root) if name.endswith('.pkl'))
+
+    def last_modified(self, symbol: str) -> Optional[float]:
+        """Unix time at which a symbol's stored bars last changed"""
+        with self._lock:
+            if self._load(symbol) is None:
+                return None
+            return self._modified.get(symbol)
+
+
+# Shared store used by the optimizer, risk calculator and data routes
+price_store = PriceStore()
@@ -0,0 +1,130 @@
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+
+class TTLCache:
+    """Thread-safe dictionary whose entries expire after a per-entry TTL"""
+
+    def __init__(self):
+        self._data: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, None) is not None
+
+
+class QuoteCache:
+    """
+    Shared cache of quotes (price) and profiles (name, sector, full ``.info``).
+
+    Profiles change rarely and get a long TTL; prices get a short one. Misses
+    are filled with one bulk ``yf.download`` for prices and a bounded thread
+    pool for ``.info`` lookups, run concurrently, so a batch of N symbols costs
+    one parallel round-trip instead of N serial ones.
+    """
+
+    def __init__(self, price_ttl: float = 60, profile_ttl: float = 24 * 3600, max_workers: int = 8):
+        self.price_ttl = price_ttl
+        self.profile_ttl = profile_ttl
+        self.prices = TTLCache()
+        self.profiles = TTLCache()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quotes")
+
+    @staticmethod
+    def _fetch_info(symbol: str) -> Dict:
+        try:
+            return yf.Ticker(symbol).info or {}
+        except Exception:
+            return {}
+
+    @staticmethod
+    def _fetch_prices(symbols: List[str]) -> Dict[str, float]:
+        """Latest close for several symbols in a single download"""
+        raw = yf.download(symbols, period="5d", group_by='ticker', auto_adjust=False,
+                          progress=False, threads=True)
+        prices = {}
+        if raw is None or raw.empty:
+            return prices
+        for symbol in symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    continue
+                close = raw[symbol]['Close']
+            else:
+                close = raw['Close']
+            close = close.dropna()
+            if not close.empty:
+                prices[symbol] = float(close.iloc[-1])
+        return prices
+
+    def get_info(self, symbol: str) -> Dict:
+        """Full yfinance ``.info`` for a symbol, cached with the profile TTL"""
+        info = self.profiles.get(symbol)
+        if info is None:
+            info = self._fetch_info(symbol)
+            if info:
+                self.profiles.set(symbol, info, self.profile_ttl)
+        return info
+
+    def get_infos(self, symbols: List[str]) -> Dict[str, Dict]:
+        """``.info`` for several symbols, fetching misses concurrently"""
+        infos = {s: self.profiles.get(s) for s in symbols}
+        missing = [s for s, info in infos.items() if info is None]
+        for symbol, info in zip(missing, self.executor.map(self._fetch_info, missing)):
+            if info:
+                self.profiles.set(symbol, info, self.profile_ttl)
+            infos[symbol] = info
+        return infos
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Price, name and sector for each symbol"""
+        missing_prices = [s for s in symbols if s not in self.prices]
+
+        # Bulk price download runs while the .info misses are fetched on the pool
+        price_future = self.executor.submit(self._fetch_prices, missing_prices) if missing_prices else None
+        infos = self.get_infos(symbols)
+
+        fetched_prices = {}
+        if price_future is not None:
+            try:
+                fetched_prices = price_future.result()
+            except Exception:
+                fetched_prices = {}
+
+        quotes = {}
+        for symbol in symbols:
+            info = infos.get(symbol) or {}
+            price = self.prices.get(symbol)
+            if price is None:
+                price = fetched_prices.get(symbol) or info.get('currentPrice', info.get('regularMarketPrice', 0)) or 0
+                if price:
+                    self.prices.set(symbol, price, self.price_ttl)
+            quotes[symbol] = {
+                'price': price,
+                'name': info.get('longName', symbol),
+                'sector': info.get('sector', 'Unknown')
+            }
+        return quotes
+
+
+# Shared between the portfolio optimizer and the data routes
+quote_cache = QuoteCache()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+from typing import List, Dict, Optional, Set
+
+from utils.quote_cache import quote_cache
+
+
+class Subscriber:
+    """One connected client: a bounded outbox and the symbols it follows"""
+
+    def __init__(self, symbols: Set[str], max_queue: int):
+        self.symbols = symbols
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0  # Consecutive drops since the last message that fit
+        self.closed = asyncio.Event()
+        self.reason: Optional[str] = None
+
+    def close(self, reason: str):
+        self.reason = reason
+        self.closed.set()
+
+
+class QuoteHub:
+    """
+    Fan-out of live quotes from one upstream poller per symbol.
+
+    Each distinct symbol with at least one subscriber has a single polling
+    task; a changed quote is pushed to every subscriber's bounded queue, so
+    upstream traffic depends on the number of symbols, not clients. A full
+    queue drops its oldest message (quotes supersede each other); a client
+    that stays behind for ``max_drops`` messages in a row is evicted. Upstream
+    fetches run on the hub's own thread pool, apart from request-path quotes.
+    """
+
+    def __init__(self, interval: float = 5, max_queue: int = 100, max_drops: int = 500,
+                 max_workers: int = 8):
+        self.interval = interval
+        self.max_queue = max_queue
+        self.max_drops = max_drops
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-stream")
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.pollers: Dict[str, asyncio.Task] = {}
+        self.latest: Dict[str, Dict] = {}
+
+    @staticmethod
+    def _fetch_quote(symbol: str) -> Optional[Dict]:
+        info = yf.Ticker(symbol).fast_info
+        price = info.last_price
+        if price is None:
+            return None
+        previous = info.previous_close or price
+        return {
+            'symbol': symbol,
+            'price': float(price),
+            'change': float(price - previous),
+            'change_percent': float((price - previous) / previous * 100) if previous else 0.0,
+            'timestamp': time.time()
+        }
+
+    def subscribe(self, symbols: List[str]) -> Subscriber:
+        subscriber = Subscriber(set(), self.max_queue)
+        self.add_symbols(subscriber, symbols)
+        return subscriber
+
+    def add_symbols(self, subscriber: Subscriber, symbols: List[str]):
+        """Follow more symbols, sending their last known quote straight away"""
+        for symbol in symbols:
+            if symbol in subscriber.symbols:
+                continue
+            subscriber.symbols.add(symbol)
+            self.subscribers.setdefault(symbol, set()).add(subscriber)
+            if symbol in self.latest:
+                self._deliver(subscriber, self.latest[symbol])
+            if symbol not in self.pollers:
+                self.pollers[symbol] = asyncio.create_task(self._poll(symbol))
+
+    def remove_symbols(self, subscriber: Subscriber, symbols: List[str]):
+        for symbol in symbols:
+            subscriber.symbols.discard(symbol)
+            followers = self.subscribers.get(symbol)
+            if followers is None:
+                continue
+            followers.discard(subscriber)
+            if not followers:
+                # Last follower left: stop polling this symbol
+                del self.subscribers[symbol]
+                poller = self.pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.remove_symbols(subscriber, list(subscriber.symbols))
+
+    def _deliver(self, subscriber: Subscriber, message: Dict):
+        if subscriber.closed.is_set():
+            return
+        if subscriber.queue.full():
+            subscriber.queue.get_nowait()
+            subscriber.dropped += 1
+            if subscriber.dropped > self.max_drops:
+                subscriber.close("slow consumer")
+                self.unsubscribe(subscriber)
+                return
+        else:
+            subscriber.dropped = 0
+        subscriber.queue.put_nowait(message)
+
+    async def _poll(self, symbol: str):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                quote = await loop.run_in_executor(self.executor, self._fetch_quote, symbol)
+            except Exception:
+                quote = None
+            previous = self.latest.get(symbol)
+            if quote is not None and (previous is None or quote['price'] != previous['price']):
+                self.latest[symbol] = quote
+                quote_cache.prices.set(symbol, quote['price'], quote_cache.price_ttl)
+                for subscriber in list(self.subscribers.get(symbol, ())):
+                    self._deliver(subscriber, quote)
+            await asyncio.sleep(self.interval)
+
+    async def next_message(self, subscriber: Subscriber, timeout: float) -> Optional[Dict]:
+        """Next quote for a subscriber, or None after ``timeout`` seconds (heartbeat)"""
+        try:
+            return await asyncio.wait_for(subscriber.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# Shared by the SSE and WebSocket endpoints
+quote_hub = QuoteHub()
@@ -1,8 +1,16 @@
 import numpy as np
 import pandas as pd
-import yfinance as yf
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from utils.factor_model import FactorRiskModel
+from utils.price_store import price_store
+from utils.risk_kernel import batch_risk_metrics, METRIC_NAMES
+from utils.rolling_risk import RollingRiskEngine
+from utils.simulation_var import SimulatedVaR
+from utils.covariance import covariance_store
+from utils.nav_tracker import nav_tracker
+from utils.stress_tester import StressTester
+from models.portfolio_model import Portfolio
 
 class RiskCalculator:
     def __init__(self):
@@ -50,56 +58,117 @@ class RiskCalculator:
         downside_deviation = downside_returns.std() * np.sqrt(252)
         return excess_return / downside_deviation if downside_deviation != 0 else 0
     
+    def calculate_factor_risk(self, weights: List[float], risk_model: FactorRiskModel) -> Dict:
+        """Decompose portfolio volatility with a factor model (O(N·K), no dense covariance)"""
+        return risk_model.risk_decomposition(np.asarray(weights, dtype=float))
+    
+    def get_risk_level(self, annualized_volatility: float) -> str:
+        """Risk assessment from annualized volatility"""
+        if annualized_volatility < 0.15:
+            return "Low"
+        elif annualized_volatility < 0.25:
+            return "Moderate"
+        return "High"
+    
+    def calculate_batch_risk_metrics(self, portfolio_returns: pd.DataFrame,
+                                     market_returns: Optional[pd.Series] = None,
+                                     confidence_level: float = 0.05) -> pd.DataFrame:
+        """
+        Risk metrics for many portfolios in one vectorized call.
+        
+        ``portfolio_returns`` has one column per portfolio; the result has one
+        row per portfolio and one column per metric.
+        """
+        if market_returns is not None:
+            common_dates = portfolio_returns.index.intersection(market_returns.index)
+            portfolio_returns = portfolio_returns.loc[common_dates]
+            market_returns = market_returns.loc[common_dates].values
+        metrics = batch_risk_metrics(portfolio_returns.values, market_returns,
+                                     risk_free_rate=self.risk_free_rate,
+                                     confidence_level=confidence_level)
+        result = pd.DataFrame(metrics, index=portfolio_returns.columns)
+        result['risk_level'] = [self.get_risk_level(v) for v in result['annualized_volatility']]
+        return result
+    
+    def calculate_batch_portfolio_risk(self, returns: pd.DataFrame, weights: pd.DataFrame,
+                                       market_returns: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        Risk metrics for many weightings of the same assets.
+        
+        ``weights`` has one row per portfolio and one column per asset in
+        ``returns``; all portfolio return series come from one matrix product.
+        """
+        weights = weights.reindex(columns=returns.columns, fill_value=0.0)
+        portfolio_returns = pd.DataFrame(returns.values @ weights.values.T,
+                                         index=returns.index, columns=weights.index)
+        return self.calculate_batch_risk_metrics(portfolio_returns, market_returns)
+    
+    def calculate_rolling_risk(self, portfolio_returns: pd.Series, window: int = 63,
+                               market_returns: Optional[pd.Series] = None) -> pd.DataFrame:
+        """Rolling volatility, Sharpe, Sortino, VaR, CVaR, beta and drawdown series"""
+        engine = RollingRiskEngine(window, risk_free_rate=self.risk_free_rate)
+        return engine.compute(portfolio_returns, market_returns)
+    
+    def calculate_rolling_portfolio_risk(self, symbols: List[str], weights: List[float],
+                                         window: int = 63, period: str = "2y") -> pd.DataFrame:
+        """Rolling risk series for a weighted portfolio from the local price store"""
+        prices = price_store.get_prices(symbols, period=period)
+        returns = prices.pct_change().dropna()
+        portfolio_returns = pd.Series(returns[symbols].values @ np.asarray(weights), index=returns.index)
+        market_returns = price_store.get_prices([self.market_symbol], period=period)[self.market_symbol]
+        return self.calculate_rolling_risk(portfolio_returns, window, market_returns.pct_change().dropna())
+    
+    def calculate_simulated_var(self, symbols: List[str], weights: List[float], horizon: int = 10,
+                                n_paths: int = 100_000, method: str = "normal", period: str = "2y",
+                                cov_method: str = "ledoit_wolf") -> Dict:
+        """
+        Simulated VaR/CVaR of the horizon return.
+        
+        ``method`` is "normal" or "t" (draws from the cached covariance
+        estimator) or "historical" (bootstrapped days of stored returns).
+        """
+        try:
+            prices = price_store.get_prices(symbols, period=period)
+            returns = prices.pct_change().dropna()[symbols]
+            cov_matrix = None
+            if method != "historical":
+                cov_matrix = covariance_store.get_covariance(returns, method=cov_method)
+            simulator = SimulatedVaR(n_paths=n_paths, horizon=horizon, method=method)
+            return simulator.calculate(returns, weights, cov_matrix)
+        except Exception as e:
+            raise Exception(f"Simulated VaR error: {str(e)}")
+    
+    def calculate_stress_test(self, portfolios: List[Portfolio], scenarios: Optional[List[str]] = None,
+                              factor_shocks: Optional[Dict[str, float]] = None) -> Dict:
+        """Historical and factor stress P&L for many portfolios at once"""
+        try:
+            return StressTester().run(portfolios, scenarios, factor_shocks)
+        except Exception as e:
+            raise Exception(f"Stress test error: {str(e)}")
+    
     def calculate_portfolio_risk_metrics(self, symbols: List[str], weights: List[float], 
-                                       period: str = "2y") -> Dict:
+                                       period: str = "2y",
+                                       risk_model: Optional[FactorRiskModel] = None) -> Dict:
         """Calculate comprehensive risk metrics for a portfolio"""
         try:
-            # Get portfolio data
-            prices = yf.download(symbols, period=period)['Adj Close']
-            if len(symbols) == 1:
-                prices = prices.to_frame()
-                prices.columns = symbols
-            
+            # Get portfolio and market data from the local price store
+            prices = price_store.get_prices(symbols, period=period)
             returns = prices.pct_change().dropna()
+            market_returns = price_store.get_prices([self.market_symbol], period=period)[self.market_symbol]
+            market_returns = market_returns.pct_change().dropna()
             
             # Calculate portfolio returns
-            portfolio_returns = (returns * weights).sum(axis=1)
-            
-            # Get market data for beta/alpha calculation
-            market_data = yf.download(self.market_symbol, period=period)['Adj Close']
-            market_returns = market_data.pct_change().dropna()
-            
-            # Align dates
-            common_dates = portfolio_returns.index.intersection(market_returns.index)
-            portfolio_returns = portfolio_returns.loc[common_dates]
-            market_returns = market_returns.loc[common_dates]
-            
-            # Calculate metrics
-            metrics = {
-                'annualized_return': portfolio_returns.mean() * 252,
-                'annualized_volatility': portfolio_returns.std() * np.sqrt(252),
-                'sharpe_ratio': self.calculate_sharpe_ratio(portfolio_returns),
-                'sortino_ratio': self.calculate_sortino_ratio(portfolio_returns),
-                'max_drawdown': self.calculate_max_drawdown(portfolio_returns),
-                'var_95': self.calculate_var(portfolio_returns, 0.05),
-                'cvar_95': self.calculate_cvar(portfolio_returns, 0.05),
-                'beta': self.calculate_beta(portfolio_returns, market_returns),
-                'skewness': portfolio_returns.skew(),
-                'kurtosis': portfolio_returns.kurtosis()
-            }
-            
-            # Calculate alpha
-            metrics['alpha'] = self.calculate_alpha(portfolio_returns, market_returns, metrics['beta'])
+            portfolio_returns = pd.DataFrame({'portfolio': returns[symbols].values @ np.asarray(weights)},
+                                             index=returns.index)
             
-            # Risk assessment
-            if metrics['annualized_volatility'] < 0.15:
-                risk_level = "Low"
-            elif metrics['annualized_volatility'] < 0.25:
-                risk_level = "Moderate"
-            else:
-                risk_level = "High"
+            # All metrics from one pass of the vectorized kernel
+            row = self.calculate_batch_risk_metrics(portfolio_returns, market_returns).iloc[0]
+            metrics = {name: float(row[name]) for name in METRIC_NAMES}
+            metrics['risk_level'] = row['risk_level']
             
-            metrics['risk_level'] = risk_level
+            if risk_model is not None:
+                metrics['factor_risk'] = self.calculate_factor_risk(
+                    weights, risk_model.subset(symbols))
             
             return metrics
             
@@ -107,18 +176,5 @@ class RiskCalculator:
             raise Exception(f"Risk calculation error: {str(e)}")
     
     def calculate_performance(self, portfolio_id: str) -> Dict:
-        """Calculate portfolio performance (placeholder for database integration)"""
-        # This would typically fetch portfolio data from database
-        # For now, return sample performance data
-        return {
-            'total_return': 0.12,
-            'total_return_percent': 12.0,
-            'daily_return': 0.0008,
-            'daily_return_percent': 0.08,
-            'ytd_return': 0.15,
-            'volatility': 0.18,
-            'sharpe_ratio': 0.67,
-            'max_drawdown': -0.08,
-            'beta': 1.05,
-            'alpha': 0.02
-        }
+        """Calculate portfolio performance from its incrementally maintained NAV series"""
+        return nav_tracker.performance(portfolio_id)
@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, Optional
+
+METRIC_NAMES = [
+    'annualized_return', 'annualized_volatility', 'sharpe_ratio', 'sortino_ratio',
+    'max_drawdown', 'var_95', 'cvar_95', 'beta', 'alpha', 'skewness', 'kurtosis'
+]
+
+
+def batch_risk_metrics(returns: np.ndarray, market_returns: Optional[np.ndarray] = None,
+                       risk_free_rate: float = 0.02, confidence_level: float = 0.05,
+                       frequency: int = 252) -> Dict[str, np.ndarray]:
+    """
+    Risk metrics for many return series at once.
+
+    ``returns`` is a (days x portfolios) array (a 1-D array is treated as a
+    single column). Moments come from one centered pass, VaR and CVaR share a
+    single column-wise sort, and drawdowns from one cumulative product, so the
+    cost is a handful of vectorized passes regardless of how many portfolios
+    are evaluated. Each entry of the result is an array with one value per
+    column. Skewness and kurtosis use the same bias-corrected estimators as
+    pandas.
+    """
+    R = np.ascontiguousarray(returns, dtype=float)
+    if R.ndim == 1:
+        R = R[:, None]
+    n, n_cols = R.shape
+    if n < 4:
+        raise ValueError("At least 4 observations are required")
+
+    # Central moments from a single centered pass
+    mean = R.mean(axis=0)
+    centered = R - mean
+    sq = centered * centered
+    m2 = sq.sum(axis=0)
+    m3 = (sq * centered).sum(axis=0)
+    m4 = (sq * sq).sum(axis=0)
+    std = np.sqrt(m2 / (n - 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skewness = np.where(m2 > 0, n * np.sqrt(n - 1) / (n - 2) * m3 / m2 ** 1.5, 0.0)
+        kurtosis = np.where(m2 > 0, n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+                            - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)), 0.0)
+
+        # Downside deviation of the negative returns (sample std, as pandas)
+        negative = np.where(R < 0, R, 0.0)
+        neg_count = np.count_nonzero(R < 0, axis=0)
+        neg_sum = negative.sum(axis=0)
+        neg_sq = (negative * negative).sum(axis=0)
+        downside_var = (neg_sq - neg_sum ** 2 / neg_count) / (neg_count - 1)
+        downside_std = np.where(neg_count > 1, np.sqrt(np.maximum(downside_var, 0)), 0.0)
+
+    # VaR (linear interpolation, as np.percentile) and CVaR from one sort
+    ordered = np.sort(R, axis=0)
+    position = confidence_level * (n - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, n - 1)
+    fraction = position - lower
+    var = ordered[lower] + fraction * (ordered[upper] - ordered[lower])
+    tail_count = np.count_nonzero(ordered <= var, axis=0)
+    tail_sum = np.cumsum(ordered, axis=0)[tail_count - 1, np.arange(n_cols)]
+    cvar = tail_sum / tail_count
+
+    # Drawdown of cumulative wealth
+    wealth = np.cumprod(1 + R, axis=0)
+    peak = np.maximum.accumulate(wealth, axis=0)
+    max_drawdown = (wealth / peak - 1).min(axis=0)
+
+    ann_return = mean * frequency
+    ann_vol = std * np.sqrt(frequency)
+    ann_downside = downside_std * np.sqrt(frequency)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(ann_vol != 0, (ann_return - risk_free_rate) / ann_vol, 0.0)
+        sortino = np.where(ann_downside != 0, (ann_return - risk_free_rate) / ann_downside, 0.0)
+
+    beta = np.full(n_cols, np.nan)
+    alpha = np.full(n_cols, np.nan)
+    if market_returns is not None:
+        market = np.asarray(market_returns, dtype=float).reshape(-1)
+        market_centered = market - market.mean()
+        market_var = market_centered @ market_centered
+        beta = (centered.T @ market_centered) / market_var if market_var != 0 else np.zeros(n_cols)
+        market_return = market.mean() * frequency
+        alpha = ann_return - (risk_free_rate + beta * (market_return - risk_free_rate))
+
+    return {
+        'annualized_return': ann_return,
+        'annualized_volatility': ann_vol,
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': sortino,
+        'max_drawdown': max_drawdown,
+        'var_95': var,
+        'cvar_95': cvar,
+        'beta': beta,
+        'alpha': alpha,
+        'skewness': skewness,
+        'kurtosis': kurtosis
+    }
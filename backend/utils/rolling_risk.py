@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Optional
+
+
+class FenwickTree:
+    """Binary indexed tree over value ranks holding a count and a sum per rank"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.counts = [0] * (size + 1)
+        self.sums = [0.0] * (size + 1)
+        self.top_bit = 1 << (size.bit_length() - 1) if size > 0 else 0
+
+    def add(self, rank: int, value: float, sign: int):
+        i = rank + 1
+        while i <= self.size:
+            self.counts[i] += sign
+            self.sums[i] += sign * value
+            i += i & -i
+
+    def prefix(self, rank: int):
+        """Count and sum of all stored values with rank <= ``rank``"""
+        count, total = 0, 0.0
+        i = rank + 1
+        while i > 0:
+            count += self.counts[i]
+            total += self.sums[i]
+            i -= i & -i
+        return count, total
+
+    def kth(self, k: int) -> int:
+        """Rank of the k-th smallest stored value (1-indexed)"""
+        pos = 0
+        step = self.top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.counts[nxt] < k:
+                pos = nxt
+                k -= self.counts[nxt]
+            step >>= 1
+        return pos
+
+
+class DrawdownQueue:
+    """
+    Sliding-window maximum drawdown with amortized O(1) push/pop.
+
+    Segments of the wealth curve are summarized as (max, min, max drawdown),
+    which combine associatively; a two-stack queue keeps running aggregates so
+    the window's summary is available without rescanning it.
+    """
+
+    def __init__(self):
+        self.front = []  # (value, aggregate of this element and everything behind it)
+        self.back = []   # (value, aggregate of the back stack up to this element)
+
+    @staticmethod
+    def _combine(left, right):
+        """Summary of ``left`` followed by ``right``"""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return (max(left[0], right[0]), min(left[1], right[1]),
+                min(left[2], right[2], right[1] / left[0] - 1))
+
+    def push(self, value: float):
+        single = (value, value, 0.0)
+        agg = self._combine(self.back[-1][1] if self.back else None, single)
+        self.back.append((value, agg))
+
+    def pop(self):
+        if not self.front:
+            agg = None
+            while self.back:
+                value, _ = self.back.pop()
+                agg = self._combine((value, value, 0.0), agg)
+                self.front.append((value, agg))
+        self.front.pop()
+
+    def max_drawdown(self) -> float:
+        agg = self._combine(self.front[-1][1] if self.front else None,
+                            self.back[-1][1] if self.back else None)
+        return agg[2] if agg is not None else 0.0
+
+
+class RollingRiskEngine:
+    """
+    Full rolling risk series in roughly linear time.
+
+    Moments, Sortino and beta use cumulative sums (O(1) per window), the
+    window peak and current drawdown use a monotonic deque, the maximum
+    drawdown a two-stack aggregation queue, and VaR/CVaR a Fenwick tree over
+    value ranks (O(log n) per window). Definitions match
+    ``RiskCalculator.calculate_portfolio_risk_metrics`` for each window.
+    """
+
+    def __init__(self, window: int = 63, risk_free_rate: float = 0.02,
+                 confidence_level: float = 0.05, frequency: int = 252):
+        if window < 4:
+            raise ValueError("Window must cover at least 4 observations")
+        self.window = window
+        self.risk_free_rate = risk_free_rate
+        self.confidence_level = confidence_level
+        self.frequency = frequency
+
+    def _window_sums(self, values: np.ndarray) -> np.ndarray:
+        """Sum of each trailing window via a cumulative sum"""
+        csum = np.concatenate([[0.0], np.cumsum(values)])
+        return csum[self.window:] - csum[:-self.window]
+
+    def _moments(self, x: np.ndarray, market: Optional[np.ndarray]) -> dict:
+        w = self.window
+        # Shift by the global mean so the cumulative sums do not lose precision
+        shifted = x - x.mean()
+        s1 = self._window_sums(shifted)
+        s2 = self._window_sums(shifted * shifted)
+        mean = s1 / w + x.mean()
+        var = np.maximum((s2 - s1 * s1 / w) / (w - 1), 0)
+        std = np.sqrt(var)
+
+        negative = np.where(x < 0, x, 0.0)
+        neg_count = self._window_sums((x < 0).astype(float))
+        neg_sum = self._window_sums(negative)
+        neg_sq = self._window_sums(negative * negative)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            downside = np.where(neg_count > 1,
+                                np.sqrt(np.maximum((neg_sq - neg_sum ** 2 / neg_count) / (neg_count - 1), 0)),
+                                0.0)
+
+        ann_return = mean * self.frequency
+        ann_vol = std * np.sqrt(self.frequency)
+        ann_downside = downside * np.sqrt(self.frequency)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = {
+                'annualized_return': ann_return,
+                'annualized_volatility': ann_vol,
+                'sharpe_ratio': np.where(ann_vol != 0, (ann_return - self.risk_free_rate) / ann_vol, 0.0),
+                'sortino_ratio': np.where(ann_downside != 0,
+                                          (ann_return - self.risk_free_rate) / ann_downside, 0.0),
+            }
+
+        if market is not None:
+            m = market - market.mean()
+            m1 = self._window_sums(m)
+            m2 = self._window_sums(m * m)
+            xm = self._window_sums(shifted * m)
+            cov = xm - s1 * m1 / w
+            mvar = m2 - m1 * m1 / w
+            with np.errstate(divide='ignore', invalid='ignore'):
+                beta = np.where(mvar != 0, cov / mvar, 0.0)
+            market_return = (m1 / w + market.mean()) * self.frequency
+            result['beta'] = beta
+            result['alpha'] = ann_return - (self.risk_free_rate + beta * (market_return - self.risk_free_rate))
+        return result
+
+    def _tail_risk(self, x: np.ndarray):
+        """Rolling VaR and CVaR from a Fenwick tree of value ranks"""
+        w = self.window
+        uniques, ranks = np.unique(x, return_inverse=True)
+        tree = FenwickTree(len(uniques))
+        position = self.confidence_level * (w - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, w - 1)
+        fraction = position - lower
+
+        n_windows = len(x) - w + 1
+        var = np.empty(n_windows)
+        cvar = np.empty(n_windows)
+        for t in range(len(x)):
+            tree.add(int(ranks[t]), float(x[t]), 1)
+            if t >= w:
+                tree.add(int(ranks[t - w]), float(x[t - w]), -1)
+            if t < w - 1:
+                continue
+            lo_value = uniques[tree.kth(lower + 1)]
+            hi_value = uniques[tree.kth(upper + 1)]
+            v = lo_value + fraction * (hi_value - lo_value)
+            count, total = tree.prefix(int(np.searchsorted(uniques, v, side='right')) - 1)
+            var[t - w + 1] = v
+            cvar[t - w + 1] = total / count
+        return var, cvar
+
+    def _drawdowns(self, x: np.ndarray):
+        """Rolling max drawdown and drawdown from the window peak"""
+        w = self.window
+        wealth = np.cumprod(1 + x)
+        n_windows = len(x) - w + 1
+        max_dd = np.empty(n_windows)
+        current_dd = np.empty(n_windows)
+        peaks = deque()  # Indices with decreasing wealth: the front is the window peak
+        queue = DrawdownQueue()
+        for t in range(len(x)):
+            while peaks and wealth[peaks[-1]] <= wealth[t]:
+                peaks.pop()
+            peaks.append(t)
+            queue.push(wealth[t])
+            if t >= w:
+                queue.pop()
+                if peaks[0] <= t - w:
+                    peaks.popleft()
+            if t < w - 1:
+                continue
+            max_dd[t - w + 1] = queue.max_drawdown()
+            current_dd[t - w + 1] = wealth[t] / wealth[peaks[0]] - 1
+        return max_dd, current_dd
+
+    def compute(self, returns: pd.Series, market_returns: Optional[pd.Series] = None) -> pd.DataFrame:
+        """Rolling metrics indexed by the last date of each window"""
+        returns = returns.dropna()
+        if market_returns is not None:
+            common_dates = returns.index.intersection(market_returns.index)
+            returns = returns.loc[common_dates]
+            market = market_returns.loc[common_dates].to_numpy(dtype=float)
+        else:
+            market = None
+        x = returns.to_numpy(dtype=float)
+        if len(x) < self.window:
+            return pd.DataFrame()
+
+        metrics = self._moments(x, market)
+        metrics['var_95'], metrics['cvar_95'] = self._tail_risk(x)
+        metrics['max_drawdown'], metrics['drawdown'] = self._drawdowns(x)
+        return pd.DataFrame(metrics, index=returns.index[self.window - 1:])
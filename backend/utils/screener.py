@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+from utils.price_store import DATA_DIR, price_store
+from utils.ml_features import ENHANCED_FEATURE_NAMES, latest_feature_rows
+from utils.symbol_search import SYMBOL_MASTER
+
+SCREEN_OPERATORS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '==': np.equal, '!=': np.not_equal
+}
+
+
+class FeatureScreener:
+    """
+    Precomputed ``prepare_enhanced_features`` rows for every stored symbol.
+
+    A nightly job refreshes the price store and rebuilds one float32 column
+    per feature, persisted as ``data/screener.npz``. Queries are boolean masks
+    over those columns plus an ``argpartition`` top-k, so screening the whole
+    universe never builds features on request. Market correlation and beta
+    are measured against ``benchmark_for`` rather than the first
+    ticker of a portfolio. The job thread starts on first use.
+    """
+
+    def __init__(self, root: Optional[str] = None, lookback: int = 252, run_hour: int = 2):
+        self.path = os.path.join(root or DATA_DIR, 'screener.npz')
+        self.lookback = lookback
+        self.run_hour = run_hour  # Local hour of the nightly rebuild
+        self._table: Optional[Dict] = None
+        self._error: Optional[str] = None
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self) -> Optional[Dict]:
+        if self._table is None and os.path.exists(self.path):
+            with np.load(self.path, allow_pickle=False) as stored:
+                self._table = {
+                    'symbols': stored['symbols'],
+                    'as_of': stored['as_of'],
+                    'built_at': float(stored['built_at']),
+                    'columns': {name: stored[name] for name in ENHANCED_FEATURE_NAMES}
+                }
+        return self._table
+
+    def _indices(self) -> set:
+        """Symbols the master lists on the INDEX exchange (benchmarks, not screenable listings)"""
+        indices = set()
+        if os.path.exists(SYMBOL_MASTER):
+            master = pd.read_csv(SYMBOL_MASTER, dtype=str)
+            indices.update(master.loc[master['exchange'] == 'INDEX', 'symbol'])
+        return indices
+
+    def build(self, symbols: Optional[List[str]] = None) -> Dict:
+        """Refresh prices and recompute the feature table, replacing the current one"""
+        # Indices outside the master still carry Yahoo's ``^`` prefix
+        indices = self._indices()
+        symbols = [s for s in (symbols or price_store.stored_symbols()) if s not in indices and not s.startswith('^')]
+        kept, as_of, rows = latest_feature_rows(symbols, self.lookback)
+        values = rows.astype(np.float32)
+        table = {
+            'symbols': np.array(kept, dtype=str),
+            'as_of': np.array(as_of, dtype='datetime64[D]'),
+            'built_at': time.time(),
+            'columns': {name: np.ascontiguousarray(values[:, i]) for i, name in enumerate(ENHANCED_FEATURE_NAMES)}
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp.npz'
+        np.savez(tmp, symbols=table['symbols'], as_of=table['as_of'],
+                 built_at=np.float64(table['built_at']), **table['columns'])
+        os.replace(tmp, self.path)
+        self._table = table
+        return table
+
+    def _seconds_until_run(self) -> float:
+        now = datetime.now()
+        run = now.replace(hour=self.run_hour, minute=0, second=0, microsecond=0)
+        if run <= now:
+            run += timedelta(days=1)
+        return (run - now).total_seconds()
+
+    def _rebuild(self):
+        try:
+            self.build()
+            self._error = None
+        except Exception as e:
+            self._error = str(e)
+
+    def _run(self):
+        # At startup a recent table is reused; every scheduled run rebuilds
+        table = self._load()
+        if table is None or time.time() - table['built_at'] > 24 * 3600:
+            self._rebuild()
+        while True:
+            time.sleep(self._seconds_until_run())
+            self._rebuild()
+
+    def start(self):
+        """Start the nightly rebuild thread once (it builds at once if the table is missing or old)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="feature-screener", daemon=True)
+                self._thread.start()
+
+    def status(self) -> Dict:
+        self.start()
+        table = self._load()
+        return {
+            'ready': table is not None,
+            'symbols': len(table['symbols']) if table is not None else 0,
+            'built_at': table['built_at'] if table is not None else None,
+            'error': self._error,
+            'features': ENHANCED_FEATURE_NAMES
+        }
+
+    def screen(self, filters: Optional[List[Dict]] = None, sort_by: Optional[str] = None,
+               descending: bool = True, limit: int = 50) -> Dict:
+        """
+        Symbols whose features pass every ``{"feature", "op", "value"}`` filter,
+        the best ``limit`` by ``sort_by`` (NaN last)
+        """
+        self.start()
+        table = self._load()
+        if table is None:
+            raise RuntimeError("Screener table is not built yet")
+        columns = table['columns']
+
+        mask = np.ones(len(table['symbols']), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for f in filters or []:
+                if f['feature'] not in columns:
+                    raise ValueError(f"Unknown feature: {f['feature']}")
+                if f['op'] not in SCREEN_OPERATORS:
+                    raise ValueError(f"Unknown operator: {f['op']}")
+                mask &= SCREEN_OPERATORS[f['op']](columns[f['feature']], f['value'])
+        matches = np.flatnonzero(mask)
+
+        if sort_by is not None:
+            if sort_by not in columns:
+                raise ValueError(f"Unknown feature: {sort_by}")
+            key = columns[sort_by][matches]
+            key = np.where(np.isnan(key), np.inf, -key if descending else key)
+            if limit < len(key):
+                # Only the k best are ordered; the rest of the universe is never sorted
+                top = np.argpartition(key, limit - 1)[:limit]
+                order = top[np.argsort(key[top], kind='stable')]
+            else:
+                order = np.argsort(key, kind='stable')
+            selected = matches[order]
+        else:
+            selected = matches[:limit]
+
+        return {
+            'universe': len(table['symbols']),
+            'matches': len(matches),
+            'built_at': table['built_at'],
+            'results': [{
+                'symbol': str(table['symbols'][i]),
+                'as_of': str(table['as_of'][i]),
+                **{name: float(columns[name][i]) if np.isfinite(columns[name][i]) else None
+                   for name in ENHANCED_FEATURE_NAMES}
+            } for i in selected]
+        }
+
+
+# Shared by the screener endpoints
+feature_screener = FeatureScreener()
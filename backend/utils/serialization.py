@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Any
+from fastapi import Request, Response
+
+# Optional accelerators: fall back to the standard library when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_FORMATS = ("records", "columnar")
+BINARY_FORMATS = ("arrow", "binary")
+
+MEDIA_TYPES = {
+    "records": "application/json",
+    "columnar": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "binary": "application/octet-stream",
+}
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+
+def negotiate_format(request: Request, requested: Optional[str] = None) -> str:
+    """Pick a history format from an explicit parameter or the Accept header"""
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported format: {requested}. Use one of {list(MEDIA_TYPES)}")
+        return requested
+    accept = request.headers.get('accept', '')
+    if MEDIA_TYPES['arrow'] in accept:
+        return "arrow"
+    if MEDIA_TYPES['binary'] in accept:
+        return "binary"
+    return "records"
+
+
+def _default(value: Any):
+    """Encode values the JSON encoders do not handle natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialize to JSON bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def _column(values: pd.Series) -> list:
+    """Column as a list with NaN mapped to null"""
+    array = values.to_numpy()
+    if array.dtype.kind == 'f' and np.isnan(array).any():
+        return np.where(np.isnan(array), None, array).tolist()
+    return array.tolist()
+
+
+def frame_payload(frame: pd.DataFrame, fmt: str):
+    """
+    JSON-ready bars in the requested layout.
+
+    ``records`` is one object per bar (the original layout); ``columnar`` is
+    one array per field plus a shared ``dates`` array.
+    """
+    if fmt == "columnar":
+        return {
+            'dates': frame.index.strftime('%Y-%m-%d').tolist(),
+            'columns': {column: _column(frame[column]) for column in frame.columns}
+        }
+    records = frame.reset_index()
+    first = records.columns[0]
+    records[first] = records[first].dt.strftime('%Y-%m-%d')
+    return records.to_dict('records')
+
+
+def _arrow_body(frames: Dict[str, pd.DataFrame], metadata: Dict) -> bytes:
+    """Arrow IPC stream with one row per (symbol, date)"""
+    if pa is None:
+        raise ValueError("Arrow format requires pyarrow to be installed")
+    combined = pd.concat(frames, names=['symbol', 'date']).reset_index()
+    table = pa.Table.from_pandas(combined, preserve_index=False)
+    table = table.replace_schema_metadata({key: dumps(value) for key, value in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _binary_body(frames: Dict[str, pd.DataFrame], columns: list) -> bytes:
+    """
+    Little-endian blocks, one per symbol in ``X-Symbols`` order.
+
+    Each block is ``rows`` int32 dates (days since 1970-01-01) followed by
+    the float32 values of each column in ``X-Columns`` order.
+    """
+    parts = []
+    for frame in frames.values():
+        days = frame.index.values.astype('datetime64[D]').astype('<i4')
+        values = frame.reindex(columns=columns).to_numpy(dtype='<f4')
+        parts.append(days.tobytes())
+        parts.append(values.T.tobytes())
+    return b''.join(parts)
+
+
+def compress(request: Request, body: bytes, headers: Dict[str, str]) -> bytes:
+    """Brotli or gzip encode a body according to Accept-Encoding"""
+    headers['Vary'] = 'Accept, Accept-Encoding'
+    accepted = request.headers.get('accept-encoding', '')
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body
+    if brotli is not None and 'br' in accepted:
+        headers['Content-Encoding'] = 'br'
+        return brotli.compress(body, quality=5)
+    if 'gzip' in accepted:
+        headers['Content-Encoding'] = 'gzip'
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+
+def json_response(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Fast-encoded, compressed JSON response"""
+    headers = dict(headers or {})
+    body = compress(request, dumps(payload), headers)
+    return Response(content=body, media_type=MEDIA_TYPES['records'], headers=headers)
+
+
+def frames_response(request: Request, frames: Dict[str, pd.DataFrame], fmt: str,
+                    metadata: Optional[Dict] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Arrow or float32 binary response for one or more symbols' bars"""
+    metadata = metadata or {}
+    headers = dict(headers or {})
+    if fmt == "arrow":
+        body = _arrow_body(frames, metadata)
+    else:
+        columns = list(next(iter(frames.values())).columns) if frames else []
+        body = _binary_body(frames, columns)
+        headers.update({
+            'X-Symbols': ','.join(frames),
+            'X-Rows': ','.join(str(len(frame)) for frame in frames.values()),
+            'X-Columns': ','.join(columns)
+        })
+        if metadata.get('errors'):
+            headers['X-Errors'] = dumps(metadata['errors']).decode()
+    body = compress(request, body, headers)
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def entity_tag(*parts) -> str:
+    """Weak ETag derived from everything that determines a response body"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def validator_headers(etag: str, modified: Optional[float]) -> Dict[str, str]:
+    """ETag / Last-Modified headers that make clients revalidate on every poll"""
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if modified is not None:
+        headers['Last-Modified'] = formatdate(modified, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, modified: Optional[float]) -> bool:
+    """Whether the client's conditional headers still match the current data"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and modified is not None:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,202 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+from utils.price_store import price_store
+from utils.risk_kernel import batch_risk_metrics
+from utils.ml_features import rolling_ml_features, rolling_enhanced_features, weights_from_predictions
+
+STRATEGIES = ("enhanced", "basic", "equal_weight")
+
+# Shortest feature window the backtest accepts (the RSI and momentum windows need a month of bars)
+MIN_LOOKBACK = 30
+
+# Models shipped to each worker once by the pool initializer
+_worker_models: Dict = {}
+
+
+def _init_worker(models: Dict):
+    _worker_models.update(models)
+
+
+def simulate_rebalancing(prices: np.ndarray, targets: np.ndarray, every: int,
+                         cost_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Equity curve of a portfolio reset to ``targets`` every ``every`` days.
+
+    ``prices`` is (days x assets) and ``targets`` holds one weight row per
+    rebalance (days 0, every, 2*every, ...). Holdings drift with prices
+    between rebalances; each rebalance pays ``cost_rate`` on its turnover
+    against the drifted weights (the first one buys from cash). Everything
+    is array arithmetic, with one cumulative product linking the segments.
+    Returns the equity (starting from 1 before the first trade) and the
+    turnover of each rebalance.
+    """
+    n_days = prices.shape[0]
+    rows = np.arange(0, n_days, every)
+    segment = np.arange(n_days) // every
+    units = targets / prices[rows]  # holdings per unit of value at the segment start
+
+    growth = np.einsum('ij,ij->i', units[segment], prices)
+    end_value = np.einsum('ij,ij->i', units[:-1], prices[rows[1:]])
+    drifted = units[:-1] * prices[rows[1:]] / end_value[:, None]
+
+    turnover = np.concatenate([[np.abs(targets[0]).sum()], np.abs(targets[1:] - drifted).sum(axis=1)])
+    kept = 1 - cost_rate * turnover
+    start_value = np.cumprod(np.concatenate([[kept[0]], end_value * kept[1:]]))
+    return start_value[segment] * growth, turnover
+
+
+def _run_strategy(task: Tuple) -> List[Dict]:
+    """Target weights of one (strategy, lookback) pair and the equity curve of each rebalance frequency"""
+    strategy, lookback, price_df, start, frequencies, cost_rate = task
+    tickers = list(price_df.columns)
+    prices = price_df.to_numpy(dtype=float)[start:]
+    n_days = prices.shape[0]
+    # Only the dates some frequency rebalances on are predicted, in one call
+    needed = np.unique(np.concatenate([np.arange(0, n_days, every) for every in frequencies]))
+
+    started = time.perf_counter()
+    if strategy == "equal_weight":
+        targets = np.full((n_days, len(tickers)), 1.0 / len(tickers))
+    else:
+        targets = np.empty((n_days, len(tickers)))
+        offset = start - (lookback - 1)  # first feature row belongs to date lookback - 1
+        if strategy == "enhanced":
+            model_tickers = _worker_models['enhanced_tickers']
+            features = rolling_enhanced_features(price_df, model_tickers, lookback).to_numpy()
+            columns = [model_tickers.index(t) for t in tickers]
+            model = _worker_models['enhanced_model']
+        else:
+            features = rolling_ml_features(price_df, lookback).to_numpy()
+            columns = list(range(len(tickers)))
+            model = _worker_models['rf_model']
+        predicted = model.predict(features[offset + needed])
+        targets[needed] = weights_from_predictions(predicted, columns)
+    predict_seconds = time.perf_counter() - started
+
+    results = []
+    for every in frequencies:
+        equity, turnover = simulate_rebalancing(prices, targets[::every], every, cost_rate)
+        results.append({
+            'strategy': strategy,
+            'lookback': lookback,
+            'rebalance_every': every,
+            'equity': equity,
+            'rebalances': len(turnover),
+            'average_turnover': float(turnover[1:].mean()) if len(turnover) > 1 else 0.0,
+            'cost_paid': float(1 - np.prod(1 - cost_rate * turnover)),
+            'predict_seconds': predict_seconds
+        })
+    return results
+
+
+class StrategyBacktester:
+    """
+    Historical replay of the ``/optimize`` allocation models.
+
+    For each (strategy, lookback) pair the model inputs are built for every
+    date with rolling windows (the same features ``/optimize`` computes for a
+    single date), the model predicts all rebalance dates in one call, and the
+    weights are post-processed exactly as the endpoint does. Equity curves for
+    each rebalance frequency come from vectorized drift and turnover
+    arithmetic, and risk statistics for the whole grid from one
+    ``batch_risk_metrics`` pass. Pairs run on a process pool that receives
+    the fitted models once per worker.
+    """
+
+    def __init__(self, rf_model=None, enhanced_model=None, enhanced_tickers: Optional[List[str]] = None,
+                 cost_bps: float = 10.0, risk_free_rate: float = 0.02, max_workers: Optional[int] = None):
+        self.models = {
+            'rf_model': rf_model,
+            'enhanced_model': enhanced_model,
+            'enhanced_tickers': list(enhanced_tickers) if enhanced_tickers is not None else None
+        }
+        self.cost_rate = cost_bps / 10_000
+        self.risk_free_rate = risk_free_rate
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def _unavailable(self, strategy: str, tickers: List[str]) -> Optional[str]:
+        if strategy == "enhanced":
+            if self.models['enhanced_model'] is None:
+                return "Enhanced model not available"
+            if not set(tickers).issubset(self.models['enhanced_tickers']):
+                return "Tickers not supported by the enhanced model"
+        elif strategy == "basic" and self.models['rf_model'] is None:
+            return "Basic model not available"
+        return None
+
+    def run(self, tickers: List[str], strategies: Optional[List[str]] = None,
+            frequencies: List[int] = (21,), lookbacks: List[int] = (252,), period: str = "10y",
+            include_curves: bool = False) -> Dict:
+        strategies = strategies or list(STRATEGIES)
+        unknown = [s for s in strategies if s not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Unknown strategies: {unknown}")
+        if not frequencies or not lookbacks:
+            raise ValueError("At least one rebalance frequency and lookback are required")
+        if min(lookbacks) < MIN_LOOKBACK:
+            raise ValueError(f"Lookbacks must be at least {MIN_LOOKBACK} days")
+        if min(frequencies) < 1:
+            raise ValueError("Rebalance frequencies must be at least 1 day")
+
+        price_df = price_store.get_prices(tickers, period=period)
+        missing = [t for t in tickers if t not in price_df.columns]
+        if missing:
+            raise ValueError(f"No price data for: {missing}")
+        # Every configuration is evaluated over the same dates: after the longest lookback
+        start = max(lookbacks) - 1
+        if len(price_df) - start < 2 * max(frequencies):
+            raise ValueError("Not enough history for the requested lookbacks and frequencies")
+
+        skipped = {}
+        tasks = []
+        for strategy in strategies:
+            reason = self._unavailable(strategy, tickers)
+            if reason:
+                skipped[strategy] = reason
+                continue
+            # Equal weights do not depend on the lookback
+            for lookback in (lookbacks[:1] if strategy == "equal_weight" else lookbacks):
+                tasks.append((strategy, lookback, price_df, start, list(frequencies), self.cost_rate))
+
+        started = time.perf_counter()
+        if len(tasks) > 1 and self.max_workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks)),
+                                     initializer=_init_worker, initargs=(self.models,)) as pool:
+                runs = [r for part in pool.map(_run_strategy, tasks) for r in part]
+        else:
+            _init_worker(self.models)
+            runs = [r for task in tasks for r in _run_strategy(task)]
+        if not runs:
+            return {'results': [], 'skipped_strategies': skipped}
+
+        # Daily returns of every configuration, including the cost of the first trade
+        equity = np.column_stack([r['equity'] for r in runs])
+        returns = np.vstack([equity[:1] - 1, equity[1:] / equity[:-1] - 1])
+        benchmark = price_df.iloc[start:].pct_change().fillna(0).mean(axis=1).to_numpy()
+        metrics = batch_risk_metrics(returns, market_returns=benchmark, risk_free_rate=self.risk_free_rate)
+
+        dates = price_df.index[start:]
+        results = []
+        for i, run in enumerate(runs):
+            curve = run.pop('equity')
+            result = {**run, 'final_value': float(curve[-1]), 'total_return': float(curve[-1] - 1)}
+            result.update({name: float(values[i]) for name, values in metrics.items()})
+            if include_curves:
+                result['equity_curve'] = curve.tolist()
+            results.append(result)
+
+        output = {
+            'start_date': dates[0].strftime('%Y-%m-%d'),
+            'end_date': dates[-1].strftime('%Y-%m-%d'),
+            'days': len(dates),
+            'results': results,
+            'skipped_strategies': skipped,
+            'elapsed_seconds': time.perf_counter() - started
+        }
+        if include_curves:
+            output['dates'] = [d.strftime('%Y-%m-%d') for d in dates]
+        return output
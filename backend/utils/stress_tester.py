@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Optional
+
+from models.portfolio_model import Portfolio
+from utils.price_store import price_store
+from utils.portfolio_store import portfolio_store
+
+# Historical shock windows (peak to trough of the local market)
+SCENARIOS = {
+    "gfc_2008": {
+        "description": "Global financial crisis, Lehman collapse to the November 2008 low",
+        "start": "2008-09-01", "end": "2008-11-20"
+    },
+    "euro_crisis_2011": {
+        "description": "US downgrade and euro-area debt crisis",
+        "start": "2011-07-22", "end": "2011-10-03"
+    },
+    "taper_tantrum_2013": {
+        "description": "Fed taper signal, emerging-market selloff",
+        "start": "2013-05-22", "end": "2013-08-28"
+    },
+    "demonetisation_2016": {
+        "description": "Indian demonetisation announcement",
+        "start": "2016-11-08", "end": "2016-12-26"
+    },
+    "covid_crash_2020": {
+        "description": "COVID-19 crash, February peak to March 2020 low",
+        "start": "2020-02-19", "end": "2020-03-23"
+    },
+    "rate_shock_2022": {
+        "description": "2022 inflation and rate-hike drawdown",
+        "start": "2022-01-03", "end": "2022-06-16"
+    },
+}
+
+NSE_PROXY = "^NSEI"  # NIFTY 50
+US_PROXY = "^GSPC"   # S&P 500
+
+
+def proxy_for(symbol: str) -> str:
+    """Market index used when a symbol has no history in a shock window"""
+    return NSE_PROXY if symbol.endswith(('.NS', '.BO')) else US_PROXY
+
+
+class StressTester:
+    """
+    Applies historical shock windows and factor shocks to many portfolios.
+
+    Holdings of all portfolios form a (portfolios x assets) value matrix H;
+    scenario P&L for every portfolio and scenario is the single product
+    H @ R with R the (assets x scenarios) shock returns, and drawdowns
+    come from H times each scenario's cumulative return path.
+    """
+
+    def __init__(self, beta_period: str = "2y"):
+        self.beta_period = beta_period
+
+    def holdings_matrix(self, portfolios: List[Portfolio]):
+        """
+        Current position values (portfolios x assets) and cash per portfolio,
+        replayed from each portfolio's transaction log
+        """
+        holdings = [portfolio_store.get_holdings(p.id) for p in portfolios]
+        symbols = sorted({s for positions, _, _ in holdings for s, qty in positions.items() if qty != 0})
+        index = {symbol: i for i, symbol in enumerate(symbols)}
+        prices = self.latest_prices(symbols)
+        quantities = np.zeros((len(portfolios), len(symbols)))
+        fallback = np.zeros(len(symbols))
+        for row, (positions, _, traded) in enumerate(holdings):
+            for symbol, qty in positions.items():
+                if qty != 0:
+                    quantities[row, index[symbol]] += qty
+                    fallback[index[symbol]] = traded[symbol]
+        last = np.array([prices.get(s, np.nan) for s in symbols])
+        last = np.where(np.isnan(last), fallback, last)
+        cash = np.array([cash for _, cash, _ in holdings])
+        return symbols, quantities * last, cash
+
+    @staticmethod
+    def latest_prices(symbols: List[str]) -> Dict[str, float]:
+        """Last stored close of each symbol, after one bulk refresh"""
+        price_store.refresh(symbols)
+        prices = {}
+        for symbol in symbols:
+            closes = price_store.get_prices([symbol], period="1mo", field="Close")
+            if not closes.empty:
+                prices[symbol] = float(closes[symbol].iloc[-1])
+        return prices
+
+    def betas(self, symbols: List[str]) -> np.ndarray:
+        """
+        Beta of each asset to its market proxy over the recent period, each
+        estimated on the dates both series have returns for
+        """
+        proxies = [proxy_for(s) for s in symbols]
+        prices = price_store.get_prices(symbols + sorted(set(proxies)), period=self.beta_period, align=False)
+        returns = prices.pct_change()
+        betas = np.ones(len(symbols))
+        position = {symbol: i for i, symbol in enumerate(symbols)}
+        for proxy in set(proxies):
+            if proxy not in returns:
+                continue
+            cols = [s for s, p in zip(symbols, proxies) if p == proxy and s in returns]
+            if not cols:
+                continue
+            # Pairwise alignment: a short history only shortens its own regression
+            assets = returns[cols].to_numpy()
+            market = np.broadcast_to(returns[proxy].to_numpy()[:, None], assets.shape)
+            valid = np.isfinite(assets) & np.isfinite(market)
+            counts = valid.sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                asset_dev = np.where(valid, assets - np.where(valid, assets, 0).sum(axis=0) / counts, 0)
+                market_dev = np.where(valid, market - np.where(valid, market, 0).sum(axis=0) / counts, 0)
+                market_var = (market_dev * market_dev).sum(axis=0)
+                beta = np.where((counts > 2) & (market_var > 0),
+                                (asset_dev * market_dev).sum(axis=0) / market_var, 1.0)
+            for symbol, b in zip(cols, beta):
+                betas[position[symbol]] = b
+        return betas
+
+    def scenario_paths(self, symbols: List[str], betas: np.ndarray, start: str, end: str):
+        """
+        Cumulative return paths (days x assets) over a shock window.
+
+        Assets without history in the window follow their proxy scaled by beta.
+        """
+        proxies = sorted({proxy_for(s) for s in symbols})
+        columns = {}
+        for symbol in symbols + proxies:
+            history = price_store.get_history(symbol, start=start, end=end)
+            if len(history) > 1:
+                columns[symbol] = history['Adj Close'] if 'Adj Close' in history else history['Close']
+        frame = pd.DataFrame(columns).ffill().bfill()
+        if frame.empty:
+            raise ValueError(f"No price history available between {start} and {end}")
+        cumulative = frame / frame.iloc[0] - 1
+
+        paths = np.empty((len(frame), len(symbols)))
+        proxied = []
+        for i, symbol in enumerate(symbols):
+            if symbol in cumulative:
+                paths[:, i] = cumulative[symbol].values
+            else:
+                proxy = proxy_for(symbol)
+                proxy_path = cumulative[proxy].values if proxy in cumulative else np.zeros(len(frame))
+                paths[:, i] = betas[i] * proxy_path
+                proxied.append(symbol)
+        index_shocks = {p: float(cumulative[p].iloc[-1]) for p in proxies if p in cumulative}
+        return paths, proxied, index_shocks
+
+    def factor_loadings(self, symbols: List[str], factors: List[str]) -> np.ndarray:
+        """Multivariate regression loadings (factors x assets) of asset returns on factor returns"""
+        prices = price_store.get_prices(symbols + factors, period=self.beta_period)
+        returns = prices.pct_change().dropna()
+        F = returns[factors].values
+        X = returns[symbols].values
+        F = F - F.mean(axis=0)
+        X = X - X.mean(axis=0)
+        loadings, *_ = np.linalg.lstsq(F, X, rcond=None)
+        return loadings
+
+    def run(self, portfolios: List[Portfolio], scenarios: Optional[List[str]] = None,
+            factor_shocks: Optional[Dict[str, float]] = None) -> Dict:
+        """Stress P&L, drawdown and beta-implied loss for every portfolio and scenario"""
+        if not portfolios:
+            return {'portfolios': [], 'scenarios': {}}
+        scenarios = scenarios if scenarios is not None else list(SCENARIOS)
+        unknown = [s for s in scenarios if s not in SCENARIOS]
+        if unknown:
+            raise ValueError(f"Unknown scenarios: {unknown}")
+
+        symbols, H, cash = self.holdings_matrix(portfolios)
+        totals = H.sum(axis=1) + cash
+        betas = self.betas(symbols)
+        proxy_of = [proxy_for(s) for s in symbols]
+
+        names, shock_columns, implied_columns, drawdowns, details = [], [], [], [], {}
+        for name in scenarios:
+            window = SCENARIOS[name]
+            paths, proxied, index_shocks = self.scenario_paths(symbols, betas, window['start'], window['end'])
+            names.append(name)
+            shock_columns.append(paths[-1])
+            implied_columns.append(betas * np.array([index_shocks.get(p, 0.0) for p in proxy_of]))
+
+            # Value path of every portfolio over the window: (portfolios x days)
+            wealth = totals[:, None] + H @ paths.T
+            peak = np.maximum.accumulate(np.maximum(wealth, totals[:, None]), axis=1)
+            drawdowns.append((wealth / peak - 1).min(axis=1))
+            details[name] = {**window, 'index_shocks': index_shocks, 'proxied_symbols': proxied}
+
+        if factor_shocks:
+            factors = list(factor_shocks)
+            loadings = self.factor_loadings(symbols, factors)
+            shock = np.array([factor_shocks[f] for f in factors]) @ loadings
+            names.append("factor_shock")
+            shock_columns.append(shock)
+            implied_columns.append(shock)
+            drawdowns.append(np.minimum(H @ shock / totals, 0))
+            details["factor_shock"] = {'description': "User-defined factor shocks", 'shocks': factor_shocks}
+
+        # One matrix product per measure across all portfolios and scenarios
+        pnl = H @ np.column_stack(shock_columns)
+        implied = H @ np.column_stack(implied_columns)
+        drawdown = np.column_stack(drawdowns)
+
+        results = []
+        for row, portfolio in enumerate(portfolios):
+            results.append({
+                'portfolio_id': portfolio.id,
+                'value': float(totals[row]),
+                'scenarios': {
+                    name: {
+                        'pnl': float(pnl[row, j]),
+                        'pnl_percent': float(pnl[row, j] / totals[row] * 100) if totals[row] > 0 else 0.0,
+                        'max_drawdown': float(drawdown[row, j]),
+                        'beta_implied_loss': float(implied[row, j])
+                    }
+                    for j, name in enumerate(names)
+                }
+            })
+        return {'portfolios': results, 'scenarios': details}
@@ -0,0 +1,165 @@
+import bisect
+import csv
+import os
+import re
+import threading
+import time
+from typing import List, Dict, Optional, Tuple
+
+from utils.price_store import DATA_DIR
+
+# Bundled symbol master: symbol, name, sector, exchange and an optional industry
+SYMBOL_MASTER = os.path.join(DATA_DIR, 'symbols.csv')
+
+# Prefix lengths indexed for typo-tolerant matching
+MIN_FUZZY_LENGTH = 4
+MAX_FUZZY_LENGTH = 12
+
+
+def _base_symbol(symbol: str) -> str:
+    """Symbol without index caret or exchange suffix (RELIANCE.NS -> RELIANCE)"""
+    return symbol.lstrip('^').split('.')[0]
+
+
+def _words(name: str) -> List[str]:
+    return [w for w in re.split(r'[^a-z0-9&]+', name.lower()) if w]
+
+
+def _deletes(word: str) -> set:
+    """All strings one deletion away from ``word``, plus the word itself"""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Optimal string alignment distance <= 1 (substitution, indel or adjacent swap)"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    i = 0
+    while i < min(la, lb) and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        return a[i + 1:] == b[i + 1:] or (a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:])
+    return a[i + 1:] == b[i:] if la > lb else a[i:] == b[i + 1:]
+
+
+class SymbolIndex:
+    """
+    In-memory typeahead index over the symbol master.
+
+    Symbols (with and without exchange suffix), full names and name words are
+    kept in sorted lists, so prefix matches are a binary search plus a short
+    scan. Typos are handled with a symmetric-deletion map over token
+    prefixes: a query and an indexed prefix within one edit share a deletion
+    variant, which turns fuzzy lookup into a few dictionary probes.
+    """
+
+    def __init__(self, path: str = SYMBOL_MASTER, reload_interval: Optional[float] = None):
+        self.path = path
+        self.reload_interval = reload_interval  # Seconds between checks for a newer master file
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._index = self._build([])
+        self.load()
+
+    @staticmethod
+    def _build(entries: List[Dict]) -> Dict:
+        symbol_keys: List[Tuple[str, int]] = []
+        name_keys: List[Tuple[str, int, int]] = []  # (key, 0 = full name / 1 = word, entry)
+        fuzzy: Dict[str, List[Tuple[str, int]]] = {}
+        for i, entry in enumerate(entries):
+            symbol = entry['symbol'].upper()
+            base = _base_symbol(symbol)
+            symbol_keys.append((symbol, i))
+            if base != symbol:
+                symbol_keys.append((base, i))
+            name = entry['name'].lower()
+            name_keys.append((name, 0, i))
+            words = _words(name)
+            name_keys.extend((word, 1, i) for word in words)
+
+            for token in {base.lower(), *words}:
+                for length in range(MIN_FUZZY_LENGTH, min(len(token), MAX_FUZZY_LENGTH) + 1):
+                    prefix = token[:length]
+                    for variant in _deletes(prefix):
+                        fuzzy.setdefault(variant, []).append((prefix, i))
+        symbol_keys.sort()
+        name_keys.sort()
+        return {'entries': entries, 'symbol_keys': symbol_keys, 'name_keys': name_keys, 'fuzzy': fuzzy}
+
+    def load(self):
+        """(Re)build the index from the master file and swap it in"""
+        with self._lock:
+            self._checked = time.monotonic()
+            if not os.path.exists(self.path):
+                return
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            with open(self.path, newline='', encoding='utf-8') as f:
+                entries = [{
+                    'symbol': row['symbol'].strip(),
+                    'name': row.get('name', '').strip(),
+                    'sector': row.get('sector', '').strip() or 'Unknown',
+                    # Listings without an industry fall back to their sector
+                    'industry': (row.get('industry') or '').strip() or row.get('sector', '').strip() or 'Unknown',
+                    'exchange': row.get('exchange', '').strip() or 'Unknown'
+                } for row in csv.DictReader(f) if row.get('symbol')]
+            self._index = self._build(entries)
+            self._mtime = mtime
+
+    def _maybe_reload(self):
+        if self.reload_interval and time.monotonic() - self._checked > self.reload_interval:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._index['entries'])
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Ranked matches: exact symbol, symbol prefix, name prefix, word prefix, then typos"""
+        self._maybe_reload()
+        index = self._index
+        upper, lower = query.strip().upper(), query.strip().lower()
+        if not upper:
+            return []
+        scores: Dict[int, float] = {}
+
+        def offer(entry: int, score: float):
+            if score > scores.get(entry, 0):
+                scores[entry] = score
+
+        keys = index['symbol_keys']
+        for i in range(bisect.bisect_left(keys, (upper,)), len(keys)):
+            key, entry = keys[i]
+            if not key.startswith(upper):
+                break
+            offer(entry, 100 if key == upper else 90 - min(len(key) - len(upper), 9))
+
+        keys = index['name_keys']
+        for i in range(bisect.bisect_left(keys, (lower,)), len(keys)):
+            key, kind, entry = keys[i]
+            if not key.startswith(lower):
+                break
+            if kind == 0:
+                offer(entry, 75 if key == lower else 70)
+            else:
+                offer(entry, 65 if key == lower else 60)
+
+        if len(lower) >= MIN_FUZZY_LENGTH:
+            probe = lower[:MAX_FUZZY_LENGTH]
+            for variant in _deletes(probe):
+                for prefix, entry in index['fuzzy'].get(variant, ()):
+                    if _within_one_edit(probe, prefix):
+                        offer(entry, 40)
+
+        entries = index['entries']
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(entries[item[0]]['symbol']),
+                                                          entries[item[0]]['symbol']))
+        return [{**entries[entry], 'score': score} for entry, score in ranked[:limit]]
+
+
+# Loaded once at import so typeahead queries never touch the network
+symbol_index = SymbolIndex(reload_interval=3600)